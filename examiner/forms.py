@@ -1,5 +1,9 @@
+from typing import Any, Dict, List, Tuple
+
 from django import forms
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.urls import reverse
 from django.utils.translation import ugettext_lazy as _
 
@@ -9,8 +13,19 @@ from crispy_forms.layout import Field, Fieldset, Layout, Submit
 from dal import autocomplete
 
 from examiner.models import DocumentInfoSource, DocumentInfo, Pdf
+from kokekunster.conditional import bump_content_version
 from semesterpage.models import Course
 
+# Fields of DocumentInfo which are determined by a verifier
+DECISION_FIELDS = (
+    'content_type',
+    'language',
+    'year',
+    'season',
+    'solutions',
+    'exercise_number',
+)
+
 
 class VerifyExamForm(forms.ModelForm):
     courses = forms.ModelMultipleChoiceField(
@@ -126,6 +141,187 @@ class VerifyExamForm(forms.ModelForm):
         ).delete()
 
 
+class VerificationDecisionForm(forms.ModelForm):
+    """Form validating the metadata of one decision of verify_batch."""
+
+    class Meta:
+        model = DocumentInfo
+        fields = DECISION_FIELDS
+
+
+def verify_batch(decisions: List[Dict[str, Any]], verifier) -> Dict[str, int]:
+    """
+    Verify the document information of several PDFs in one transaction.
+
+    Each decision has the same meaning as a submitted VerifyExamForm, but
+    the PDFs and courses are given by SHA1 hash and course code. All lookups
+    and inserts are performed in bulk, such that the number of queries does
+    not depend on the number of decisions.
+
+    :param decisions: List of dictionaries with keys 'sha1_hash', 'courses',
+      i.e. a list of course codes, and the fields in DECISION_FIELDS.
+    :param verifier: User verifying the decisions.
+    :raises ValidationError: If any decision is invalid, in which case no
+      decisions are applied.
+    :return: Dictionary with the number of verified PDFs and the number of
+      created DocumentInfo and DocumentInfoSource objects.
+    """
+    errors = []
+    cleaned_decisions = []
+    for index, decision in enumerate(decisions):
+        if not isinstance(decision, dict):
+            errors.append(f'Decision {index}: Not a JSON object.')
+            continue
+        form = VerificationDecisionForm(decision)
+        if not form.is_valid():
+            errors.append(f'Decision {index}: {form.errors.as_text()}')
+            continue
+        course_codes = decision.get('courses')
+        if not isinstance(course_codes, list) or not course_codes:
+            errors.append(f'Decision {index}: No courses given.')
+            continue
+        cleaned_decisions.append((
+            str(decision.get('sha1_hash')),
+            [str(course_code).upper() for course_code in course_codes],
+            tuple(form.cleaned_data[field] for field in DECISION_FIELDS),
+        ))
+
+    pdf_ids = dict(
+        Pdf.objects
+        .filter(sha1_hash__in={sha1 for sha1, _, _ in cleaned_decisions})
+        .values_list('sha1_hash', 'id')
+    )
+    course_ids = dict(
+        Course.objects
+        .filter(course_code__in={
+            course_code
+            for _, course_codes, _ in cleaned_decisions
+            for course_code in course_codes
+        })
+        .values_list('course_code', 'id')
+    )
+    for sha1_hash, course_codes, _ in cleaned_decisions:
+        if sha1_hash not in pdf_ids:
+            errors.append(f'Unknown PDF {sha1_hash}.')
+        errors.extend(
+            f'Unknown course {course_code}.'
+            for course_code in course_codes
+            if course_code not in course_ids
+        )
+    if errors:
+        raise ValidationError(errors)
+
+    # Pairs of PDF and DocumentInfo key which should be verified
+    verified = {
+        (pdf_ids[sha1_hash], (course_code, *values))
+        for sha1_hash, course_codes, values in cleaned_decisions
+        for course_code in course_codes
+    }
+    with transaction.atomic():
+        docinfo_ids, created_docinfos = _docinfo_ids(
+            keys={key for _, key in verified},
+            course_ids=course_ids,
+        )
+        created_sources = _verify_sources(
+            pairs={(pdf_id, docinfo_ids[key]) for pdf_id, key in verified},
+            verifier=verifier,
+        )
+
+        # Remove all unverified document infos for these PDFs
+        verified_pdfs = {pdf_id for pdf_id, _ in verified}
+        DocumentInfoSource.objects.filter(
+            pdf_id__in=verified_pdfs,
+            verified_by__isnull=True,
+        ).delete()
+        pdfs = Pdf.objects.filter(pk__in=verified_pdfs)
+        pdfs.update_needs_verification()
+        pdfs.release(user=verifier)
+
+    # Bulk inserts do not send any post_save signals
+    bump_content_version('examiner')
+    return {
+        'verified_pdfs': len(verified_pdfs),
+        'created_document_infos': created_docinfos,
+        'created_document_info_sources': created_sources,
+    }
+
+
+def _docinfo_ids(keys, course_ids) -> Tuple[Dict[tuple, int], int]:
+    """
+    Return DocumentInfo ids keyed by course code and DECISION_FIELDS values.
+
+    Missing DocumentInfo objects are created with one query.
+
+    :return: Tuple of ids keyed by DocumentInfo key, and number of created
+      DocumentInfo objects.
+    """
+    def existing():
+        return {
+            tuple(values[1:]): values[0]
+            for values in DocumentInfo.objects.filter(
+                course_code__in={key[0] for key in keys},
+            ).values_list('id', 'course_code', *DECISION_FIELDS)
+        }
+
+    docinfo_ids = existing()
+    missing = keys - docinfo_ids.keys()
+    if missing:
+        DocumentInfo.objects.bulk_create([
+            DocumentInfo(
+                course_id=course_ids[key[0]],
+                course_code=key[0],
+                **dict(zip(DECISION_FIELDS, key[1:])),
+            )
+            for key in missing
+        ])
+        docinfo_ids = existing()
+    return docinfo_ids, len(missing)
+
+
+def _verify_sources(pairs, verifier) -> int:
+    """
+    Add verifier to the DocumentInfoSource of each (pdf, docinfo) id pair.
+
+    Missing sources and verifications are created with one query each.
+
+    :return: Number of created DocumentInfoSource objects.
+    """
+    def existing():
+        return {
+            (pdf_id, docinfo_id): source_id
+            for source_id, pdf_id, docinfo_id
+            in DocumentInfoSource.objects.filter(
+                pdf_id__in={pdf_id for pdf_id, _ in pairs},
+            ).values_list('id', 'pdf_id', 'document_info_id')
+        }
+
+    source_ids = existing()
+    missing = pairs - source_ids.keys()
+    if missing:
+        DocumentInfoSource.objects.bulk_create([
+            DocumentInfoSource(pdf_id=pdf_id, document_info_id=docinfo_id)
+            for pdf_id, docinfo_id in missing
+        ])
+        source_ids = existing()
+
+    Verification = DocumentInfoSource.verified_by.through
+    verified_sources = set(
+        Verification.objects.filter(
+            documentinfosource_id__in=[source_ids[pair] for pair in pairs],
+            user_id=verifier.pk,
+        ).values_list('documentinfosource_id', flat=True)
+    )
+    Verification.objects.bulk_create([
+        Verification(
+            documentinfosource_id=source_ids[pair],
+            user_id=verifier.pk,
+        )
+        for pair in pairs
+        if source_ids[pair] not in verified_sources
+    ])
+    return len(missing)
+
+
 class ExamsSearchForm(forms.Form):
     """Form used for searching for exam archive for specific course."""
 
@@ -0,0 +1,68 @@
+import time
+from pathlib import Path
+from statistics import mean
+
+from django.core.management.base import BaseCommand, CommandError
+
+from examiner.pdf import PdfReader, ocr_enabled
+
+
+# Keyword arguments of PdfReader for each benchmarked OCR strategy
+STRATEGIES = (
+    ('full', {}),
+    ('adaptive', {'adaptive_ocr': True}),
+    ('language', {'detect_language': True}),
+)
+
+# Scanned PDFs without text metadata used if no PDFs are given
+SAMPLE_SCANS = (
+    Path(__file__).parents[2] / 'tests' / 'data' / 'ocr.pdf',
+    Path(__file__).parents[2] / 'tests' / 'data' / 'ocr_many_pages.pdf',
+)
+
+
+class Command(BaseCommand):
+    help = 'Compare throughput and confidence of PDF OCR strategies.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'pdfs',
+            nargs='*',
+            type=str,
+            help='Paths to scanned PDFs, defaults to the test data scans.',
+        )
+
+    def handle(self, *args, **options):
+        if not ocr_enabled():
+            raise CommandError('OCR dependencies not properly installed!')
+
+        paths = [Path(path).resolve() for path in options['pdfs']]
+        paths = paths or SAMPLE_SCANS
+
+        self.stdout.write(
+            f'{"Strategy":<10}{"Pages":>8}{"Pages/min":>12}'
+            f'{"Confidence":>12}{"Escalated":>11}',
+        )
+        for strategy, reader_options in STRATEGIES:
+            pages, escalated, seconds = 0, 0, 0.0
+            confidences = []
+            for path in paths:
+                pdf = PdfReader(path=path, **reader_options)
+                start = time.perf_counter()
+                pdf.ocr_text()
+                seconds += time.perf_counter() - start
+
+                pages += len(pdf.pages)
+                escalated += pdf.escalated_pages
+                confidences.extend(
+                    confidence
+                    for confidence in pdf.page_confidences
+                    if confidence is not None
+                )
+
+            pages_per_minute = 60 * pages / seconds if seconds else 0
+            confidence = mean(confidences) if confidences else 0
+            self.stdout.write(
+                f'{strategy:<10}{pages:>8}{pages_per_minute:>12.1f}'
+                f'{confidence:>12.1f}{escalated:>11}',
+            )
@@ -0,0 +1,120 @@
+import json
+import subprocess
+import sys
+from statistics import median
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Modules of the PDF and OCR stack, which web workers should never load
+PDF_MODULES = ('examiner.pdf', 'pdftotext', 'tesserocr', 'PIL')
+
+# Run in a fresh interpreter for each measurement, printing the results as JSON
+MEASUREMENT = '''
+import json, os, resource, sys, time
+
+def rss():
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', %(settings)r)
+start_rss = rss()
+start = time.perf_counter()
+import kokekunster.wsgi
+wsgi_seconds = time.perf_counter() - start
+wsgi_rss = rss()
+loaded = [module for module in %(modules)r if module in sys.modules]
+
+start = time.perf_counter()
+import examiner.pdf
+examiner.pdf.ocr_enabled()
+pdf_seconds = time.perf_counter() - start
+
+print(json.dumps({
+    'wsgi_seconds': wsgi_seconds,
+    'wsgi_rss': wsgi_rss - start_rss,
+    'pdf_seconds': pdf_seconds,
+    'pdf_rss': rss() - wsgi_rss,
+    'loaded': loaded,
+}))
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure import time and memory of kokekunster.wsgi, and what loading '
+        'the PDF and OCR stack on top of it would cost each web worker.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--runs',
+            type=int,
+            default=5,
+            dest='runs',
+            help='Number of fresh interpreters measured.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=3,
+            dest='workers',
+            help='Number of web workers, as configured for gunicorn.',
+        )
+
+    def handle(self, *args, **options):
+        code = MEASUREMENT % {
+            'settings': settings.SETTINGS_MODULE,
+            'modules': PDF_MODULES,
+        }
+        measurements = []
+        for _ in range(options['runs']):
+            process = subprocess.run(
+                [sys.executable, '-c', code],
+                cwd=settings.BASE_DIR,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+            if process.returncode != 0:
+                raise CommandError(process.stderr.decode('utf-8'))
+            measurements.append(json.loads(
+                process.stdout.decode('utf-8').splitlines()[-1],
+            ))
+
+        loaded = sorted({
+            module
+            for measurement in measurements
+            for module in measurement['loaded']
+        })
+        if loaded:
+            self.stdout.write(self.style.ERROR(
+                f'Loaded by kokekunster.wsgi: {", ".join(loaded)}',
+            ))
+
+        wsgi_seconds = median(m['wsgi_seconds'] for m in measurements)
+        wsgi_rss = median(m['wsgi_rss'] for m in measurements)
+        pdf_seconds = median(m['pdf_seconds'] for m in measurements)
+        pdf_rss = median(m['pdf_rss'] for m in measurements)
+
+        self.stdout.write(f'{"":<24}{"Seconds":>10}{"RSS MB":>10}')
+        self.stdout.write(
+            f'{"kokekunster.wsgi":<24}{wsgi_seconds:>10.3f}'
+            f'{wsgi_rss / 1e6:>10.1f}',
+        )
+        self.stdout.write(
+            f'{"PDF and OCR stack":<24}{pdf_seconds:>10.3f}'
+            f'{pdf_rss / 1e6:>10.1f}',
+        )
+        if not loaded:
+            workers = options['workers']
+            self.stdout.write(self.style.SUCCESS(
+                f'Saved by {workers} workers: {pdf_seconds * workers:.3f} s '
+                f'startup, {pdf_rss * workers / 1e6:.1f} MB RSS',
+            ))
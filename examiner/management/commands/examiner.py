@@ -1,4 +1,11 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+
 from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
 from django.db.models import Q
 
 from tqdm import tqdm
@@ -8,9 +15,11 @@ from examiner.crawlers import (
     MathematicalSciencesCrawler,
     PhysicsCrawler,
 )
-from examiner.models import Pdf, PdfUrl
+from examiner.models import Pdf, PdfPage, PdfUrl
 from examiner.parsers import PdfParser
-from examiner.pdf import OCR_ENABLED
+from examiner.pdf import ocr_enabled, read_text_layer
+from examiner.timing import PipelineReport, record, recording, timed_call
+from kokekunster.conditional import deferred_content_versions
 from semesterpage.models import Course
 
 
@@ -36,6 +45,23 @@ class Command(BaseCommand):
             dest='classify',
             help='Read and classify content of PDF backups.',
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            dest='workers',
+            help='Number of processes reading PDF text layers when classifying.',
+        )
+        parser.add_argument(
+            '--report',
+            type=str,
+            default=None,
+            dest='report',
+            help=(
+                'Write timings of each pipeline stage to this file, as CSV '
+                'if it ends with .csv, else as JSON.'
+            ),
+        )
         parser.add_argument(
             '--test',
             action='store_true',
@@ -66,16 +92,36 @@ class Command(BaseCommand):
         course_code = options['course_code'].upper()
         retry = options['retry']
 
-        if options['crawl']:
-            self.crawl(course_code=course_code)
-        if options['backup']:
-            if not OCR_ENABLED:
-                raise CommandError('OCR dependencies not properly installed!')
-            self.backup(course_code=course_code, retry=retry)
-        if options['classify']:
-            if not OCR_ENABLED:
-                raise CommandError('OCR dependencies not properly installed!')
-            self.classify()
+        with ExitStack() as stack:
+            # Exam pages are invalidated once, when all changes are done
+            stack.enter_context(deferred_content_versions())
+
+            report = None
+            if options['report']:
+                report = stack.enter_context(recording())
+
+            if options['crawl']:
+                self.crawl(course_code=course_code)
+            if options['backup']:
+                if not ocr_enabled():
+                    raise CommandError(
+                        'OCR dependencies not properly installed!',
+                    )
+                self.backup(course_code=course_code, retry=retry)
+            if options['classify']:
+                if not ocr_enabled():
+                    raise CommandError(
+                        'OCR dependencies not properly installed!',
+                    )
+                self.classify(workers=options['workers'])
+
+        if report:
+            report.write(options['report'])
+            self.write_report(report)
+            self.stdout.write(self.style.SUCCESS(
+                f'Report written to {options["report"]}',
+            ))
+
         if options['test']:
             self.test(gui=options['gui'])
 
@@ -103,13 +149,18 @@ class Command(BaseCommand):
 
         for crawler in crawlers:
             self.stdout.write(self.style.SUCCESS(repr(crawler)))
+            start = time.perf_counter()
             for url in crawler.pdf_urls():
+                # Time spent by the crawler on finding this URL
+                record('crawl', time.perf_counter() - start, item=url)
+
                 exam_url, new = PdfUrl.objects.get_or_create(url=url)
                 exam_url.classify()
                 self.stdout.write(f' * {repr(exam_url.exam)}\n   {url}')
 
                 if new:
                     new_urls += 1
+                start = time.perf_counter()
 
         self.stdout.write(self.style.SUCCESS(f'{new_urls} new URLs found!'))
 
@@ -127,8 +178,14 @@ class Command(BaseCommand):
 
         new_backups = 0
         for exam_url in exam_urls:
-            new = exam_url.backup_file()
+            new = exam_url.backup_file(
+                read=True,
+                allow_ocr=True,
+                preview=True,
+            )
             if new:
+                # The text has already been read during the backup
+                exam_url.scraped_pdf.classify(read=False, save=True)
                 new_backups += 1
                 self.stdout.write('[NEW]', ending='')
             self.stdout.write(f'Backed up {exam_url.url}')
@@ -137,13 +194,22 @@ class Command(BaseCommand):
             f'{new_backups} new PDFs backed up!',
         ))
 
-    def classify(self) -> None:
+    def classify(self, workers: int) -> None:
         """
         Read content of backed up PDF files and classify content incl. URLs.
+
+        PDFs with a text layer are first read in parallel, see
+        read_text_layers. The remaining PDFs are read with OCR when
+        classified.
         """
+        read = self.read_text_layers(workers=workers)
+        self.stdout.write(self.style.SUCCESS(
+            f'{read} PDFs read from their text layer!',
+        ))
+
         successes = 0
         errors = 0
-        for pdf in Pdf.objects.all():
+        for pdf in Pdf.objects.iterator():
             try:
                 classify_success = pdf.classify(
                     read=True,
@@ -158,6 +224,8 @@ class Command(BaseCommand):
                 self.stdout.write(self.style.ERROR(f'PDF classify error!'))
                 continue
 
+            # Previews are used when the classification is verified
+            pdf.create_preview()
             self.stdout.write(self.style.SUCCESS(
                 f'PDF with {pdf.pages.count()} saved pages. '
                 f'Exam: {repr(pdf.exams.first())}',
@@ -172,6 +240,102 @@ class Command(BaseCommand):
         for url in tqdm(PdfUrl.objects.all()):
             url.classify()
 
+    def read_text_layers(self, workers: int) -> int:
+        """
+        Read text layers of unread PDFs with a pool of worker processes.
+
+        This process is the single database writer, persisting the pages of
+        each PDF with one query. The ids of the unread PDFs are read up front,
+        but at most a few PDFs per worker are in flight, so the text held in
+        memory is bounded regardless of the number of PDFs.
+
+        :param workers: Number of worker processes.
+        :return: Number of PDFs which text layer could be read.
+        """
+        storage = Pdf._meta.get_field('file').storage
+        unread = list(
+            Pdf.objects
+            .filter(pages__isnull=True)
+            .values_list('id', 'sha1_hash', 'file')
+        )
+
+        # The forked worker processes should not inherit the DB connection,
+        # which is reopened by this process when the first pages are saved
+        connection.close()
+
+        read = 0
+        pending = deque()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for pdf_id, sha1_hash, name in tqdm(
+                unread,
+                desc='PDF text layers',
+            ):
+                pending.append((
+                    pdf_id,
+                    sha1_hash,
+                    executor.submit(
+                        timed_call,
+                        read_text_layer,
+                        storage.path(name),
+                    ),
+                ))
+                if len(pending) >= 4 * workers:
+                    read += self._save_pages(*pending.popleft())
+
+            while pending:
+                read += self._save_pages(*pending.popleft())
+
+        return read
+
+    @staticmethod
+    def _save_pages(pdf_id, sha1_hash, future) -> bool:
+        """
+        Persist pages read by worker process, return True if any.
+
+        Timings are recorded by SHA1 hash, like those of the other stages.
+        """
+        try:
+            pages, seconds = future.result()
+        except Exception:
+            return False
+
+        # The worker processes can not record to the report themselves
+        record('pdftotext', seconds, item=sha1_hash, pages=len(pages or []))
+        if not pages:
+            return False
+
+        start = time.perf_counter()
+        PdfPage.objects.bulk_create([
+            PdfPage(pdf_id=pdf_id, number=number, text=text)
+            for number, text in enumerate(pages)
+        ])
+        record(
+            'db',
+            time.perf_counter() - start,
+            item=sha1_hash,
+            pages=len(pages),
+        )
+        return True
+
+    def write_report(self, report: PipelineReport) -> None:
+        """Write summary of the timings of each pipeline stage."""
+        self.stdout.write(
+            f'{"Stage":<12}{"Count":>8}{"Total s":>10}{"p50 s":>10}'
+            f'{"p95 s":>10}{"p99 s":>10}{"Pages/s":>10}{"MB/s":>10}',
+        )
+        for stage in report.summary():
+            pages_per_second = stage['pages_per_second'] or 0
+            megabytes_per_second = (stage['bytes_per_second'] or 0) / 1e6
+            self.stdout.write(
+                f'{stage["stage"]:<12}{stage["count"]:>8}'
+                f'{stage["total_seconds"]:>10.2f}'
+                f'{stage["p50_seconds"]:>10.3f}'
+                f'{stage["p95_seconds"]:>10.3f}'
+                f'{stage["p99_seconds"]:>10.3f}'
+                f'{pages_per_second:>10.1f}'
+                f'{megabytes_per_second:>10.2f}',
+            )
+
     def test(self, gui: bool = False) -> None:
         pdfs = Pdf.objects.all()
         for pdf in pdfs:
@@ -205,9 +369,8 @@ class Command(BaseCommand):
                 if answer == 'r':
                     url = pdf.hosted_at.first()
                     pdf.delete()
-                    url.backup_file()
+                    url.backup_file(read=True, allow_ocr=True)
                     pdf = url.scraped_pdf
-                    pdf.read_text(allow_ocr=True)
                     continue
                 if answer == 'o':
                     pdf.pages.all().delete()
@@ -0,0 +1,167 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+import requests
+
+from examiner.replay import (
+    CRAWLERS,
+    FixtureArchive,
+    benchmark,
+    crawl,
+    recording,
+)
+from semesterpage.models import Course
+
+
+class Command(BaseCommand):
+    help = (
+        'Record exam sites into a fixture archive, or benchmark the crawlers '
+        'against a local replay of such an archive.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'archive',
+            type=str,
+            help='Path to fixture archive (zip file).',
+        )
+        parser.add_argument(
+            '--record',
+            action='store_true',
+            dest='record',
+            help='Record the live sites into the archive, instead of replaying.',
+        )
+        parser.add_argument(
+            '--pdfs',
+            action='store_true',
+            dest='pdfs',
+            help='Also record the PDFs found by the crawlers.',
+        )
+        parser.add_argument(
+            '--crawlers',
+            nargs='+',
+            choices=CRAWLERS,
+            default=CRAWLERS,
+            dest='crawlers',
+            help='Crawlers to record.',
+        )
+        parser.add_argument(
+            '--courses',
+            nargs='+',
+            default=None,
+            dest='courses',
+            help=(
+                'Course codes recorded for the Mathematical Sciences crawler, '
+                'defaults to all TMA and MA courses.'
+            ),
+        )
+        parser.add_argument(
+            '--concurrency',
+            nargs='+',
+            type=int,
+            default=[1, 2, 4, 8],
+            dest='concurrency',
+            help='Numbers of courses crawled concurrently when replaying.',
+        )
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=0.05,
+            dest='latency',
+            help='Seconds each replayed response is delayed.',
+        )
+        parser.add_argument(
+            '--failure-rate',
+            type=float,
+            default=0.0,
+            dest='failure_rate',
+            help='Fraction of replayed requests answered with an error.',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=None,
+            dest='seed',
+            help='Seed of the injected failures.',
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            default=None,
+            dest='output',
+            help='Write the benchmark results to this JSON file.',
+        )
+
+    def handle(self, *args, **options):
+        if options['record']:
+            self.record(
+                path=Path(options['archive']),
+                crawlers=options['crawlers'],
+                course_codes=options['courses'],
+                pdfs=options['pdfs'],
+            )
+            return
+
+        try:
+            archive = FixtureArchive.load(options['archive'])
+        except (OSError, KeyError, ValueError) as error:
+            raise CommandError(f'Could not read fixture archive: {error}')
+
+        results = benchmark(
+            archive,
+            concurrency_levels=tuple(options['concurrency']),
+            latency=options['latency'],
+            failure_rate=options['failure_rate'],
+            seed=options['seed'],
+        )
+        self.stdout.write(
+            f'{"Crawler":<24}{"Workers":>8}{"URLs":>8}{"Seconds":>10}'
+            f'{"URLs/s":>10}{"Requests":>10}{"Failures":>10}',
+        )
+        for result in results:
+            self.stdout.write(
+                f'{result["crawler"]:<24}{result["concurrency"]:>8}'
+                f'{result["urls"]:>8}{result["seconds"]:>10.2f}'
+                f'{result["urls_per_second"]:>10.1f}'
+                f'{result["requests"]:>10}{result["failures"]:>10}',
+            )
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(results, indent=2))
+
+    def record(self, path, crawlers, course_codes, pdfs) -> None:
+        """Crawl the live sites once, recording every response."""
+        if course_codes is None:
+            course_codes = (
+                Course.objects
+                .filter(
+                    Q(course_code__startswith='TMA') |
+                    Q(course_code__startswith='MA')
+                )
+                .values_list('course_code', flat=True)
+            )
+        archive = FixtureArchive(
+            crawlers=crawlers,
+            course_codes=[course_code.upper() for course_code in course_codes],
+        )
+
+        with recording(archive):
+            for crawler in crawlers:
+                self.stdout.write(f'Recording {crawler}')
+                urls = set(crawl(crawler, course_codes=archive.course_codes))
+                self.stdout.write(f'{len(urls)} PDF URLs found')
+                if not pdfs:
+                    continue
+                for url in urls:
+                    try:
+                        requests.get(url, timeout=30)
+                    except Exception:
+                        self.stdout.write(self.style.ERROR(f'Failed: {url}'))
+
+        archive.save(path)
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(archive.responses)} responses recorded to {path}',
+        ))
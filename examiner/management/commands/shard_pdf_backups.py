@@ -0,0 +1,56 @@
+import os
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from tqdm import tqdm
+
+from examiner.models import Pdf
+from examiner.storage import sharded_path
+
+
+class Command(BaseCommand):
+    help = 'Move PDF backups from the flat backup directory to sharded paths.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            dest='dry_run',
+            help='Only report which files would have been moved.',
+        )
+
+    def handle(self, *args, **options):
+        moved, missing = 0, 0
+        for pdf in tqdm(Pdf.objects.only('id', 'sha1_hash', 'file')):
+            extension = os.path.splitext(pdf.file.name)[1] or '.pdf'
+            new_name = sharded_path(pdf.sha1_hash, extension)
+            if pdf.file.name == new_name:
+                continue
+
+            old_path = Path(pdf.file.path)
+            new_path = Path(pdf.file.storage.path(new_name))
+            if options['dry_run']:
+                tqdm.write(f'[MOVE] {pdf.file.name} -> {new_name}')
+                moved += 1
+                continue
+
+            if old_path.exists():
+                new_path.parent.mkdir(parents=True, exist_ok=True)
+                # Atomic within the same file system, overwriting any
+                # identical copy already stored at the sharded path
+                os.replace(str(old_path), str(new_path))
+            elif not new_path.exists():
+                tqdm.write(f'[MISSING] {pdf.file.name}')
+                missing += 1
+                continue
+
+            # Queryset update, as the file itself should not be saved anew
+            Pdf.objects.filter(pk=pdf.pk).update(file=new_name)
+            moved += 1
+
+        self.stdout.write(self.style.SUCCESS(f'{moved} PDF backups moved'))
+        if missing:
+            self.stdout.write(
+                self.style.WARNING(f'{missing} PDF backups missing on disk'),
+            )
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.2 on 2019-02-02 14:12
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import examiner.models
+import examiner.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('examiner', '0002_auto_20190125_1255'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pdf',
+            name='file',
+            field=models.FileField(help_text='Kopi av fil hostet på en url.', storage=examiner.storage.ContentAddressedStorage(), upload_to=examiner.models.upload_path),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.2 on 2019-02-03 16:40
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('examiner', '0003_pdf_file_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pdf',
+            name='downloads',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Antall nedlastinger av PDFen.'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.2 on 2019-02-06 19:21
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('examiner', '0004_pdf_downloads'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OcrResult',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha1_hash', models.CharField(help_text='SHA1 hash av PDF-filen.', max_length=40)),
+                ('page_number', models.PositiveSmallIntegerField(help_text='Sidetall, nullindeksert.')),
+                ('device', models.CharField(help_text='GhostScript-enhet brukt for rendring av siden.', max_length=20)),
+                ('resolution', models.PositiveSmallIntegerField(help_text='Oppløsning (DPI) brukt for rendring av siden.')),
+                ('languages', models.CharField(help_text='Tesseract-språkmodeller, f.eks. "nor+eng+equ".', max_length=50)),
+                ('tesseract_version', models.CharField(help_text='Tesseract-versjon brukt for OCR.', max_length=50)),
+                ('text', models.TextField(blank=True, help_text='Sideinnhold i rent tekstformat.')),
+                ('word_confidences', models.TextField(blank=True, help_text='Mellomromseparerte konfidenser til hvert ord.')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='ocrresult',
+            unique_together=set([('sha1_hash', 'page_number', 'device', 'resolution', 'languages', 'tesseract_version')]),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.2 on 2019-02-08 13:05
+from __future__ import unicode_literals
+
+import random
+
+from django.db import migrations, models
+
+
+def randomize_keys(apps, schema_editor):
+    """Give each existing PDF its own random key, not the same default."""
+    Pdf = apps.get_model('examiner', 'Pdf')
+    for pdf_id in Pdf.objects.values_list('id', flat=True).iterator():
+        Pdf.objects.filter(id=pdf_id).update(random_key=random.random())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('examiner', '0005_ocrresult'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pdf',
+            name='random_key',
+            field=models.FloatField(db_index=True, default=random.random, editable=False, help_text='Tilfeldig nøkkel brukt for tilfeldig utvalg av PDFer.'),
+        ),
+        migrations.RunPython(randomize_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.2 on 2019-02-09 10:47
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('examiner', '0006_pdf_random_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pdf',
+            name='leased_to',
+            field=models.ForeignKey(blank=True, editable=False, help_text='Bruker som verifiserer PDFen.', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='leased_pdfs', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='pdf',
+            name='leased_until',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Tidspunkt verifiseringen av PDFen er reservert til.', null=True),
+        ),
+        migrations.AddField(
+            model_name='pdf',
+            name='uncertainty',
+            field=models.FloatField(db_index=True, default=0, editable=False, help_text='Usikkerhet i klassifiseringen av PDFen.'),
+        ),
+    ]
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.2 on 2019-02-16 11:20
+from __future__ import unicode_literals
+
+import random
+
+from django.db import migrations, models
+
+
+def backfill_verification_queue(apps, schema_editor):
+    """
+    Queue unverified PDFs, ordered by the uncertainty of their classification.
+
+    PDFs classified before 0007_pdf_verification_queue were given no
+    uncertainty, and would otherwise never be prioritized.
+    """
+    # Imported here, as the uncertainty is given by the current PDF parser
+    from examiner.models import Pdf as CurrentPdf
+    from examiner.parsers import PdfParser
+
+    Pdf = apps.get_model('examiner', 'Pdf')
+    DocumentInfo = apps.get_model('examiner', 'DocumentInfo')
+    DocumentInfoSource = apps.get_model('examiner', 'DocumentInfoSource')
+
+    unverified_ids = (
+        DocumentInfoSource.objects
+        .filter(verified_by__isnull=True)
+        .values_list('pdf_id', flat=True)
+        .distinct()
+    )
+    for pdf in Pdf.objects.filter(id__in=unverified_ids).iterator():
+        first_page = pdf.pages.filter(number=0).first()
+        if first_page is None:
+            uncertainty = pdf.uncertainty
+        else:
+            uncertainty = CurrentPdf.classification_uncertainty(
+                pdf,
+                pdf_parser=PdfParser(text=first_page.text),
+                doc_infos=DocumentInfo.objects.filter(urls__scraped_pdf=pdf),
+            )
+        Pdf.objects.filter(id=pdf.id).update(
+            needs_verification=True,
+            uncertainty=uncertainty,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('examiner', '0007_pdf_verification_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pdf',
+            name='needs_verification',
+            field=models.BooleanField(default=False, editable=False, help_text='Om PDFen har uverifiserte eksamenssett.'),
+        ),
+        migrations.AlterField(
+            model_name='pdf',
+            name='random_key',
+            field=models.FloatField(default=random.random, editable=False, help_text='Tilfeldig nøkkel brukt for tilfeldig utvalg av PDFer.'),
+        ),
+        migrations.AlterField(
+            model_name='pdf',
+            name='uncertainty',
+            field=models.FloatField(default=0, editable=False, help_text='Usikkerhet i klassifiseringen av PDFen.'),
+        ),
+        migrations.AddIndex(
+            model_name='pdf',
+            index=models.Index(fields=['needs_verification', '-uncertainty', 'random_key'], name='examiner_pdf_queue_idx'),
+        ),
+        migrations.RunPython(
+            backfill_verification_queue,
+            migrations.RunPython.noop,
+        ),
+    ]
@@ -1,8 +1,24 @@
 import hashlib
+import os
 import re
+import time
+from datetime import timedelta
 from gettext import gettext as _
+from itertools import islice
+from pathlib import Path
+from random import random
 from tempfile import NamedTemporaryFile
+from typing import (
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    TYPE_CHECKING,
+    Tuple,
+)
 
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.files import File
 from django.core.validators import (
@@ -12,16 +28,27 @@ from django.core.validators import (
     URLValidator,
     ValidationError,
 )
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, Exists, OuterRef, Q, Value, When
 from django.shortcuts import reverse
 from django.utils import timezone
 
 import requests
 
 from examiner.parsers import ExamURLParser, PdfParser, Season
-from examiner.pdf import PdfReader, PdfReaderException
+from examiner.storage import (
+    BACKUP_DIRECTORY,
+    ContentAddressedStorage,
+    preview_path,
+    sharded_path,
+)
+from examiner.timing import record, timed
 from semesterpage.models import Course
 
+if TYPE_CHECKING:
+    # The PDF and OCR libraries are only imported when text is extracted
+    from examiner.pdf import PdfReader
+
 
 class ExamRelatedCourse(models.Model):
     """
@@ -151,7 +178,7 @@ class DocumentInfoQueryset(models.QuerySet):
 
                 pdf_urls = pdf.hosted_at
                 pdf_dict = {
-                    'backup_url': pdf.file.url,
+                    'backup_url': pdf.get_file_url(),
                     'urls': list(pdf_urls.values_list('url', flat=True)),
                     'filename': pdf_urls.first().filename,
                     'text': pdf.text,
@@ -302,9 +329,64 @@ class DocumentInfo(models.Model):
         super().save(*args, **kwargs)
 
 
+# Maximum number of PdfPage objects inserted per query
+PAGE_BATCH_SIZE = 100
+
+# Duration a PDF is reserved for a single verifier, see PdfQueryset.lease
+VERIFICATION_LEASE = timedelta(minutes=15)
+
+# Maximum number of PDFs tried leased before giving up due to contention
+LEASE_ATTEMPTS = 10
+
+# OCR strategies used when reading PDFs, see examiner.pdf.PdfReader
+ADAPTIVE_OCR = getattr(settings, 'EXAMINER_ADAPTIVE_OCR', False)
+DETECT_LANGUAGE = getattr(settings, 'EXAMINER_DETECT_LANGUAGE', False)
+
+
+def extract_text(
+    path: str,
+    allow_ocr: bool = False,
+    force_ocr: bool = False,
+    adaptive_ocr: bool = ADAPTIVE_OCR,
+    detect_language: bool = DETECT_LANGUAGE,
+    sha1_hash: Optional[str] = None,
+) -> Optional['PdfReader']:
+    """
+    Return PdfReader with text read from the PDF at path.
+
+    :param adaptive_ocr: See PdfReader, defaults to EXAMINER_ADAPTIVE_OCR.
+    :param detect_language: See PdfReader, defaults to
+      EXAMINER_DETECT_LANGUAGE.
+    :param sha1_hash: SHA1 hash of the PDF, used for caching OCR results.
+    :return: None if the text could not be read.
+    """
+    # Imported on first use, as web processes never extract text
+    from examiner.pdf import PdfReader, PdfReaderException
+
+    pdf = PdfReader(
+        path=path,
+        adaptive_ocr=adaptive_ocr,
+        detect_language=detect_language,
+        sha1_hash=sha1_hash,
+    )
+    try:
+        pdf.read_text(allow_ocr=allow_ocr, force_ocr=force_ocr)
+    except PdfReaderException:
+        return None
+    return pdf
+
+
 def upload_path(instance, filename):
-    """Return path to save FileBackup.file backups."""
-    return f'examiner/FileBackup/' + filename
+    """
+    Return path to save FileBackup.file backups.
+
+    Files named by their SHA1 hash are sharded by hash prefix, see
+    examiner.storage.sharded_path.
+    """
+    sha1_hash, extension = os.path.splitext(filename)
+    if re.fullmatch(r'[0-9a-f]{40}', sha1_hash):
+        return sharded_path(sha1_hash, extension)
+    return BACKUP_DIRECTORY + '/' + filename
 
 
 class DocumentInfoSource(models.Model):
@@ -334,9 +416,97 @@ class DocumentInfoSource(models.Model):
     )
 
 
+class PdfQueryset(models.QuerySet):
+    def unverified(self) -> 'PdfQueryset':
+        """Return PDFs with at least one unverified DocumentInfoSource."""
+        unverified_sources = DocumentInfoSource.objects.filter(
+            pdf=OuterRef('pk'),
+            verified_by__isnull=True,
+        )
+        return (
+            self
+            .annotate(unverified=Exists(unverified_sources))
+            .filter(unverified=True)
+        )
+
+    def update_needs_verification(self) -> None:
+        """Recompute Pdf.needs_verification for the PDFs in the queryset."""
+        unverified_ids = set(
+            DocumentInfoSource.objects
+            .filter(pdf__in=self, verified_by__isnull=True)
+            .values_list('pdf_id', flat=True)
+        )
+        self.filter(pk__in=unverified_ids).update(needs_verification=True)
+        self.exclude(pk__in=unverified_ids).update(needs_verification=False)
+
+    def lease(self, user: User) -> Optional['Pdf']:
+        """
+        Lease the most uncertainly classified unverified PDF to the user.
+
+        A PDF already leased to the user is returned again, with its lease
+        renewed. Otherwise the verification queue is scanned in the order of
+        the index on (needs_verification, -uncertainty, random_key), skipping
+        PDFs leased to other users until their lease expires, such that
+        concurrent verifiers are given different PDFs. Ties in uncertainty
+        are broken by the random Pdf.random_key.
+
+        The lease is claimed with a conditional UPDATE, making it safe across
+        several worker processes.
+
+        :return: Leased PDF, None if no PDF is available.
+        """
+        now = timezone.now()
+        leased_until = now + VERIFICATION_LEASE
+        own_lease = (
+            self
+            .filter(leased_to=user, leased_until__gte=now)
+            .values_list('id', flat=True)
+            .first()
+        )
+        if own_lease is not None:
+            Pdf.objects.filter(pk=own_lease).update(leased_until=leased_until)
+            return Pdf.objects.get(pk=own_lease)
+
+        available = Q(leased_until__isnull=True) | Q(leased_until__lt=now)
+        candidates = (
+            self
+            .filter(available, needs_verification=True)
+            .order_by('-uncertainty', 'random_key')
+            .values_list('id', flat=True)
+        )
+        for pdf_id in candidates[:LEASE_ATTEMPTS]:
+            claimed = Pdf.objects.filter(available, pk=pdf_id).update(
+                leased_to=user,
+                leased_until=leased_until,
+            )
+            if claimed:
+                return Pdf.objects.get(pk=pdf_id)
+        return None
+
+    def release(self, user: User) -> int:
+        """Release the leases of the user on the PDFs in the queryset."""
+        return self.filter(leased_to=user).update(
+            leased_to=None,
+            leased_until=None,
+        )
+
+    def skip(self, user: User) -> int:
+        """
+        Skip the PDFs in the queryset leased to the user.
+
+        The PDFs are kept out of the verification queue for the duration of a
+        lease, such that the next lease gives the user another PDF.
+        """
+        return self.filter(leased_to=user).update(
+            leased_to=None,
+            leased_until=timezone.now() + VERIFICATION_LEASE,
+        )
+
+
 class Pdf(models.Model):
     file = models.FileField(
         upload_to=upload_path,
+        storage=ContentAddressedStorage(),
         help_text=_('Kopi av fil hostet på en url.'),
     )
     sha1_hash = models.CharField(
@@ -355,13 +525,62 @@ class Pdf(models.Model):
         related_name='pdfs',
         help_text=_('Hvilke eksamenssett PDFen trolig inneholder.'),
     )
+    downloads = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text=_('Antall nedlastinger av PDFen.'),
+    )
+    random_key = models.FloatField(
+        default=random,
+        editable=False,
+        help_text=_('Tilfeldig nøkkel brukt for tilfeldig utvalg av PDFer.'),
+    )
+    uncertainty = models.FloatField(
+        default=0,
+        editable=False,
+        help_text=_('Usikkerhet i klassifiseringen av PDFen.'),
+    )
+    needs_verification = models.BooleanField(
+        default=False,
+        editable=False,
+        help_text=_('Om PDFen har uverifiserte eksamenssett.'),
+    )
+    leased_to = models.ForeignKey(
+        to=User,
+        null=True,
+        blank=True,
+        editable=False,
+        on_delete=models.SET_NULL,
+        related_name='leased_pdfs',
+        help_text=_('Bruker som verifiserer PDFen.'),
+    )
+    leased_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text=_('Tidspunkt verifiseringen av PDFen er reservert til.'),
+    )
     created_at = models.DateTimeField(editable=False)
     updated_at = models.DateTimeField()
 
+    objects = PdfQueryset.as_manager()
+
+    class Meta:
+        indexes = [
+            # Serves the ordering of the verification queue, see
+            # PdfQueryset.lease
+            models.Index(
+                fields=['needs_verification', '-uncertainty', 'random_key'],
+                name='examiner_pdf_queue_idx',
+            ),
+        ]
+
     def read_text(
         self,
         allow_ocr: bool = False,
         force_ocr: bool = False,
+        adaptive_ocr: bool = ADAPTIVE_OCR,
+        detect_language: bool = DETECT_LANGUAGE,
     ) -> bool:
         """
         Read text from pdf and save result to self.text.
@@ -373,27 +592,122 @@ class Pdf(models.Model):
           from non-indexed PDF files.
         :param force_ocr: If True, OCR will be used even if text content can
           be read directly from the PDF.
+        :param adaptive_ocr: If True, pages are OCRed from cheaper renderings
+          first, see PdfReader.
+        :param detect_language: If True, only the language model detected from
+          the first page is used for the remaining pages, see PdfReader.
         :return: True if pages were actually read and persisted.
         """
-        pdf = PdfReader(path=self.file.path)
-        try:
-            pdf.read_text(allow_ocr=allow_ocr, force_ocr=force_ocr)
-        except PdfReaderException:
-            return False
+        if not allow_ocr and not force_ocr:
+            from examiner.pdf import PdfReader, PdfReaderException
+
+            # The text layer is streamed to the database page by page
+            try:
+                pages = PdfReader(path=self.file.path).iter_pages()
+                return self._bulk_create_pages(
+                    (page, None) for page in pages
+                )
+            except PdfReaderException:
+                return False
 
-        pages = pdf.pages
-        if len(pages) == 0:
+        pdf = extract_text(
+            path=self.file.path,
+            allow_ocr=allow_ocr,
+            force_ocr=force_ocr,
+            adaptive_ocr=adaptive_ocr,
+            detect_language=detect_language,
+            sha1_hash=self.sha1_hash,
+        )
+        return self.create_pages(pdf)
+
+    def create_pages(self, pdf: Optional['PdfReader']) -> bool:
+        """
+        Persist pages read by a PdfReader as PdfPage objects.
+
+        Pages are not persisted if all of them are empty, e.g. a scanned PDF
+        read without OCR, such that the PDF is read anew by classify().
+
+        :param pdf: PdfReader which text has been read, see extract_text.
+        :return: True if any pages were persisted.
+        """
+        if pdf is None or not getattr(pdf, 'pages', None):
             return False
+        if all(len(page.strip()) <= 1 for page in pdf.pages):
+            return False
+        return self._bulk_create_pages(zip(pdf.pages, pdf.page_confidences))
 
-        for page_number, page in enumerate(pdf.pages):
-            PdfPage.objects.create(
-                pdf=self,
-                number=page_number,
-                text=page,
-                confidence=pdf.page_confidences[page_number],
-            )
+    def _bulk_create_pages(
+        self,
+        pages: Iterable[Tuple[str, Optional[int]]],
+    ) -> bool:
+        """
+        Persist pages in batches of PAGE_BATCH_SIZE pages per query.
+
+        :param pages: Iterable of text and confidence of each page, which is
+          consumed lazily.
+        :return: True if any pages were persisted.
+        """
+        pages = enumerate(pages)
+        created = False
+        while True:
+            batch = [
+                PdfPage(
+                    pdf=self,
+                    number=page_number,
+                    text=text,
+                    confidence=confidence,
+                )
+                for page_number, (text, confidence)
+                in islice(pages, PAGE_BATCH_SIZE)
+            ]
+            if not batch:
+                return created
+            with timed('db', item=self.sha1_hash) as counts:
+                PdfPage.objects.bulk_create(batch)
+                counts['pages'] = len(batch)
+            created = True
+
+    def iter_page_texts(self) -> Iterator[str]:
+        """Yield the text of each page, without caching the queryset."""
+        return (
+            self.pages
+            .order_by('number')
+            .values_list('text', flat=True)
+            .iterator()
+        )
+
+    def create_preview(self, path: Optional[str] = None) -> bool:
+        """
+        Render and store a preview image of the PDF, unless already stored.
+
+        The preview is stored next to the PDF, see examiner.storage.
+
+        :param path: Optional path to a local copy of the PDF, for instance
+          the download of PdfUrl.backup_file.
+        :return: True if the preview is stored.
+        """
+        name = preview_path(self.sha1_hash)
+        storage = self.file.storage
+        if storage.exists(name):
+            return True
+
+        from examiner.pdf import PdfReader
+
+        pdf = PdfReader(path=path or self.file.path)
+        with NamedTemporaryFile(suffix='.jpg') as preview:
+            with timed('preview', item=self.sha1_hash):
+                if not pdf.render_preview(output_file=Path(preview.name)):
+                    return False
+            storage.save(name, File(preview))
         return True
 
+    @property
+    def preview_url(self) -> Optional[str]:
+        """Return URL to preview image of the PDF, None if not rendered."""
+        name = preview_path(self.sha1_hash)
+        storage = self.file.storage
+        return storage.url(name) if storage.exists(name) else None
+
     @property
     def text(self) -> str:
         """
@@ -401,7 +715,7 @@ class Pdf(models.Model):
 
         Pages are separated by pagebreaks, i.e. '\f'.
         """
-        return '\f'.join([page.text for page in self.pages.all()])
+        return '\f'.join(self.iter_page_texts())
 
     def classify(
         self,
@@ -439,11 +753,18 @@ class Pdf(models.Model):
         ):
             return True
 
-        pdf_parser = PdfParser(text=first_page.text)
+        with timed('parse', item=self.sha1_hash):
+            pdf_parser = PdfParser(text=first_page.text)
 
         # All the document informations belonging to URLs which host this PDF
         doc_infos = DocumentInfo.objects.filter(urls__scraped_pdf=self)
 
+        # Used for prioritizing the verification of this PDF
+        self.uncertainty = self.classification_uncertainty(
+            pdf_parser=pdf_parser,
+            doc_infos=doc_infos,
+        )
+
         # The solutions parsers are relatively conservative, so we can OR
         # determine it from all the parsers.
         solutions = any([
@@ -488,26 +809,79 @@ class Pdf(models.Model):
                 ordered_field_values.first()[0],
             )
 
-        # Delete old relations that are NOT verified
-        DocumentInfoSource.objects.filter(pdf=self, verified_by=None).delete()
-
-        for course_code in course_codes:
-            # Get docinfos model object which this PDF is related to
-            docinfo, _ = DocumentInfo.objects.get_or_create(
-                course_code=course_code,
-                language=pdf_parser.language,
-                year=pdf_parser.year,
-                season=pdf_parser.season,
-                solutions=solutions,
-                content_type=pdf_parser.content_type,
-            )
+        with timed('db', item=self.sha1_hash):
+            # Delete old relations that are NOT verified
+            DocumentInfoSource.objects.filter(
+                pdf=self,
+                verified_by=None,
+            ).delete()
+
+            for course_code in course_codes:
+                # Get docinfos model object which this PDF is related to
+                docinfo, _ = DocumentInfo.objects.get_or_create(
+                    course_code=course_code,
+                    language=pdf_parser.language,
+                    year=pdf_parser.year,
+                    season=pdf_parser.season,
+                    solutions=solutions,
+                    content_type=pdf_parser.content_type,
+                )
+
+                # And create the new relation
+                DocumentInfoSource.objects.create(
+                    document_info=docinfo,
+                    pdf=self,
+                )
+            self.needs_verification = True
+
+            if save:
+                self.save()
+        return True
 
-            # And create the new relation
-            DocumentInfoSource.objects.create(document_info=docinfo, pdf=self)
+    def classification_uncertainty(
+        self,
+        pdf_parser: PdfParser,
+        doc_infos: DocumentInfoQueryset,
+    ) -> float:
+        """
+        Return uncertainty of the classification of the PDF.
 
-        if save:
-            self.save()
-        return True
+        One point is given for each field the PDF parser could not determine,
+        half a point if the URLs hosting the PDF agree on its value, and one
+        point for each field where the URLs disagree with the PDF parser or
+        among themselves. Up to one additional point is given for low OCR
+        confidence of the least confident page.
+
+        :param pdf_parser: Parser of the first page of the PDF.
+        :param doc_infos: Document infos of the URLs hosting the PDF.
+        """
+        uncertainty = 0.0
+        if pdf_parser.content_type == DocumentInfo.UNDETERMINED:
+            uncertainty += 1
+
+        parsed_values = {
+            field: getattr(pdf_parser, field)
+            for field in ('language', 'year', 'season')
+        }
+        parsed_values['course_code'] = set(pdf_parser.course_codes)
+        for field, parsed_value in parsed_values.items():
+            url_values = set(doc_infos.values_list(field, flat=True)) - {None}
+            if field != 'course_code':
+                parsed_value = {parsed_value} - {None}
+
+            if not parsed_value:
+                # Undetermined by the PDF parser, and possibly the URLs
+                uncertainty += 1 if len(url_values) != 1 else 0.5
+            elif url_values and url_values != parsed_value:
+                # Disagreement between the votes
+                uncertainty += 1
+
+        min_confidence = self.pages.aggregate(
+            min_confidence=models.Min('confidence'),
+        )['min_confidence']
+        if min_confidence is not None:
+            uncertainty += (100 - min_confidence) / 100
+        return uncertainty
 
     def clean(self, *args, **kwargs) -> None:
         """Ensure correct SHA1 hash formatting, also for filenames."""
@@ -538,6 +912,13 @@ class Pdf(models.Model):
             kwargs={'sha1_hash': self.sha1_hash},
         )
 
+    def get_file_url(self) -> str:
+        """Return URL to PDF delivery view of the backed up file."""
+        return reverse(
+            viewname='examiner:pdf',
+            kwargs={'sha1_hash': self.sha1_hash},
+        )
+
     def __repr__(self) -> str:
         """Return programmer representation of Pdf object."""
         return (
@@ -587,6 +968,133 @@ class PdfPage(models.Model):
         )
 
 
+class OcrResult(models.Model):
+    """
+    Persistent cache of the OCR result of a single PDF page.
+
+    The results are keyed by the SHA1 hash of the PDF and all the settings
+    which affect the OCR output, see examiner.pdf.PdfReader. They are not
+    related to Pdf objects, such that they outlive deleted and re-read PDFs.
+    """
+    sha1_hash = models.CharField(
+        max_length=40,
+        help_text=_('SHA1 hash av PDF-filen.'),
+    )
+    page_number = models.PositiveSmallIntegerField(
+        help_text=_('Sidetall, nullindeksert.'),
+    )
+    device = models.CharField(
+        max_length=20,
+        help_text=_('GhostScript-enhet brukt for rendring av siden.'),
+    )
+    resolution = models.PositiveSmallIntegerField(
+        help_text=_('Oppløsning (DPI) brukt for rendring av siden.'),
+    )
+    languages = models.CharField(
+        max_length=50,
+        help_text=_('Tesseract-språkmodeller, f.eks. "nor+eng+equ".'),
+    )
+    tesseract_version = models.CharField(
+        max_length=50,
+        help_text=_('Tesseract-versjon brukt for OCR.'),
+    )
+    text = models.TextField(
+        blank=True,
+        help_text=_('Sideinnhold i rent tekstformat.'),
+    )
+    word_confidences = models.TextField(
+        blank=True,
+        help_text=_('Mellomromseparerte konfidenser til hvert ord.'),
+    )
+
+    class Meta:
+        unique_together = (
+            'sha1_hash',
+            'page_number',
+            'device',
+            'resolution',
+            'languages',
+            'tesseract_version',
+        )
+
+    @classmethod
+    def lookup(
+        cls,
+        sha1_hash: str,
+        page_numbers: List[int],
+        device: str,
+        resolution: int,
+        languages: List[str],
+        tesseract_version: str,
+    ) -> Dict[int, Tuple[str, List[int]]]:
+        """
+        Return cached text and word confidences of the given pages.
+
+        :param languages: Acceptable language models, in order of
+          preference. Pages cached with several of the models get the result
+          of the most preferred model.
+        :return: Dictionary keyed by page number, pages without any cached
+          result are omitted.
+        """
+        results = cls.objects.filter(
+            sha1_hash=sha1_hash,
+            page_number__in=page_numbers,
+            device=device,
+            resolution=resolution,
+            languages__in=languages,
+            tesseract_version=tesseract_version,
+        ).values_list('page_number', 'languages', 'text', 'word_confidences')
+        results = sorted(
+            results,
+            key=lambda result: languages.index(result[1]),
+            reverse=True,
+        )
+        return {
+            page_number: (
+                text,
+                [int(confidence) for confidence in word_confidences.split()],
+            )
+            for page_number, _, text, word_confidences in results
+        }
+
+    @classmethod
+    def store(
+        cls,
+        sha1_hash: str,
+        results: Iterable[Tuple[int, str, str, List[int]]],
+        device: str,
+        resolution: int,
+        tesseract_version: str,
+    ) -> None:
+        """
+        Persist OCR results of pages with one query.
+
+        :param results: Tuples of page number, language models, text and word
+          confidences of each page.
+        """
+        ocr_results = [
+            cls(
+                sha1_hash=sha1_hash,
+                page_number=page_number,
+                device=device,
+                resolution=resolution,
+                languages=languages,
+                tesseract_version=tesseract_version,
+                text=text,
+                word_confidences=' '.join(
+                    str(confidence) for confidence in word_confidences
+                ),
+            )
+            for page_number, languages, text, word_confidences in results
+        ]
+        try:
+            with transaction.atomic():
+                cls.objects.bulk_create(ocr_results)
+        except IntegrityError:
+            # The same pages have been OCRed and stored concurrently
+            pass
+
+
 class PdfUrl(models.Model):
     url = models.TextField(
         unique=True,
@@ -628,12 +1136,25 @@ class PdfUrl(models.Model):
     created_at = models.DateTimeField(editable=False)
     updated_at = models.DateTimeField()
 
-    def backup_file(self) -> bool:
+    def backup_file(
+        self,
+        read: bool = False,
+        allow_ocr: bool = False,
+        preview: bool = False,
+    ) -> bool:
         """
         Download and backup file from url, and save to self.file_backup.
 
+        The download is hashed and, if the PDF is new, its text is extracted
+        from the same temporary file before it is written to the storage. New
+        PDFs are therefore immediately classifiable, see Pdf.classify.
+
+        :param read: If the text content of new PDFs should be read.
+        :param allow_ocr: If OCR can be used when reading PDF content.
+        :param preview: If a preview image of new PDFs should be rendered.
         :return: True if the PDF backup is a new unique backup, else False.
         """
+        start = time.perf_counter()
         try:
             response = requests.get(self.url, stream=True, allow_redirects=True)
         except ConnectionError:
@@ -647,23 +1168,55 @@ class PdfUrl(models.Model):
             return
 
         sha1_hasher = hashlib.sha1()
+        sha1_seconds = 0.0
+        size = 0
         temp_file = NamedTemporaryFile()
         for chunk in response.iter_content(chunk_size=1024):
             if chunk:
                 temp_file.write(chunk)
+                size += len(chunk)
+
+                # Hashing is interleaved with the download, but timed apart
+                sha1_start = time.perf_counter()
                 sha1_hasher.update(chunk)
+                sha1_seconds += time.perf_counter() - sha1_start
+        temp_file.flush()
 
         content_file = File(temp_file)
         sha1_hash = sha1_hasher.hexdigest()
+        record(
+            'http',
+            time.perf_counter() - start - sha1_seconds,
+            item=self.url,
+            bytes=size,
+        )
+        record('sha1', sha1_seconds, item=self.url, bytes=size)
 
         try:
             file_backup = Pdf.objects.get(sha1_hash=sha1_hash)
             new = False
         except Pdf.DoesNotExist:
             new = True
+            pdf = None
+            if read:
+                # The downloaded file is still in the page cache
+                pdf = extract_text(
+                    path=temp_file.name,
+                    allow_ocr=allow_ocr,
+                    sha1_hash=sha1_hash,
+                )
+
             file_backup = Pdf(sha1_hash=sha1_hash)
-            file_backup.file.save(name=sha1_hash + '.pdf', content=content_file)
+            with timed('storage', item=sha1_hash) as counts:
+                file_backup.file.save(
+                    name=sha1_hash + '.pdf',
+                    content=content_file,
+                )
+                counts['bytes'] = size
             file_backup.save()
+            file_backup.create_pages(pdf)
+            if preview:
+                file_backup.create_preview(path=temp_file.name)
 
         self.scraped_pdf = file_backup
         self.dead_link = False
@@ -686,7 +1239,8 @@ class PdfUrl(models.Model):
             # The metadata has been verified, so we should not mutate
             return
 
-        parser = ExamURLParser(url=self.url)
+        with timed('parse', item=self.url):
+            parser = ExamURLParser(url=self.url)
 
         self.probably_exam = parser.probably_exam
         if parser.probably_exam:
@@ -695,15 +1249,16 @@ class PdfUrl(models.Model):
             content_type = DocumentInfo.UNDETERMINED
 
         self.filename = parser.filename
-        self.exam, _ = DocumentInfo.objects.get_or_create(
-            language=parser.language,
-            year=parser.year,
-            season=parser.season,
-            solutions=parser.solutions,
-            course_code=parser.code,
-            content_type=content_type,
-            exercise_number=None,
-        )
+        with timed('db', item=self.url):
+            self.exam, _ = DocumentInfo.objects.get_or_create(
+                language=parser.language,
+                year=parser.year,
+                season=parser.season,
+                solutions=parser.solutions,
+                course_code=parser.code,
+                content_type=content_type,
+                exercise_number=None,
+            )
         if save:
             self.save()
 
@@ -1,52 +1,156 @@
 import logging
 import subprocess
+import time
 
 from os import environ
 from pathlib import Path
 from statistics import mean
 from tempfile import TemporaryDirectory
-from typing import Optional, Union
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 
 import pdftotext
 
+from PIL import Image
+
 from tqdm import tqdm
 
+from examiner.parsers import Language, PdfParser
+from examiner.timing import record, timed
+
 
-OCR_ENABLED = True
+# If OCR is possible and the Tesseract version used for OCR. Both are None
+# until determined by ocr_enabled(), as tesserocr loads the native Tesseract
+# libraries when imported.
+OCR_ENABLED = None
+TESSERACT_VERSION = None
+PyTessBaseAPI = None
 logger = logging.getLogger()
 
 
-if environ.get('LC_ALL') != 'C' or environ.get('PYTHONIOENCODING') != 'UTF-8':
-    logger.critical(
-        'PDF OCR disabled! You need to set environment variables: '
-        'export LC_ALL=C && export PYTHONIOENCODING=UTF-8'
-    )
-    OCR_ENABLED = False
-else:
+def ocr_enabled() -> bool:
+    """
+    Return True if PDFs can be read with OCR.
+
+    The OCR dependencies are imported on the first call, which is made when
+    OCR is first needed.
+    """
+    global OCR_ENABLED, TESSERACT_VERSION, PyTessBaseAPI
+    if OCR_ENABLED is not None:
+        return OCR_ENABLED
+
+    if (
+        environ.get('LC_ALL') != 'C' or
+        environ.get('PYTHONIOENCODING') != 'UTF-8'
+    ):
+        logger.critical(
+            'PDF OCR disabled! You need to set environment variables: '
+            'export LC_ALL=C && export PYTHONIOENCODING=UTF-8'
+        )
+        OCR_ENABLED = False
+        return OCR_ENABLED
+
     try:
-        from tesserocr import PyTessBaseAPI
+        import tesserocr
     except ImportError:
         logger.critical(
             'Tesserocr is not properly installed! OCR disabled.'
         )
         OCR_ENABLED = False
+        return OCR_ENABLED
+
+    PyTessBaseAPI = tesserocr.PyTessBaseAPI
+    TESSERACT_VERSION = tesserocr.tesseract_version().splitlines()[0]
+    OCR_ENABLED = True
+    return OCR_ENABLED
 
 
 TESSDATA_DIR = Path(__file__).parent / 'tessdata'
 
+# Tesseract models used when the language of the PDF is not known
+OCR_LANGUAGES = 'nor+eng+equ'
+
+# Tesseract models used for PDFs of a given language, see detect_language
+LANGUAGE_MODELS = {
+    Language.BOKMAL: 'nor+equ',
+    Language.NYNORSK: 'nor+equ',
+    Language.ENGLISH: 'eng+equ',
+}
+
+# GhostScript rendering of pages for OCR, 300 DPI with 16-bit colors yields
+# the best results, but is the most expensive input for Tesseract
+FULL_RENDERING = {'device': 'tiff48nc', 'resolution': 300}
+
+# Rendering of the first OCR attempt of each page in adaptive OCR mode
+FAST_RENDERING = {'device': 'tiffgray', 'resolution': 200}
+
+# Greyscale JPEG previews of the first pages, see PdfReader.render_preview
+PREVIEW_RESOLUTION = 100
+PREVIEW_QUALITY = 60
+
+# In adaptive OCR mode, pages with lower mean word confidence are rendered
+# anew with FULL_RENDERING and OCRed once more
+ADAPTIVE_OCR_THRESHOLD = 75
+
 
 class PdfReaderException(Exception):
     """Exception raised when PDF content can't be read."""
 
 
+def _page_runs(page_numbers: List[int]) -> List[Tuple[int, int]]:
+    """Return first and last page of each run of consecutive page numbers."""
+    runs = []
+    for page_number in sorted(set(page_numbers)):
+        if runs and runs[-1][1] == page_number - 1:
+            runs[-1] = (runs[-1][0], page_number)
+        else:
+            runs.append((page_number, page_number))
+    return runs
+
+
+def read_text_layer(path: Union[Path, str]) -> Optional[List[str]]:
+    """
+    Return pages of the text layer of the PDF at path, without using OCR.
+
+    Suitable for worker processes, as it neither uses OCR nor the database.
+
+    :return: List of the text of each page, None if the PDF has no text layer.
+    """
+    pdf = PdfReader(path=path)
+    try:
+        text = pdf.read_text(allow_ocr=False)
+    except PdfReaderException:
+        return None
+    return pdf.pages if text else None
+
+
 class PdfReader:
-    def __init__(self, path: Union[Path, str]) -> None:
+    def __init__(
+        self,
+        path: Union[Path, str],
+        adaptive_ocr: bool = False,
+        detect_language: bool = False,
+        sha1_hash: Optional[str] = None,
+    ) -> None:
         """
         Construct PdfReader object.
 
         :param path: Absolute path to PDF document.
+        :param adaptive_ocr: If True, pages are first OCRed from cheaper
+          greyscale renderings, and only pages with a mean word confidence
+          below ADAPTIVE_OCR_THRESHOLD are OCRed at full quality.
+        :param detect_language: If True, the language of the PDF is detected
+          from the first page, which is OCRed with all language models. The
+          remaining pages are OCRed with the detected language model only,
+          which is considerably faster.
+        :param sha1_hash: SHA1 hash of the PDF. If given, OCR results are
+          cached persistently per page, see examiner.models.OcrResult.
         """
         self.path = Path(path)
+        self.adaptive_ocr = adaptive_ocr
+        self.detect_language = detect_language
+        self.escalated_pages = 0
+        self.ocr_languages = OCR_LANGUAGES
+        self.sha1_hash = sha1_hash
         if not self.path.is_absolute():
             raise ValueError(f'PdfReader initialized with relative path {path}')
 
@@ -61,7 +165,9 @@ class PdfReader:
 
         :param allow_ocr: If text cant be extracted from PDF directly, since
           it does not contain text metadata, text will be extracted by OCR if
-          True. This is much slower, approximately ~5s per page.
+          True. This is much slower, approximately ~5s per page. Only pages
+          without text metadata are OCRed, the remaining pages keep their
+          pdftotext content.
         :param force_ocr: If True, OCR will be used instead of pdftotext in
           all cases.
         :return: String of PDF text content, pages seperated with pagebreaks.
@@ -69,29 +175,66 @@ class PdfReader:
         if force_ocr:
             return self.ocr_text()
 
-        with open(self.path, 'rb') as file:
-            try:
-                pdf = pdftotext.PDF(file)
-            except pdftotext.Error:
-                if not (allow_ocr and OCR_ENABLED):
-                    raise PdfReaderException(
-                        'Can not read text from PDF and OCR is disabled!'
-                    )
-                else:
-                    return self.ocr_text()
+        try:
+            self.pages = list(self.iter_pages())
+        except PdfReaderException:
+            if not (allow_ocr and ocr_enabled()):
+                raise PdfReaderException(
+                    'Can not read text from PDF and OCR is disabled!'
+                )
+            else:
+                return self.ocr_text()
 
-        self.pages = [page for page in pdf]
         self.page_confidences = [None] * len(self.pages)
         self.mean_confidence = None
-        text = '\f'.join(self.pages)
 
+        if allow_ocr and ocr_enabled():
+            # Only pages without a text layer, i.e. scanned pages, are OCRed
+            empty_pages = [
+                page_number
+                for page_number, page in enumerate(self.pages)
+                if len(page.strip()) <= 1
+            ]
+            if len(empty_pages) == len(self.pages):
+                return self.ocr_text()
+            elif empty_pages:
+                if self.detect_language:
+                    # The text layer of the other pages is detected for free
+                    self._select_language_model(text='\f'.join(self.pages))
+                self.ocr_pages(page_numbers=empty_pages)
+
+        text = '\f'.join(self.pages)
         if len(text.replace('\f', ' ').strip()) > 1:
             return text
-        elif allow_ocr and OCR_ENABLED:
-            return self.ocr_text()
         else:
             return None
 
+    def iter_pages(self) -> Iterator[str]:
+        """
+        Yield the text layer of the PDF, one page at a time.
+
+        Each page is extracted by pdftotext when it is indexed, so only one
+        page is kept in memory at a time.
+
+        :raises PdfReaderException: If the PDF can not be read.
+        """
+        with open(self.path, 'rb') as file:
+            start = time.perf_counter()
+            try:
+                pdf = pdftotext.PDF(file)
+            except pdftotext.Error:
+                raise PdfReaderException('Can not read text from PDF!')
+            seconds = time.perf_counter() - start
+
+            # Only the extraction itself is timed, not the consumer
+            for page_number in range(len(pdf)):
+                start = time.perf_counter()
+                page = pdf[page_number]
+                seconds += time.perf_counter() - start
+                yield page
+
+            record('pdftotext', seconds, item=self._item, pages=len(pdf))
+
     def ocr_text(self) -> str:
         """
         Return text contained in PDF document.
@@ -104,24 +247,37 @@ class PdfReader:
         :return: UTF-8 encoded string representing the content of the documemt.
           Page breaks are inserted between each page, i.e. \f
         """
-        # List containing lists of word confidences for each page
-        word_confidences = []
-
-        # string content of each page
-        self.pages = []
-
-        # Directory containing TIFF images of the pages of the PDF
-        tiff_directory = self._tiff_directory()
-
-        tiff_files = sorted(tiff_directory.iterdir())
-        if len(tiff_files) == 0:
-            raise PdfReaderException('Could not convert PDF to TIFF format!')
-
-        with PyTessBaseAPI(lang='nor+eng+equ', path=str(TESSDATA_DIR)) as api:
-            for page in tqdm(tiff_files, desc='PDF OCR'):
-                api.SetImageFile(str(page))
-                self.pages.append(api.GetUTF8Text())
-                word_confidences.append(api.AllWordConfidences())
+        page_count = self._page_count() if self.sha1_hash else None
+        if page_count:
+            # Only pages without cached OCR results are rendered
+            page_numbers = list(range(page_count))
+            self.pages, word_confidences = self._ocr_rendered(
+                page_numbers=page_numbers,
+                rendering=self._rendering(),
+            )
+        else:
+            # Directory containing TIFF images of the pages of the PDF
+            tiff_directory = self._tiff_directory()
+
+            tiff_files = sorted(tiff_directory.iterdir())
+            if len(tiff_files) == 0:
+                raise PdfReaderException(
+                    'Could not convert PDF to TIFF format!',
+                )
+
+            page_numbers = list(range(len(tiff_files)))
+            self.pages, word_confidences = self._ocr(
+                tiff_files,
+                page_numbers=page_numbers,
+                rendering=self._rendering(),
+            )
+
+        if self.adaptive_ocr:
+            self.pages, word_confidences = self._escalate(
+                page_numbers=page_numbers,
+                pages=self.pages,
+                word_confidences=word_confidences,
+            )
 
         self.page_confidences = [
             int(mean(word_confidence)) if word_confidence else None
@@ -135,6 +291,389 @@ class PdfReader:
         ))
         return '\f'.join(self.pages)
 
+    def ocr_pages(self, page_numbers: List[int]) -> None:
+        """
+        Replace the text of the given pages with OCRed text.
+
+        Only the given pages are rasterized, which makes this much faster than
+        ocr_text() for documents where most pages contain a text layer.
+        self.page_confidences is updated for the given pages, while
+        self.mean_confidence is the mean word confidence of the OCRed pages.
+
+        :param page_numbers: Zero-indexed page numbers of the pages to OCR.
+        """
+        pages, word_confidences = self._ocr_rendered(
+            page_numbers=page_numbers,
+            rendering=self._rendering(),
+        )
+        if self.adaptive_ocr:
+            pages, word_confidences = self._escalate(
+                page_numbers=page_numbers,
+                pages=pages,
+                word_confidences=word_confidences,
+            )
+
+        for page_number, page, word_confidence in zip(
+            page_numbers,
+            pages,
+            word_confidences,
+        ):
+            self.pages[page_number] = page
+            self.page_confidences[page_number] = (
+                int(mean(word_confidence)) if word_confidence else None
+            )
+
+        all_word_confidences = [
+            word_confidence
+            for page in word_confidences
+            for word_confidence in page
+        ]
+        self.mean_confidence = (
+            int(mean(all_word_confidences)) if all_word_confidences else None
+        )
+
+    def _escalate(
+        self,
+        page_numbers: List[int],
+        pages: List[str],
+        word_confidences: List[List[int]],
+    ) -> Tuple[List[str], List[List[int]]]:
+        """
+        OCR pages with low confidence once more at full rendering quality.
+
+        The result of the full quality OCR is only used if its mean word
+        confidence is at least as high as that of the first attempt.
+
+        :param page_numbers: Zero-indexed page numbers of the OCRed pages.
+        :param pages: Text content of the OCRed pages.
+        :param word_confidences: Word confidences of the OCRed pages.
+        :return: Tuple of updated pages and word confidences.
+        """
+        low_confidence = [
+            index
+            for index, word_confidence in enumerate(word_confidences)
+            if not word_confidence
+            or mean(word_confidence) < ADAPTIVE_OCR_THRESHOLD
+        ]
+        if not low_confidence:
+            return pages, word_confidences
+
+        new_pages, new_word_confidences = self._ocr_rendered(
+            page_numbers=[page_numbers[index] for index in low_confidence],
+            rendering=FULL_RENDERING,
+        )
+
+        pages, word_confidences = list(pages), list(word_confidences)
+        for index, page, word_confidence in zip(
+            low_confidence,
+            new_pages,
+            new_word_confidences,
+        ):
+            if word_confidence and (
+                not word_confidences[index] or
+                mean(word_confidence) >= mean(word_confidences[index])
+            ):
+                pages[index] = page
+                word_confidences[index] = word_confidence
+
+        self.escalated_pages += len(low_confidence)
+        return pages, word_confidences
+
+    def _ocr_rendered(
+        self,
+        page_numbers: List[int],
+        rendering: Dict[str, Union[str, int]],
+    ) -> Tuple[List[str], List[List[int]]]:
+        """
+        Render and OCR the given pages, unless their results are cached.
+
+        :param page_numbers: Zero-indexed page numbers of pages to OCR.
+        :param rendering: GhostScript rendering, e.g. FULL_RENDERING.
+        :return: Tuple of the text content and word confidences of each page,
+          in the order of page_numbers.
+        """
+        results = self._cached_ocr_results(page_numbers, rendering)
+        missing = [
+            page_number
+            for page_number in page_numbers
+            if page_number not in results
+        ]
+        if missing:
+            with TemporaryDirectory() as directory:
+                tiff_files = self._render_pages(
+                    page_numbers=missing,
+                    directory=Path(directory),
+                    **rendering,
+                )
+                pages, word_confidences = self._ocr(
+                    tiff_files,
+                    page_numbers=missing,
+                    rendering=rendering,
+                )
+            results.update(zip(missing, zip(pages, word_confidences)))
+
+        return (
+            [results[page_number][0] for page_number in page_numbers],
+            [results[page_number][1] for page_number in page_numbers],
+        )
+
+    def _cached_ocr_results(
+        self,
+        page_numbers: List[int],
+        rendering: Dict[str, Union[str, int]],
+    ) -> Dict[int, Tuple[str, List[int]]]:
+        """Return cached OCR results of the given pages, keyed by page."""
+        if not self.sha1_hash or not ocr_enabled():
+            return {}
+
+        # Imported here in order to prevent circular imports
+        from examiner.models import OcrResult
+
+        if self.detect_language and self.ocr_languages == OCR_LANGUAGES:
+            # The pages may have been OCRed with any detected language model,
+            # which is preferred to the combined model
+            languages = [
+                *sorted(set(LANGUAGE_MODELS.values())),
+                OCR_LANGUAGES,
+            ]
+        else:
+            languages = [self.ocr_languages]
+
+        return OcrResult.lookup(
+            sha1_hash=self.sha1_hash,
+            page_numbers=page_numbers,
+            languages=languages,
+            tesseract_version=TESSERACT_VERSION,
+            **rendering,
+        )
+
+    def _page_count(self) -> Optional[int]:
+        """
+        Return number of pages in the PDF, None if it can't be read.
+
+        GhostScript is asked in safe mode if pdftotext can not open the PDF,
+        which is the case for many scanned PDFs. If neither can tell, the
+        whole PDF is rendered at once instead of page by page.
+        """
+        with open(self.path, 'rb') as file:
+            try:
+                return len(pdftotext.PDF(file))
+            except pdftotext.Error:
+                pass
+
+        # Escape the path as PostScript string
+        path = str(self.path)
+        for character in ('\\', '(', ')'):
+            path = path.replace(character, '\\' + character)
+        process = subprocess.run(
+            [
+                'gs',
+                '-q',
+                '-dQUIET',
+                '-dNODISPLAY',
+                # The PDF is untrusted, so only reading the PDF itself is
+                # permitted. GhostScript versions older than 9.50 do not
+                # support the permission, and the page count is unknown.
+                '-dSAFER',
+                f'--permit-file-read={self.path}',
+                '-c',
+                f'({path}) (r) file runpdfbegin pdfpagecount = quit',
+            ],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            return int(process.stdout.decode('utf-8').split()[-1])
+        except (IndexError, ValueError):
+            return None
+
+    def _rendering(self) -> Dict[str, Union[str, int]]:
+        """Return GhostScript rendering of the first OCR attempt of pages."""
+        return FAST_RENDERING if self.adaptive_ocr else FULL_RENDERING
+
+    def _render_pages(
+        self,
+        page_numbers: List[int],
+        directory: Path,
+        device: str,
+        resolution: int,
+    ) -> List[Path]:
+        """
+        Render the given pages to one TIFF file each in the given directory.
+
+        Each run of consecutive pages is rendered by a single GhostScript
+        process, as starting GhostScript costs about as much as rendering a
+        page.
+
+        :param page_numbers: Zero-indexed page numbers of pages to render.
+        :return: List of paths to TIFF files, in the order of page_numbers.
+        """
+        tiff_files = {}
+        for first_page, last_page in _page_runs(page_numbers):
+            # GhostScript numbers the output files of the run from 1
+            prefix = f'{first_page + 1:04d}'
+            self._ghostscript(
+                output_file=directory / f'{prefix}-%04d.tif',
+                first_page=first_page + 1,
+                last_page=last_page + 1,
+                device=device,
+                resolution=resolution,
+            )
+            for index, page_number in enumerate(
+                range(first_page, last_page + 1),
+            ):
+                tiff_file = directory / f'{prefix}-{index + 1:04d}.tif'
+                if not tiff_file.exists():
+                    raise PdfReaderException(
+                        f'Could not convert page {page_number} to TIFF format!'
+                    )
+                tiff_files[page_number] = tiff_file
+        return [tiff_files[page_number] for page_number in page_numbers]
+
+    def _ocr(
+        self,
+        tiff_files: List[Path],
+        page_numbers: Optional[List[int]] = None,
+        rendering: Optional[Dict[str, Union[str, int]]] = None,
+    ) -> Tuple[List[str], List[List[int]]]:
+        """
+        Return OCRed text and word confidences of the given TIFF images.
+
+        If language detection is enabled, and the language is not yet known,
+        it is detected from the first image and the Tesseract API is
+        reinitialized with the detected language model for the rest.
+
+        :param tiff_files: TIFF images of PDF pages.
+        :param page_numbers: Zero-indexed page numbers of the images, used
+          together with rendering for caching the results if self.sha1_hash
+          is set.
+        :param rendering: GhostScript rendering of the images.
+        :return: Tuple of the text content of each image and list of word
+          confidences of each image.
+        """
+        if not ocr_enabled():
+            raise PdfReaderException('OCR dependencies not installed!')
+
+        pages = []
+        word_confidences = []
+        languages = []
+        tessdata = str(TESSDATA_DIR)
+        with PyTessBaseAPI(lang=self.ocr_languages, path=tessdata) as api:
+            for page in tqdm(tiff_files, desc='PDF OCR'):
+                with timed('tesseract', item=self._item) as counts:
+                    api.SetImageFile(str(page))
+                    pages.append(api.GetUTF8Text())
+                    word_confidences.append(api.AllWordConfidences())
+                    counts['pages'] = 1
+                languages.append(self.ocr_languages)
+
+                if (
+                    self.detect_language and
+                    self.ocr_languages == OCR_LANGUAGES and
+                    len(pages) == 1 and
+                    self._select_language_model(text=pages[0]) and
+                    len(tiff_files) > 1
+                ):
+                    api.Init(path=tessdata, lang=self.ocr_languages)
+
+        if self.sha1_hash and page_numbers is not None and rendering:
+            # Imported here in order to prevent circular imports
+            from examiner.models import OcrResult
+
+            OcrResult.store(
+                sha1_hash=self.sha1_hash,
+                results=zip(page_numbers, languages, pages, word_confidences),
+                tesseract_version=TESSERACT_VERSION,
+                **rendering,
+            )
+        return pages, word_confidences
+
+    @property
+    def _item(self) -> str:
+        """Return identifier of the PDF used in pipeline timings."""
+        return self.sha1_hash or self.path.name
+
+    def _select_language_model(self, text: str) -> bool:
+        """
+        Use only the language model of the language of the given text.
+
+        :return: True if a language was detected and its model selected.
+        """
+        language = PdfParser._language(text=text)
+        if language not in LANGUAGE_MODELS:
+            return False
+
+        self.ocr_languages = LANGUAGE_MODELS[language]
+        return True
+
+    def render_preview(
+        self,
+        output_file: Path,
+        second_page: bool = True,
+    ) -> bool:
+        """
+        Render compressed greyscale JPEG preview of the first page.
+
+        The preview is much smaller than most scanned PDFs, and sufficient for
+        classifying the PDF, see the verify view.
+
+        :param output_file: Path to JPEG file which should be written.
+        :param second_page: If True, the top half of the second page, if any,
+          is appended below the first page.
+        :return: True if the preview could be rendered.
+        """
+        with TemporaryDirectory() as directory:
+            try:
+                subprocess.run([
+                    'gs',
+                    '-q',
+                    '-dQUIET',
+                    '-dNOPAUSE',
+                    '-dBATCH',
+                    '-dSAFER',
+                    # 8-bit greyscale PNG, compressed to JPEG by Pillow
+                    '-sDEVICE=pnggray',
+                    f'-r{PREVIEW_RESOLUTION}',
+                    '-dFirstPage=1',
+                    f'-dLastPage={2 if second_page else 1}',
+                    f'-sOutputFile={directory}/%d.png',
+                    str(self.path),
+                ])
+            except OSError:
+                logger.exception('GhostScript is not properly installed!')
+                return False
+
+            pages = sorted(Path(directory).glob('*.png'))
+            if not pages:
+                return False
+
+            images = [Image.open(str(pages[0]))]
+            if len(pages) > 1:
+                page = Image.open(str(pages[1]))
+                images.append(page.crop((0, 0, page.width, page.height // 2)))
+
+            preview = Image.new(
+                mode='L',
+                size=(
+                    max(image.width for image in images),
+                    sum(image.height for image in images),
+                ),
+                color=255,
+            )
+            offset = 0
+            for image in images:
+                preview.paste(image, (0, offset))
+                offset += image.height
+
+            preview.save(
+                str(output_file),
+                format='JPEG',
+                quality=PREVIEW_QUALITY,
+                optimize=True,
+                progressive=True,
+            )
+        return True
+
     def _tiff_directory(self) -> Path:
         """
         Return Path object to directory containing TIFF files.
@@ -151,9 +690,40 @@ class PdfReader:
             return Path(self._tmp_tiff_directory.name)
 
         self._tmp_tiff_directory = TemporaryDirectory()
+        self._ghostscript(
+            output_file=Path(self._tmp_tiff_directory.name) / '%04d.tif',
+            **self._rendering(),
+        )
+        return Path(self._tmp_tiff_directory.name)
+
+    def _ghostscript(
+        self,
+        output_file: Path,
+        first_page: Optional[int] = None,
+        last_page: Optional[int] = None,
+        device: str = FULL_RENDERING['device'],
+        resolution: int = FULL_RENDERING['resolution'],
+    ) -> None:
+        """
+        Convert PDF pages to TIFF images with GhostScript.
+
+        :param output_file: Path to TIFF output, may contain a page number
+          format such as '%04d' for multi-page conversions.
+        :param first_page: One-indexed first page to convert.
+        :param last_page: One-indexed last page to convert.
+        :param device: GhostScript TIFF output device, see
+          https://ghostscript.com/doc/9.21/Devices.htm#TIFF
+        :param resolution: Rendering resolution in DPI.
+        """
+        page_range = []
+        if first_page is not None:
+            page_range.append(f'-dFirstPage={first_page}')
+        if last_page is not None:
+            page_range.append(f'-dLastPage={last_page}')
 
         # For choice of parameters, see:
         # https://mazira.com/blog/optimal-image-conversion-settings-tesseract-ocr
+        start = time.perf_counter()
         subprocess.run([
             # Using GhostScript for PDF -> TIFF conversion
             'gs',
@@ -162,13 +732,14 @@ class PdfReader:
             '-dQUIET',
             # Disable prompt and pause after each page
             '-dNOPAUSE',
-            # Convert to TIFF with 16-bit colors
-            # https://ghostscript.com/doc/9.21/Devices.htm#TIFF
-            '-sDEVICE=tiff48nc',
+            # Convert to TIFF, by default with 16-bit colors
+            f'-sDEVICE={device}',
             # Split into one TIFF file for each page in the PDF
-            f'-sOutputFile={self._tmp_tiff_directory.name}/%04d.tif',
-            # Use 300 DPI
-            '-r300',
+            f'-sOutputFile={output_file}',
+            # Only convert the given pages, if any
+            *page_range,
+            # Use 300 DPI by default
+            f'-r{resolution}',
             # Interpolate upscaled documents
             '-dINTERPOLATE',
             # Use 8 threads for faster performance
@@ -186,4 +757,13 @@ class PdfReader:
             'quit',
             '-f',
         ])
-        return Path(self._tmp_tiff_directory.name)
+        if first_page is not None and last_page is not None:
+            pages = last_page - first_page + 1
+        else:
+            pages = len(list(output_file.parent.glob('*.tif')))
+        record(
+            'ghostscript',
+            time.perf_counter() - start,
+            item=self._item,
+            pages=pages,
+        )
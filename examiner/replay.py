@@ -0,0 +1,313 @@
+"""
+Replay of recorded exam sites, for benchmarking the crawlers offline.
+
+The responses of the live sites are recorded once into a fixture archive, a
+zip file with an index of the recorded URLs, see FixtureArchive. A
+ReplayServer then serves the archive from a local HTTP server, with
+configurable latency and failure rate. Within ReplayServer.redirect(), all
+requests made with requests.get, i.e. by the crawlers and
+PdfUrl.backup_file, are sent to the server instead of the live sites.
+"""
+import hashlib
+import json
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from itertools import chain
+from pathlib import Path
+from random import Random
+from socketserver import ThreadingMixIn
+from threading import Lock, Thread
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+import requests
+from requests.utils import requote_uri
+
+from examiner.crawlers import (
+    DvikanCrawler,
+    MathematicalSciencesCourseCrawler,
+    PhysicsCrawler,
+)
+
+
+# Crawlers which can be recorded and replayed
+CRAWLERS = ('mathematical_sciences', 'dvikan', 'physics')
+
+# Status of responses failed on purpose, see ReplayServer
+FAILURE_STATUS = 503
+
+
+class FixtureArchive:
+    """Recorded responses of GET requests, keyed by requested URL."""
+
+    def __init__(
+        self,
+        crawlers: Tuple[str, ...] = (),
+        course_codes: Tuple[str, ...] = (),
+    ) -> None:
+        """
+        Construct empty archive.
+
+        :param crawlers: Names of the recorded crawlers, see CRAWLERS.
+        :param course_codes: Course codes of the recorded courses of the
+          Mathematical Sciences crawler.
+        """
+        self.crawlers = tuple(crawlers)
+        self.course_codes = tuple(course_codes)
+        self.responses: Dict[str, Tuple[int, str, bytes]] = {}
+        self._lock = Lock()
+
+    def add(self, url: str, response: requests.Response) -> None:
+        """Add response to the archive, replacing earlier responses."""
+        with self._lock:
+            self.responses[requote_uri(url)] = (
+                response.status_code,
+                response.headers.get('Content-Type', 'text/html'),
+                response.content,
+            )
+
+    def get(self, url: str) -> Optional[Tuple[int, str, bytes]]:
+        """Return status, content type and body of URL, None if unknown."""
+        return self.responses.get(requote_uri(url))
+
+    def save(self, path: Union[Path, str]) -> None:
+        """Write archive as zip file with index.json and one file per body."""
+        index = {
+            'recorded_at': datetime.now().isoformat(),
+            'crawlers': self.crawlers,
+            'course_codes': self.course_codes,
+            'responses': {},
+        }
+        with zipfile.ZipFile(str(path), 'w', zipfile.ZIP_DEFLATED) as archive:
+            for url, (status, content_type, body) in self.responses.items():
+                name = 'bodies/' + hashlib.sha1(url.encode('utf-8')).hexdigest()
+                archive.writestr(name, body)
+                index['responses'][url] = {
+                    'status': status,
+                    'content_type': content_type,
+                    'body': name,
+                }
+            archive.writestr('index.json', json.dumps(index, indent=2))
+
+    @classmethod
+    def load(cls, path: Union[Path, str]) -> 'FixtureArchive':
+        """Read archive written by save(), keeping all bodies in memory."""
+        with zipfile.ZipFile(str(path)) as archive:
+            index = json.loads(archive.read('index.json').decode('utf-8'))
+            fixture_archive = cls(
+                crawlers=index['crawlers'],
+                course_codes=index['course_codes'],
+            )
+            for url, response in index['responses'].items():
+                fixture_archive.responses[url] = (
+                    response['status'],
+                    response['content_type'],
+                    archive.read(response['body']),
+                )
+        return fixture_archive
+
+
+@contextmanager
+def recording(archive: FixtureArchive) -> Iterator[FixtureArchive]:
+    """Add the responses of all requests.get calls to the archive."""
+    request = requests.api.request
+
+    def recording_request(method, url, **kwargs):
+        response = request(method, url, **kwargs)
+        if method.lower() == 'get':
+            archive.add(url, response)
+        return response
+
+    requests.api.request = recording_request
+    try:
+        yield archive
+    finally:
+        requests.api.request = request
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    """Serves the archived response of the URL encoded in the path."""
+
+    def do_GET(self) -> None:
+        server = self.server
+        fail = server.count_request()
+        if server.latency:
+            time.sleep(server.latency)
+        if fail:
+            self.send_error(FAILURE_STATUS)
+            return
+
+        response = server.archive.get(server.original_url(self.path))
+        if response is None:
+            self.send_error(404)
+            return
+
+        status, content_type, body = response
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        """Do not log each request to stderr."""
+
+
+class ReplayServer(ThreadingMixIn, HTTPServer):
+    """
+    Local HTTP stand-in for the live exam sites.
+
+    Each request is served in its own thread, such that concurrent crawlers
+    are not serialized by the server. Use as context manager in order to
+    serve in a background thread.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        archive: FixtureArchive,
+        latency: float = 0.0,
+        failure_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ) -> None:
+        """
+        Construct server listening on a free local port.
+
+        :param archive: Responses to serve.
+        :param latency: Seconds each response is delayed.
+        :param failure_rate: Probability of responding with FAILURE_STATUS
+          instead of the archived response.
+        :param seed: Seed of the random failures, for reproducible runs.
+        """
+        super().__init__(('127.0.0.1', 0), ReplayHandler)
+        self.archive = archive
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.requests = 0
+        self.failures = 0
+        self._random = Random(seed)
+        self._lock = Lock()
+
+    def count_request(self) -> bool:
+        """Count request, return True if it should fail."""
+        with self._lock:
+            self.requests += 1
+            fail = self._random.random() < self.failure_rate
+            self.failures += fail
+        return fail
+
+    def local_url(self, url: str) -> str:
+        """Return URL of the replay of the given live URL."""
+        parts = urlsplit(url)
+        query = '?' + parts.query if parts.query else ''
+        return (
+            f'http://127.0.0.1:{self.server_port}'
+            f'/{parts.scheme}/{parts.netloc}{parts.path}{query}'
+        )
+
+    @staticmethod
+    def original_url(path: str) -> str:
+        """Return live URL of the path of a local URL, see local_url."""
+        scheme, netloc, *rest = path.lstrip('/').split('/', 2)
+        return f'{scheme}://{netloc}/{rest[0] if rest else ""}'
+
+    @contextmanager
+    def redirect(self) -> Iterator['ReplayServer']:
+        """Send all requests.get calls to this server."""
+        request = requests.api.request
+
+        def replay_request(method, url, **kwargs):
+            return request(method, self.local_url(url), **kwargs)
+
+        requests.api.request = replay_request
+        try:
+            yield self
+        finally:
+            requests.api.request = request
+
+    def __enter__(self) -> 'ReplayServer':
+        Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+def crawl(
+    crawler: str,
+    course_codes: Tuple[str, ...] = (),
+    concurrency: int = 1,
+) -> List[str]:
+    """
+    Return PDF URLs found by the given crawler.
+
+    :param crawler: Name of crawler, see CRAWLERS.
+    :param course_codes: Courses crawled by the Mathematical Sciences crawler.
+    :param concurrency: Number of courses crawled concurrently by the
+      Mathematical Sciences crawler. The other crawlers walk a single site
+      index and are always sequential.
+    """
+    if crawler == 'dvikan':
+        return list(DvikanCrawler.pdf_urls())
+    if crawler == 'physics':
+        return list(PhysicsCrawler.pdf_urls())
+
+    def crawl_course(course_code: str) -> List[str]:
+        course_crawler = MathematicalSciencesCourseCrawler(code=course_code)
+        return course_crawler.pdf_urls() if course_crawler else []
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(chain.from_iterable(
+            executor.map(crawl_course, course_codes),
+        ))
+
+
+def benchmark(
+    archive: FixtureArchive,
+    concurrency_levels: Tuple[int, ...] = (1,),
+    latency: float = 0.0,
+    failure_rate: float = 0.0,
+    seed: Optional[int] = None,
+) -> List[Dict[str, Union[str, int, float]]]:
+    """
+    Return crawl time and throughput of each recorded crawler.
+
+    Each crawler is replayed once for each concurrency level it supports, see
+    crawl(), against a fresh ReplayServer.
+    """
+    results = []
+    for crawler in archive.crawlers:
+        levels = concurrency_levels
+        if crawler != 'mathematical_sciences':
+            levels = (1,)
+        for concurrency in levels:
+            with ReplayServer(
+                archive,
+                latency=latency,
+                failure_rate=failure_rate,
+                seed=seed,
+            ) as server, server.redirect():
+                start = time.perf_counter()
+                urls = crawl(
+                    crawler,
+                    course_codes=archive.course_codes,
+                    concurrency=concurrency,
+                )
+                seconds = time.perf_counter() - start
+
+            results.append({
+                'crawler': crawler,
+                'concurrency': concurrency,
+                'urls': len(set(urls)),
+                'seconds': seconds,
+                'urls_per_second': len(set(urls)) / seconds,
+                'requests': server.requests,
+                'failures': server.failures,
+            })
+    return results
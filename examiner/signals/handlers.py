@@ -1,10 +1,93 @@
-from django.db.models.signals import pre_delete
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
 from django.dispatch.dispatcher import receiver
 
-from examiner.models import Pdf
+from examiner.models import (
+    DocumentInfo,
+    DocumentInfoSource,
+    ExamRelatedCourse,
+    Pdf,
+    PdfPage,
+    PdfUrl,
+)
+from examiner.storage import preview_path
+from kokekunster.conditional import bump_content_version
 
 
 @receiver(pre_delete, sender=Pdf, dispatch_uid='delete_backed_up_pdf')
 def delete_pdf_backup_on_deletion(sender, instance, **kwargs):
-    """Delete Pdf on disk when Pdf model object is deleted."""
+    """Delete Pdf and its preview on disk when Pdf model object is deleted."""
+    instance.file.storage.delete(preview_path(instance.sha1_hash))
     instance.file.delete(save=False)
+
+
+@receiver(
+    post_save,
+    sender=DocumentInfoSource,
+    dispatch_uid='queue_classified_pdf',
+)
+@receiver(
+    post_delete,
+    sender=DocumentInfoSource,
+    dispatch_uid='queue_reclassified_pdf',
+)
+def update_verification_queue(sender, instance, **kwargs):
+    """Keep Pdf.needs_verification in sync with the exams of the PDF."""
+    Pdf.objects.filter(pk=instance.pdf_id).update_needs_verification()
+
+
+@receiver(
+    m2m_changed,
+    sender=DocumentInfoSource.verified_by.through,
+    dispatch_uid='queue_verified_pdf',
+)
+def update_verification_queue_on_verification(
+    sender,
+    instance,
+    action,
+    pk_set,
+    **kwargs
+):
+    """Keep Pdf.needs_verification in sync when exams are (un)verified."""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if isinstance(instance, DocumentInfoSource):
+        pdfs = Pdf.objects.filter(pk=instance.pdf_id)
+    elif pk_set is not None:
+        pdfs = Pdf.objects.filter(documentinfosource__in=pk_set)
+    else:
+        # The verifications of a user are cleared
+        pdfs = Pdf.objects.all()
+    pdfs.update_needs_verification()
+
+
+# Models rendered by the exam archive pages, i.e. the exams, their PDFs with
+# URLs and text. The examiner command saves these row by row, but bumps the
+# content version once, see kokekunster.conditional.deferred_content_versions.
+CONTENT_MODELS = (
+    DocumentInfo,
+    DocumentInfoSource,
+    ExamRelatedCourse,
+    Pdf,
+    PdfPage,
+    PdfUrl,
+)
+
+
+@receiver(post_save, dispatch_uid='examiner_content_saved')
+@receiver(post_delete, dispatch_uid='examiner_content_deleted')
+def bump_examiner_content_version(sender, **kwargs):
+    """Invalidate ETags of exam archive pages when exam content changes."""
+    if sender in CONTENT_MODELS:
+        bump_content_version('examiner')
+
+
+@receiver(m2m_changed, dispatch_uid='examiner_content_relations_changed')
+def bump_examiner_relations_version(sender, instance, **kwargs):
+    """Invalidate ETags of exam archive pages when exam relations change."""
+    if isinstance(instance, CONTENT_MODELS):
+        bump_content_version('examiner')
@@ -0,0 +1,80 @@
+"""Content-addressed storage of backed up PDF files."""
+import os
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+# Directory relative to MEDIA_ROOT containing all PDF backups
+BACKUP_DIRECTORY = 'examiner/FileBackup'
+
+
+def sharded_path(sha1_hash: str, extension: str = '.pdf') -> str:
+    """
+    Return storage path of file with given SHA1 hash.
+
+    The files are sharded in two levels of subdirectories by hash prefix,
+    e.g. 'examiner/FileBackup/ab/cd/abcd...ef.pdf', such that no single
+    directory contains an excessive number of files.
+    """
+    return '/'.join((
+        BACKUP_DIRECTORY,
+        sha1_hash[0:2],
+        sha1_hash[2:4],
+        sha1_hash + extension,
+    ))
+
+
+def preview_path(sha1_hash: str) -> str:
+    """Return storage path of the preview image of the PDF with given hash."""
+    return sharded_path(sha1_hash, extension='.jpg')
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage where file names are derived from file content.
+
+    Two files with the same name are assumed to have identical content, so
+    saving a file that already exists is a no-op instead of creating a new
+    file with a random suffix. New files are written to a temporary file in
+    the destination directory and then hard linked into place, which fails
+    atomically if another process has stored the same content in the mean
+    time.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        """Return name unchanged, as identical names imply identical files."""
+        return name
+
+    def _save(self, name, content):
+        full_path = Path(self.path(name))
+        if full_path.exists():
+            # Deduplication, the content is already stored
+            return name
+
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+        with NamedTemporaryFile(
+            dir=str(full_path.parent),
+            prefix='.',
+            suffix='.tmp',
+        ) as temp_file:
+            if hasattr(content, 'seek'):
+                content.seek(0)
+            for chunk in content.chunks():
+                temp_file.write(chunk)
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+
+            if self.file_permissions_mode is not None:
+                os.chmod(temp_file.name, self.file_permissions_mode)
+
+            try:
+                os.link(temp_file.name, str(full_path))
+            except FileExistsError:
+                # Another process stored the same content concurrently
+                pass
+
+        return name
@@ -1,10 +1,15 @@
 import os
+import shutil
+import subprocess
+import sys
 from pathlib import Path
 
 from django.core.exceptions import ValidationError
 from django.core.files.base import ContentFile
 from django.db.utils import IntegrityError
 
+from freezegun import freeze_time
+
 import pytest
 
 import responses
@@ -13,9 +18,11 @@ from examiner.models import (
     DocumentInfo,
     DocumentInfoSource,
     ExamRelatedCourse,
+    OcrResult,
     Pdf,
     PdfPage,
     PdfUrl,
+    extract_text,
 )
 from examiner.parsers import Language, Season
 from dataporten.tests.factories import UserFactory
@@ -152,12 +159,14 @@ def test_file_backup(tmpdir, settings):
     # And the stored file should be named according to its hash
     assert (
         file_backup.file.name ==
-        'examiner/FileBackup/' + expected_sha1_hash + '.pdf'
+        'examiner/FileBackup/4d/c8/' + expected_sha1_hash + '.pdf'
     )
 
-    # The directory for file backups should now contain one file
+    # The directory for file backups should now contain one file, sharded by
+    # the prefix of its hash
     backup_directory = Path(settings.MEDIA_ROOT / 'examiner/FileBackup/')
-    assert len(list(backup_directory.iterdir())) == 1
+    backups = [path for path in backup_directory.glob('**/*') if path.is_file()]
+    assert len(backups) == 1
 
     # Now we take a look at a new url
     new_url = 'http://example.com/ny_eksamen.txt'
@@ -173,12 +182,37 @@ def test_file_backup(tmpdir, settings):
     )
     new_exam_url = PdfUrl(url=new_url)
     new_exam_url.backup_file()
-    assert len(list(backup_directory.iterdir())) == 1
+    backups = [path for path in backup_directory.glob('**/*') if path.is_file()]
+    assert len(backups) == 1
     assert PdfUrl.objects.all().count() == 2
     assert Pdf.objects.all().count() == 1
     assert exam_url.scraped_pdf == new_exam_url.scraped_pdf
 
 
+@responses.activate
+@pytest.mark.django_db
+def test_file_backup_reads_text(settings):
+    """New PDF backups should be classifiable without reading the file anew."""
+    pdf_path = Path(__file__).parent / 'data' / 'matmod_exam_des_2017.pdf'
+    url = 'http://www.example.com/TMA4135/2017h/oldExams/eksamen.pdf'
+    responses.add(
+        responses.GET,
+        url,
+        body=pdf_path.read_bytes(),
+        status=200,
+        content_type='application/pdf',
+        stream=True,
+    )
+
+    exam_url = PdfUrl(url=url)
+    assert exam_url.backup_file(read=True) is True
+
+    pdf = exam_url.scraped_pdf
+    assert pdf.pages.count() == 6
+    assert 'Rottman' in pdf.text
+    assert pdf.classify(read=False) is True
+
+
 @responses.activate
 @pytest.mark.django_db
 def test_file_backup_of_dead_link(tmpdir, settings):
@@ -329,6 +363,7 @@ def test_string_content():
 
     # Check content with text property
     assert len(pdf_backup.text.split('\f')) == 6
+    assert list(pdf_backup.iter_page_texts()) == pdf_backup.text.split('\f')
     assert 'Rottman' in pdf_backup.text
     assert 'population model' in pdf_backup.text
     assert 'this is not in the exam' not in pdf_backup.text
@@ -368,6 +403,32 @@ def test_deletion_of_file_on_delete(tmpdir, settings):
     assert not filepath.is_file()
 
 
+@pytest.mark.skipif(shutil.which('gs') is None, reason='Requires GhostScript')
+@pytest.mark.django_db
+def test_pdf_preview(settings):
+    """Small preview images of the first pages should be stored with PDFs."""
+    pdf_path = Path(__file__).parent / 'data' / 'matmod_exam_des_2017.pdf'
+    sha1_hash = '0000000000000000000000000000000000000000'
+    pdf = Pdf(sha1_hash=sha1_hash)
+    pdf.file.save(name=sha1_hash + '.pdf', content=ContentFile(
+        pdf_path.read_bytes(),
+    ))
+    assert pdf.preview_url is None
+
+    assert pdf.create_preview() is True
+    preview = Path(
+        settings.MEDIA_ROOT,
+        'examiner/FileBackup/00/00/' + sha1_hash + '.jpg',
+    )
+    assert preview.is_file()
+    assert preview.stat().st_size < 500 * 1024
+    assert pdf.preview_url.endswith(sha1_hash + '.jpg')
+
+    # The preview is deleted together with the PDF
+    pdf.delete()
+    assert not preview.is_file()
+
+
 @pytest.mark.django_db
 def test_raising_validation_errors_of_wrong_sha1_formatting():
     """SHA1 hash format should be enforced, also for filenames."""
@@ -390,6 +451,80 @@ def test_get_absolute_url_for_pdf():
     assert pdf.get_absolute_url() == '/exams/verify/' + sha1_hash
 
 
+@pytest.mark.django_db
+def test_unverified_pdfs():
+    """PDFs with any unverified source should be listed without duplicates."""
+    exam = DocumentInfo.objects.create()
+    other_exam = DocumentInfo.objects.create()
+
+    # One unverified PDF with two sources
+    unverified = Pdf(sha1_hash='0' * 40)
+    unverified.file.save(name='0' * 40 + '.pdf', content=ContentFile('a'))
+    DocumentInfoSource.objects.create(pdf=unverified, document_info=exam)
+    DocumentInfoSource.objects.create(pdf=unverified, document_info=other_exam)
+
+    # And one verified PDF
+    verified = Pdf(sha1_hash='1' * 40)
+    verified.file.save(name='1' * 40 + '.pdf', content=ContentFile('b'))
+    source = DocumentInfoSource.objects.create(pdf=verified, document_info=exam)
+    source.verified_by.add(UserFactory())
+
+    assert list(Pdf.objects.unverified()) == [unverified]
+
+
+@pytest.mark.django_db
+def test_leasing_of_pdfs_for_verification():
+    """Concurrent verifiers should be given the most uncertain free PDFs."""
+    exam = DocumentInfo.objects.create()
+    certain = Pdf(sha1_hash='0' * 40, uncertainty=0.5)
+    certain.file.save(name='0' * 40 + '.pdf', content=ContentFile('a'))
+    uncertain = Pdf(sha1_hash='1' * 40, uncertainty=3)
+    uncertain.file.save(name='1' * 40 + '.pdf', content=ContentFile('b'))
+    for pdf in (certain, uncertain):
+        DocumentInfoSource.objects.create(pdf=pdf, document_info=exam)
+
+    verifier, other_verifier = UserFactory(), UserFactory()
+    with freeze_time('2019-02-01 12:00'):
+        assert Pdf.objects.lease(user=verifier) == uncertain
+        assert Pdf.objects.lease(user=other_verifier) == certain
+
+        # Both PDFs are leased, but the verifier keeps its own lease
+        assert Pdf.objects.lease(user=UserFactory()) is None
+        assert Pdf.objects.lease(user=verifier) == uncertain
+
+    # Expired leases are given to other verifiers
+    with freeze_time('2019-02-01 13:00'):
+        assert Pdf.objects.lease(user=other_verifier) == uncertain
+
+    Pdf.objects.release(user=other_verifier)
+    assert not Pdf.objects.filter(leased_to=other_verifier).exists()
+
+    # Verified PDFs leave the queue
+    DocumentInfoSource.objects.get(pdf=uncertain).verified_by.add(verifier)
+    assert Pdf.objects.lease(user=other_verifier) == certain
+
+
+@pytest.mark.django_db
+def test_skipping_of_leased_pdf():
+    """Skipped PDFs should not be leased again until the lease expires."""
+    exam = DocumentInfo.objects.create()
+    first = Pdf(sha1_hash='0' * 40, uncertainty=1, needs_verification=True)
+    first.file.save(name='0' * 40 + '.pdf', content=ContentFile('a'))
+    second = Pdf(sha1_hash='1' * 40, uncertainty=0, needs_verification=True)
+    second.file.save(name='1' * 40 + '.pdf', content=ContentFile('b'))
+
+    verifier = UserFactory()
+    with freeze_time('2019-02-01 12:00'):
+        assert Pdf.objects.lease(user=verifier) == first
+        Pdf.objects.filter(pk=first.pk).skip(user=verifier)
+        assert Pdf.objects.lease(user=verifier) == second
+        Pdf.objects.filter(pk=second.pk).skip(user=verifier)
+        assert Pdf.objects.lease(user=verifier) is None
+
+    with freeze_time('2019-02-01 13:00'):
+        assert Pdf.objects.lease(user=verifier) == first
+
+
 class TestExamClassification:
 
     @pytest.mark.django_db
@@ -723,3 +858,83 @@ class TestDocumentInfoContentType:
                 content_type=DocumentInfo.IRRELEVANT,
                 exercise_number=1,
             )
+
+
+def test_models_do_not_load_pdf_stack(settings):
+    """Web workers should not load the PDF and OCR stack on startup."""
+    code = (
+        'import os, sys, django;'
+        f'os.environ["DJANGO_SETTINGS_MODULE"] = "{settings.SETTINGS_MODULE}";'
+        'django.setup();'
+        'import examiner.models;'
+        'print("examiner.pdf" in sys.modules, "pdftotext" in sys.modules)'
+    )
+    process = subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=settings.BASE_DIR,
+        stdout=subprocess.PIPE,
+        check=True,
+    )
+    assert process.stdout.decode('utf-8').split() == ['False', 'False']
+
+
+@pytest.mark.django_db
+def test_ocr_result_lookup_prefers_language_order():
+    """Pages cached with several language models should be deterministic."""
+    rendering = {'device': 'tiffgray', 'resolution': 300}
+    OcrResult.store(
+        sha1_hash='0' * 40,
+        results=[
+            (0, 'nor+eng+equ', 'combined', [80]),
+            (0, 'eng+equ', 'english', [90]),
+            (1, 'nor+eng+equ', 'combined', [70]),
+        ],
+        tesseract_version='4.0.0',
+        **rendering,
+    )
+    results = OcrResult.lookup(
+        sha1_hash='0' * 40,
+        page_numbers=[0, 1, 2],
+        languages=['eng+equ', 'nor+equ', 'nor+eng+equ'],
+        tesseract_version='4.0.0',
+        **rendering,
+    )
+    assert results == {0: ('english', [90]), 1: ('combined', [70])}
+
+
+@pytest.mark.django_db
+def test_empty_pages_are_not_persisted():
+    """PDFs without any text should be left for classify() to read anew."""
+    pdf = Pdf(sha1_hash='0' * 40)
+    pdf.file.save(name='0' * 40 + '.pdf', content=ContentFile('scan'))
+
+    class ScannedPdf:
+        pages = ['', ' \n']
+        page_confidences = [None, None]
+
+    assert pdf.create_pages(ScannedPdf()) is False
+    assert not pdf.pages.exists()
+    assert Pdf.objects.filter(pages__isnull=True).get() == pdf
+
+
+@pytest.mark.django_db
+def test_ocr_strategies_are_passed_to_pdf_reader(monkeypatch):
+    """OCR strategies of Pdf.read_text should end up in the PdfReader."""
+    pdf_path = Path(__file__).parent / 'data' / 'matmod_exam_des_2017.pdf'
+    reader = extract_text(
+        path=str(pdf_path),
+        adaptive_ocr=True,
+        detect_language=True,
+    )
+    assert reader.adaptive_ocr and reader.detect_language
+
+    calls = []
+    monkeypatch.setattr(
+        'examiner.models.extract_text',
+        lambda **kwargs: calls.append(kwargs),
+    )
+    pdf = Pdf(sha1_hash='0' * 40)
+    pdf.file.save(name='0' * 40 + '.pdf', content=ContentFile('scan'))
+    assert pdf.read_text(allow_ocr=True, adaptive_ocr=True) is False
+    assert calls[0]['adaptive_ocr'] is True
+    assert calls[0]['detect_language'] is False
@@ -108,3 +108,132 @@ def test_force_ocr(monkeypatch):
     monkeypatch.setattr(PdfReader, 'ocr_text', lambda self: 'content')
     pdf = PdfReader(path='/')
     assert pdf.read_text(allow_ocr=True, force_ocr=True) == 'content'
+
+
+def test_ocr_of_empty_pages_only(monkeypatch, pdf_path):
+    """Only pages without text metadata should be OCRed."""
+    monkeypatch.setattr('examiner.pdf.OCR_ENABLED', True)
+    monkeypatch.setattr(
+        'examiner.pdf.pdftotext.PDF',
+        lambda file: ['typed page', ' \n', 'another typed page'],
+    )
+
+    def ocr_pages(self, page_numbers):
+        assert page_numbers == [1]
+        self.pages[1] = 'scanned page'
+        self.page_confidences[1] = 80
+        self.mean_confidence = 80
+
+    monkeypatch.setattr(PdfReader, 'ocr_pages', ocr_pages)
+    monkeypatch.delattr('examiner.pdf.PdfReader.ocr_text')
+
+    pdf = PdfReader(path=pdf_path)
+    text = pdf.read_text(allow_ocr=True)
+    assert text == 'typed page\fscanned page\fanother typed page'
+    assert pdf.page_confidences == [None, 80, None]
+
+
+def test_adaptive_ocr_escalation(monkeypatch, pdf_path):
+    """Only pages with low confidence should be OCRed at full quality."""
+    renderings = []
+
+    def render_pages(self, page_numbers, directory, device, resolution):
+        renderings.append((page_numbers, resolution))
+        return [(page_number, resolution) for page_number in page_numbers]
+
+    def ocr(self, tiff_files, page_numbers=None, rendering=None):
+        # Low resolution only works well for the first page
+        pages, confidences = [], []
+        for page_number, resolution in tiff_files:
+            pages.append(f'page {page_number} at {resolution} DPI')
+            good = resolution == 300 or page_number == 0
+            confidences.append([90, 92] if good else [40, 50])
+        return pages, confidences
+
+    monkeypatch.setattr(PdfReader, '_render_pages', render_pages)
+    monkeypatch.setattr(PdfReader, '_ocr', ocr)
+
+    pdf = PdfReader(path=pdf_path, adaptive_ocr=True)
+    pdf.pages = ['typed page', '', '']
+    pdf.page_confidences = [None, None, None]
+    pdf.ocr_pages(page_numbers=[1, 2])
+
+    # Both scanned pages have been escalated
+    assert renderings == [([1, 2], 200), ([1, 2], 300)]
+    assert pdf.pages == ['typed page', 'page 1 at 300 DPI', 'page 2 at 300 DPI']
+    assert pdf.page_confidences == [None, 91, 91]
+    assert pdf.escalated_pages == 2
+
+
+def test_language_detection_from_text_layer(monkeypatch, pdf_path):
+    """The text layer of mixed PDFs should determine the OCR language."""
+    monkeypatch.setattr('examiner.pdf.OCR_ENABLED', True)
+    monkeypatch.setattr(
+        'examiner.pdf.pdftotext.PDF',
+        lambda file: ['Exam in Mathematics, English', ''],
+    )
+    languages = []
+
+    def ocr_pages(self, page_numbers):
+        languages.append(self.ocr_languages)
+
+    monkeypatch.setattr(PdfReader, 'ocr_pages', ocr_pages)
+
+    pdf = PdfReader(path=pdf_path, detect_language=True)
+    pdf.read_text(allow_ocr=True)
+    assert languages == ['eng+equ']
+
+
+@pytest.mark.django_db
+def test_persistent_ocr_cache(monkeypatch, pdf_path):
+    """Repeated OCR of the same PDF content should be read from the cache."""
+    sha1_hash = '0000000000000000000000000000000000000000'
+    pdf = PdfReader(path=pdf_path, sha1_hash=sha1_hash)
+    text = pdf.ocr_text()
+    confidences = pdf.page_confidences
+
+    # Neither GhostScript nor Tesseract should be invoked anew
+    monkeypatch.delattr('examiner.pdf.PdfReader._render_pages')
+    monkeypatch.delattr('examiner.pdf.PdfReader._ocr')
+    cached_pdf = PdfReader(path=pdf_path, sha1_hash=sha1_hash)
+    assert cached_pdf.ocr_text() == text
+    assert cached_pdf.page_confidences == confidences
+
+
+def test_iter_pages():
+    """The text layer should be iterable one page at a time."""
+    pdf_path = Path(__file__).parent / 'data' / 'matmod_exam_des_2017.pdf'
+    pdf = PdfReader(path=pdf_path)
+    assert isinstance(next(pdf.iter_pages()), str)
+
+    pages = list(pdf.iter_pages())
+    assert len(pages) == 6
+    assert 'Rottman' in '\f'.join(pages)
+
+
+def test_rendering_of_consecutive_pages(monkeypatch, pdf_path, tmpdir):
+    """Each run of consecutive pages should be rendered by one process."""
+    calls = []
+
+    def ghostscript(self, output_file, first_page, last_page, **rendering):
+        calls.append((first_page, last_page))
+        for index in range(last_page - first_page + 1):
+            Path(str(output_file) % (index + 1)).touch()
+
+    monkeypatch.setattr(PdfReader, '_ghostscript', ghostscript)
+    pdf = PdfReader(path=pdf_path)
+    tiff_files = pdf._render_pages(
+        page_numbers=[5, 0, 1, 2, 6, 9],
+        directory=Path(tmpdir),
+        device='tiffgray',
+        resolution=200,
+    )
+    assert calls == [(1, 3), (6, 7), (10, 10)]
+    assert [tiff_file.name for tiff_file in tiff_files] == [
+        '0006-0001.tif',
+        '0001-0001.tif',
+        '0001-0002.tif',
+        '0001-0003.tif',
+        '0006-0002.tif',
+        '0010-0001.tif',
+    ]
@@ -0,0 +1,72 @@
+from pathlib import Path
+
+import pytest
+
+import requests
+
+from examiner.crawlers import DvikanCrawler
+from examiner.replay import FixtureArchive, ReplayServer, benchmark, crawl
+
+
+def _response(body: str) -> requests.Response:
+    """Return response as recorded from a live site."""
+    response = requests.Response()
+    response.status_code = 200
+    response.headers['Content-Type'] = 'text/html; charset=utf-8'
+    response._content = body.encode('utf-8')
+    return response
+
+
+@pytest.fixture
+def dvikan_archive(tmpdir):
+    """Fixture archive of dvikan.no with one course and two exam PDFs."""
+    archive = FixtureArchive(crawlers=('dvikan',))
+    archive.add(
+        DvikanCrawler.BASE_URL,
+        _response(
+            '<a href="https://dvikan.no">Hjem</a>'
+            '<a href="TMA4130/">TMA4130</a>'
+        ),
+    )
+    archive.add(
+        DvikanCrawler.BASE_URL + 'TMA4130/',
+        _response(
+            '<a href="eksamen_2010.pdf">Eksamen</a>'
+            '<a href="losning_2010.pdf">Løsning</a>'
+        ),
+    )
+
+    # The archive survives a round trip to disk
+    path = Path(tmpdir) / 'dvikan.zip'
+    archive.save(path)
+    return FixtureArchive.load(path)
+
+
+@pytest.mark.withoutresponses
+def test_replay_of_recorded_site(dvikan_archive):
+    """Crawlers should find the same URLs in the replay as on the site."""
+    with ReplayServer(dvikan_archive) as server, server.redirect():
+        urls = crawl('dvikan')
+
+    course_url = DvikanCrawler.BASE_URL + 'TMA4130/'
+    assert sorted(urls) == [
+        course_url + 'eksamen_2010.pdf',
+        course_url + 'losning_2010.pdf',
+    ]
+    assert server.requests == 2
+
+
+@pytest.mark.withoutresponses
+def test_crawler_benchmark_with_failures(dvikan_archive):
+    """Benchmarks should report throughput and injected failures."""
+    result, = benchmark(dvikan_archive, concurrency_levels=(1, 4))
+    assert result['crawler'] == 'dvikan'
+    assert result['concurrency'] == 1
+    assert result['urls'] == 2
+    assert result['urls_per_second'] > 0
+    assert result['failures'] == 0
+
+    # A failing site index stops the crawl
+    result, = benchmark(dvikan_archive, failure_rate=1.0)
+    assert result['urls'] == 0
+    assert result['requests'] == result['failures'] == 1
@@ -0,0 +1,95 @@
+import csv
+import json
+from concurrent.futures import Future
+from pathlib import Path
+
+from django.core.files.base import ContentFile
+
+import pytest
+
+import responses
+
+from examiner import timing
+from examiner.management.commands.examiner import Command
+from examiner.models import Pdf, PdfUrl
+
+
+def test_pipeline_report_summary(tmpdir):
+    """Stage timings should be summarized with percentiles and throughput."""
+    with timing.recording() as report:
+        for seconds in range(1, 101):
+            timing.record('tesseract', seconds / 100, item='a', pages=1)
+        timing.record('http', 2.0, item='b', bytes=4_000_000)
+
+    # Nothing is recorded outside of a recording context
+    timing.record('http', 1.0)
+    assert len(report.records) == 101
+
+    http, tesseract = report.summary()
+    assert http['stage'] == 'http'
+    assert http['bytes_per_second'] == 2_000_000
+    assert http['pages_per_second'] is None
+
+    assert tesseract['count'] == 100
+    assert tesseract['p50_seconds'] == 0.5
+    assert tesseract['p99_seconds'] == 0.99
+    assert tesseract['max_seconds'] == 1.0
+    assert tesseract['pages_per_second'] == pytest.approx(100 / 50.5)
+
+    json_path = Path(tmpdir) / 'report.json'
+    report.write(json_path)
+    content = json.loads(json_path.read_text())
+    assert [stage['stage'] for stage in content['summary']] == [
+        'http',
+        'tesseract',
+    ]
+    assert len(content['records']) == 101
+
+    csv_path = Path(tmpdir) / 'report.csv'
+    report.write(csv_path)
+    with csv_path.open() as csv_file:
+        rows = list(csv.DictReader(csv_file))
+    assert [row['stage'] for row in rows] == ['http', 'tesseract']
+
+
+@responses.activate
+@pytest.mark.django_db
+def test_timing_of_file_backup():
+    """Downloads should be timed separately from hashing and storage."""
+    url = 'http://www.example.com/TMA4130/2013h/oldExams/eksamen.txt'
+    responses.add(
+        responses.GET,
+        url,
+        body=b'Exam text',
+        status=200,
+        content_type='text/plain',
+        stream=True,
+    )
+
+    with timing.recording() as report:
+        PdfUrl(url=url).backup_file(read=False)
+
+    stages = {record['stage']: record for record in report.records}
+    assert {'parse', 'http', 'sha1', 'storage', 'db'} <= set(stages)
+    assert stages['http']['item'] == url
+    assert stages['http']['bytes'] == 9
+    assert stages['sha1']['bytes'] == 9
+
+
+@pytest.mark.django_db
+def test_timing_of_text_layers_by_sha1_hash():
+    """Text layers read by worker processes should be recorded by hash."""
+    sha1_hash = '0' * 40
+    pdf = Pdf(sha1_hash=sha1_hash)
+    pdf.file.save(name=sha1_hash + '.pdf', content=ContentFile('exam'))
+    future = Future()
+    future.set_result((['page 1', 'page 2'], 0.5))
+
+    with timing.recording() as report:
+        assert Command._save_pages(pdf.id, sha1_hash, future)
+
+    assert [
+        (record['stage'], record['item'], record['pages'])
+        for record in report.records
+    ] == [('pdftotext', sha1_hash, 2), ('db', sha1_hash, 2)]
+    assert pdf.pages.count() == 2
@@ -1,10 +1,13 @@
+import json
+
 from django.core.files.base import ContentFile
 from django.shortcuts import reverse
 
 import pytest
 
 from examiner.forms import VerifyExamForm
-from examiner.models import DocumentInfo, DocumentInfoSource, Pdf
+from examiner.models import DocumentInfo, DocumentInfoSource, Pdf, PdfUrl
+from kokekunster.conditional import deferred_content_versions
 from semesterpage.tests.factories import CourseFactory
 
 
@@ -15,6 +18,39 @@ def test_empty_exams_view(client):
     assert response.status_code == 200
 
 
+@pytest.mark.django_db
+def test_conditional_get_of_exams_api(client):
+    """Unchanged exam archives should be answered with 304 Not Modified."""
+    url = reverse('examiner:all_exams')
+    response = client.get(url)
+    etag = response['ETag']
+
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+    # New exam content invalidates the ETag
+    DocumentInfo.objects.create(course_code='TMA4130')
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+
+    # New URLs of PDFs are rendered, and invalidate the ETag as well
+    etag = response['ETag']
+    PdfUrl.objects.create(url='http://www.example.com/exam.pdf')
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+
+    # Deferred changes invalidate the ETag when all of them are done
+    etag = response['ETag']
+    with deferred_content_versions():
+        DocumentInfo.objects.create(course_code='TMA4130', year=2010)
+        PdfUrl.objects.create(url='http://www.example.com/other_exam.pdf')
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+
+
 @pytest.mark.django_db
 def test_verify_random_pdf_view(client, django_user_model):
     """Test PDF verification view."""
@@ -140,3 +176,113 @@ def test_verify_pdf_view(admin_client):
     assert response.context['pdf'] == pdf
     response2 = admin_client.get(pdf2.get_absolute_url())
     assert response2.context['pdf'] == pdf2
+
+
+@pytest.mark.django_db
+def test_pdf_view(client, monkeypatch):
+    """Backed up PDFs should be delivered with support for byte ranges."""
+    sha1_hash = '0000000000000000000000000000000000000000'
+    pdf = Pdf(sha1_hash=sha1_hash)
+    pdf.file.save(name=sha1_hash + '.pdf', content=ContentFile('exam text'))
+    url = pdf.get_file_url()
+
+    # PDFs not connected to any exam are not publicly available
+    assert client.get(url).status_code == 404
+    exam = DocumentInfo.objects.create()
+    DocumentInfoSource.objects.create(pdf=pdf, document_info=exam)
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert b''.join(response.streaming_content) == b'exam text'
+    assert response['Accept-Ranges'] == 'bytes'
+
+    # Viewers can seek within the file
+    response = client.get(url, HTTP_RANGE='bytes=5-')
+    assert response.status_code == 206
+    assert response['Content-Range'] == 'bytes 5-8/9'
+    assert b''.join(response.streaming_content) == b'text'
+
+    response = client.get(url, HTTP_RANGE='bytes=20-')
+    assert response.status_code == 416
+
+    response = client.get(url, HTTP_RANGE='bytes=-4')
+    assert response['Content-Range'] == 'bytes 5-8/9'
+    assert client.head(url).status_code == 200
+
+    # Only the two requests starting at the beginning of the file are counted
+    pdf.refresh_from_db()
+    assert pdf.downloads == 2
+
+    # In production the transfer is handed over to nginx
+    monkeypatch.setattr(
+        'examiner.views.ACCEL_REDIRECT_PREFIX',
+        '/protected-media/',
+    )
+    response = client.get(url)
+    assert response['X-Accel-Redirect'] == (
+        '/protected-media/examiner/FileBackup/00/00/' + sha1_hash + '.pdf'
+    )
+
+
+@pytest.mark.django_db
+def test_batch_verification(admin_client, admin_user):
+    """Several PDFs should be verifiable in one request."""
+    pdfs = []
+    for sha1_hash in ('0' * 40, '1' * 40):
+        pdf = Pdf(sha1_hash=sha1_hash)
+        pdf.file.save(name=sha1_hash + '.pdf', content=ContentFile('exam'))
+        unverified = DocumentInfo.objects.create(course_code='TMA1000')
+        DocumentInfoSource.objects.create(pdf=pdf, document_info=unverified)
+        pdfs.append(pdf)
+    CourseFactory(course_code='TMA4130')
+    CourseFactory(course_code='TMA4135')
+
+    metadata = {
+        'language': 'Bokmål',
+        'year': 2010,
+        'season': 1,
+        'solutions': False,
+        'content_type': 'Exam',
+    }
+    decisions = [
+        {'sha1_hash': '0' * 40, 'courses': ['TMA4130', 'tma4135'], **metadata},
+        {'sha1_hash': '1' * 40, 'courses': ['TMA4130'], **metadata},
+    ]
+    url = reverse('examiner:verify_batch')
+
+    # Unknown courses invalidate the entire batch
+    response = admin_client.post(
+        url,
+        json.dumps({'decisions': [
+            *decisions,
+            {'sha1_hash': '0' * 40, 'courses': ['TMA9999'], **metadata},
+        ]}),
+        content_type='application/json',
+    )
+    assert response.status_code == 400
+    assert response.json()['errors'] == ['Unknown course TMA9999.']
+    assert not DocumentInfoSource.objects.filter(
+        verified_by__isnull=False,
+    ).exists()
+
+    response = admin_client.post(
+        url,
+        json.dumps({'decisions': decisions}),
+        content_type='application/json',
+    )
+    assert response.status_code == 200
+    assert response.json() == {
+        'verified_pdfs': 2,
+        'created_document_infos': 2,
+        'created_document_info_sources': 3,
+    }
+
+    # Both PDFs share the verified TMA4130 exam
+    verified = DocumentInfoSource.objects.filter(verified_by=admin_user)
+    assert verified.count() == 3
+    assert set(
+        verified.values_list('document_info__course_code', flat=True)
+    ) == {'TMA4130', 'TMA4135'}
+
+    # And the unverified sources have been removed
+    assert DocumentInfoSource.objects.count() == 3
@@ -0,0 +1,209 @@
+"""
+Per-stage timing of the examiner pipeline, see `manage.py examiner --report`.
+
+The pipeline code reports the duration of each stage, i.e. HTTP fetch, SHA1
+hashing, pdftotext, GhostScript, Tesseract, parsing, and database writes, by
+using timed() or record(). The measurements are only kept while a report is
+recording, see recording(), so the instrumentation costs no more than a few
+calls to time.perf_counter() otherwise.
+"""
+import csv
+import json
+import math
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Union
+
+
+# Stages reported by the pipeline, in pipeline order
+STAGES = (
+    'crawl',
+    'http',
+    'sha1',
+    'storage',
+    'pdftotext',
+    'ghostscript',
+    'tesseract',
+    'preview',
+    'parse',
+    'db',
+)
+
+# Percentiles of stage durations included in the summary
+PERCENTILES = (50, 90, 95, 99)
+
+# The report currently recording, if any
+_report = None
+
+
+class PipelineReport:
+    """Collection of timed pipeline stages, one record per URL or PDF."""
+
+    def __init__(self) -> None:
+        self.records: List[Dict[str, Union[str, float, int, None]]] = []
+        self.started_at = datetime.now()
+        self._start = time.perf_counter()
+        self.wall_seconds = 0.0
+
+    def record(
+        self,
+        stage: str,
+        seconds: float,
+        item: Optional[str] = None,
+        bytes: int = 0,
+        pages: int = 0,
+    ) -> None:
+        """Add the measurement of one stage of the given URL or PDF."""
+        self.records.append({
+            'stage': stage,
+            'item': item,
+            'seconds': seconds,
+            'bytes': bytes,
+            'pages': pages,
+        })
+
+    def stop(self) -> None:
+        """Stop the wall clock of the report."""
+        self.wall_seconds = time.perf_counter() - self._start
+
+    def summary(self) -> List[Dict[str, Union[str, float, int, None]]]:
+        """
+        Return statistics of each stage, in pipeline order.
+
+        Throughput is only given for stages which process bytes or pages, and
+        is relative to the time spent in the stage itself.
+        """
+        stages = sorted(
+            {record['stage'] for record in self.records},
+            key=lambda stage: (
+                STAGES.index(stage) if stage in STAGES else len(STAGES),
+                stage,
+            ),
+        )
+        summary = []
+        for stage in stages:
+            records = [
+                record for record in self.records if record['stage'] == stage
+            ]
+            seconds = sorted(record['seconds'] for record in records)
+            total = sum(seconds)
+            pages = sum(record['pages'] for record in records)
+            bytes = sum(record['bytes'] for record in records)
+            summary.append({
+                'stage': stage,
+                'count': len(records),
+                'total_seconds': total,
+                'mean_seconds': total / len(records),
+                **{
+                    f'p{rank}_seconds': percentile(seconds, rank)
+                    for rank in PERCENTILES
+                },
+                'max_seconds': seconds[-1],
+                'pages': pages,
+                'bytes': bytes,
+                'pages_per_second': pages / total if pages and total else None,
+                'bytes_per_second': bytes / total if bytes and total else None,
+            })
+        return summary
+
+    def write(self, path: Union[Path, str]) -> None:
+        """
+        Write report to path, as CSV if the suffix is .csv, else as JSON.
+
+        The CSV file only contains the summary of each stage, while the JSON
+        file also contains every single measurement.
+        """
+        path = Path(path)
+        summary = self.summary()
+        if path.suffix.lower() == '.csv':
+            with path.open('w', newline='') as report_file:
+                writer = csv.DictWriter(
+                    report_file,
+                    fieldnames=list(summary[0]) if summary else ['stage'],
+                )
+                writer.writeheader()
+                writer.writerows(summary)
+            return
+
+        # Imported here in order to keep this module free of heavy imports
+        from examiner import pdf
+        pdf.ocr_enabled()
+
+        pages = sum(
+            record['pages']
+            for record in self.records
+            if record['stage'] in ('pdftotext', 'tesseract')
+        )
+        path.write_text(json.dumps(
+            {
+                'started_at': self.started_at.isoformat(),
+                'wall_seconds': self.wall_seconds,
+                'pages_read': pages,
+                'pages_read_per_second': (
+                    pages / self.wall_seconds if self.wall_seconds else None
+                ),
+                'tesseract_version': pdf.TESSERACT_VERSION,
+                'summary': summary,
+                'records': self.records,
+            },
+            indent=2,
+        ))
+
+
+@contextmanager
+def recording() -> Iterator[PipelineReport]:
+    """Record all timed pipeline stages within the context to a report."""
+    global _report
+    previous, _report = _report, PipelineReport()
+    try:
+        yield _report
+    finally:
+        _report.stop()
+        _report = previous
+
+
+def record(
+    stage: str,
+    seconds: float,
+    item: Optional[str] = None,
+    bytes: int = 0,
+    pages: int = 0,
+) -> None:
+    """Record a measured stage, if a report is recording."""
+    if _report is not None:
+        _report.record(stage, seconds, item=item, bytes=bytes, pages=pages)
+
+
+@contextmanager
+def timed(stage: str, item: Optional[str] = None) -> Iterator[Dict[str, int]]:
+    """
+    Record the duration of the context as the given stage.
+
+    The yielded dictionary may be updated with the number of 'bytes' and
+    'pages' processed within the context.
+    """
+    counts = {'bytes': 0, 'pages': 0}
+    start = time.perf_counter()
+    try:
+        yield counts
+    finally:
+        record(stage, time.perf_counter() - start, item=item, **counts)
+
+
+def timed_call(function, *args, **kwargs):
+    """
+    Return result of function call and its duration in seconds.
+
+    Used for timing stages in worker processes, where no report is recording.
+    """
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def percentile(values: List[float], rank: int) -> float:
+    """Return the nearest-rank percentile of a sorted list of values."""
+    index = math.ceil(rank / 100 * len(values))
+    return values[max(index, 1) - 1]
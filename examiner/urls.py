@@ -14,11 +14,26 @@ urlpatterns = [
         views.VerifyView.as_view(),
         name='verify_random',
     ),
+    url(
+        r'^verify/batch$',
+        views.verify_batch_view,
+        name='verify_batch',
+    ),
     url(
         r'^verify/(?P<sha1_hash>[0-9a-f]{40})$',
         views.VerifyView.as_view(),
         name='verify_pdf',
     ),
+    url(
+        r'^verify/(?P<sha1_hash>[0-9a-f]{40})/skip$',
+        views.verify_skip_view,
+        name='verify_skip',
+    ),
+    url(
+        r'^pdf/(?P<sha1_hash>[0-9a-f]{40})\.pdf$',
+        views.pdf_view,
+        name='pdf',
+    ),
     url(
         r'^course/$',
         views.ExamsView.as_view(),
@@ -1,23 +1,59 @@
-from random import randint
+import json
+import os
+import re
 
 from django.conf import settings
+from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.exceptions import ValidationError
 from django.db import transaction
 from django.db.models import F
-from django.http import JsonResponse
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import (
+    condition,
+    require_POST,
+    require_safe,
+)
 from django.views.generic.edit import FormView
 from django.views.generic.list import ListView
 
-from examiner.forms import ExamsSearchForm, VerifyExamForm
+from examiner.forms import ExamsSearchForm, VerifyExamForm, verify_batch
 from examiner.models import DocumentInfo, DocumentInfoSource, Pdf, PdfUrl
+from kokekunster.conditional import etag
 from semesterpage.models import Course, Semester, StudyProgram
 from semesterpage.views import CourseAutocomplete
 
 
 DEFAULT_SEMESTER_PK = getattr(settings, 'DEFAULT_SEMESTER_PK', 1)
 
+# Internal nginx location serving MEDIA_ROOT, see config/nginx/production.conf.
+# If None, PDF files are served by Django itself.
+ACCEL_REDIRECT_PREFIX = getattr(settings, 'EXAMINER_ACCEL_REDIRECT_PREFIX', None)
 
+# Single byte range of the form 'bytes=start-end', 'bytes=start-' or 'bytes=-n'
+BYTE_RANGE = re.compile(r'^bytes=(?P<start>\d*)-(?P<end>\d*)$')
+
+
+def exams_etag(request, course_code=None, api=False):
+    """Return ETag of exam archive, the same for API and HTML responses."""
+    return etag(
+        request,
+        ('examiner', 'semesterpage'),
+        'api' if api else 'html',
+        (course_code or '').upper(),
+        request.session.get('semester_pk'),
+    )
+
+
+@method_decorator(condition(etag_func=exams_etag), name='get')
 class ExamsView(ListView):
     model = PdfUrl
     template_name = 'examiner/exam_archive.html'
@@ -82,10 +118,10 @@ class VerifyView(LoginRequiredMixin, FormView):
                 sha1_hash=sha1_hash,
             )
         else:
-            exam_pdfs = DocumentInfoSource.objects.filter(
-                verified_by__isnull=True,
-            )
-            pdf = exam_pdfs[randint(0, exam_pdfs.count() - 1)].pdf
+            # The most uncertain PDF not being verified by anyone else
+            pdf = Pdf.objects.lease(user=request.user)
+            if pdf is None:
+                raise Http404('No unverified PDFs left.')
 
         exams = pdf.exams.all()
         form = VerifyExamForm(
@@ -103,6 +139,9 @@ class VerifyView(LoginRequiredMixin, FormView):
     @transaction.atomic
     def form_valid(self, form):
         form.save(commit=True)
+        Pdf.objects.filter(pk=form.cleaned_data['pdf'].pk).release(
+            user=self.request.user,
+        )
         courses = form.courses
         if courses.exists():
             # Redirect to first course exam archive view
@@ -111,6 +150,136 @@ class VerifyView(LoginRequiredMixin, FormView):
         return redirect(to='examiner:verify_random')
 
 
+@login_required
+@require_POST
+def verify_skip_view(request, sha1_hash):
+    """Skip the PDF leased to the user, verifying another PDF instead."""
+    Pdf.objects.filter(sha1_hash=sha1_hash).skip(user=request.user)
+    return redirect(to='examiner:verify_random')
+
+
+@require_safe
+def pdf_view(request, sha1_hash):
+    """
+    Deliver backed up PDF file with given SHA1 hash.
+
+    PDFs not yet connected to any exam are only available to logged in users,
+    i.e. for verification. The transfer itself is handed over to nginx with
+    X-Accel-Redirect if EXAMINER_ACCEL_REDIRECT_PREFIX is configured, such
+    that no worker is occupied by streaming the file.
+    """
+    pdf = get_object_or_404(Pdf, sha1_hash=sha1_hash)
+    if not request.user.is_authenticated and not pdf.exams.exists():
+        raise Http404('PDF not connected to any exam.')
+
+    # PDF viewers request several byte ranges of the same file, only the
+    # range from the start of the file is regarded as a download. Suffix
+    # ranges, i.e. 'bytes=-n', are used to read the trailer of the PDF.
+    range_header = request.META.get('HTTP_RANGE', '')
+    match = BYTE_RANGE.match(range_header)
+    if request.method != 'HEAD' and (
+        not match or match.group('start') == '0'
+    ):
+        Pdf.objects.filter(pk=pdf.pk).update(downloads=F('downloads') + 1)
+
+    if ACCEL_REDIRECT_PREFIX:
+        # nginx handles byte ranges of internal redirects by itself
+        response = HttpResponse(content_type='application/pdf')
+        response['X-Accel-Redirect'] = ACCEL_REDIRECT_PREFIX + pdf.file.name
+    else:
+        response = _file_response(pdf.file.path, match)
+
+    response['Content-Disposition'] = f'inline; filename="{sha1_hash}.pdf"'
+    return response
+
+
+def _file_response(path, byte_range):
+    """
+    Return response serving the file at path, optionally a single byte range.
+
+    Full files are served with FileResponse, which uses the sendfile support
+    of the WSGI server if available.
+    """
+    try:
+        size = os.path.getsize(path)
+        pdf_file = open(path, 'rb')
+    except OSError:
+        raise Http404('PDF file missing on disk.')
+
+    if not byte_range:
+        response = FileResponse(pdf_file, content_type='application/pdf')
+        response['Content-Length'] = size
+        response['Accept-Ranges'] = 'bytes'
+        return response
+
+    start, end = byte_range.group('start'), byte_range.group('end')
+    if start:
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    elif end:
+        # Suffix range, i.e. the last n bytes of the file
+        start = max(size - int(end), 0)
+        end = size - 1
+    else:
+        start = size
+
+    if start > end or start >= size:
+        pdf_file.close()
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    response = StreamingHttpResponse(
+        _read_range(pdf_file, start, end - start + 1),
+        status=206,
+        content_type='application/pdf',
+    )
+    response['Content-Length'] = end - start + 1
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def _read_range(pdf_file, start, length, chunk_size=FileResponse.block_size):
+    """Yield length bytes of the open file, starting at offset start."""
+    with pdf_file:
+        pdf_file.seek(start)
+        while length > 0:
+            chunk = pdf_file.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+@require_POST
+def verify_batch_view(request):
+    """
+    Verify several PDFs with one JSON request, see examiner.forms.verify_batch.
+
+    The request body should be a JSON object with a 'decisions' list. Only
+    users allowed to change document infos may use this endpoint.
+    """
+    if not request.user.has_perm('examiner.change_documentinfo'):
+        return JsonResponse({'errors': ['Permission denied.']}, status=403)
+
+    try:
+        decisions = json.loads(request.body.decode('utf-8'))['decisions']
+        if not isinstance(decisions, list):
+            raise TypeError
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse(
+            {'errors': ['Expected JSON object with a list of decisions.']},
+            status=400,
+        )
+
+    try:
+        result = verify_batch(decisions=decisions, verifier=request.user)
+    except ValidationError as error:
+        return JsonResponse({'errors': error.messages}, status=400)
+    return JsonResponse(result)
+
+
 class CourseWithExamsAutocomplete(CourseAutocomplete):
     """Autocompletion view for courses with related exams."""
 
@@ -121,6 +290,16 @@ class CourseWithExamsAutocomplete(CourseAutocomplete):
         return qs.filter(docinfos__isnull=False).distinct()
 
 
+def search_etag(request):
+    """Return ETag of search view, which shows exam and course counts."""
+    return etag(
+        request,
+        ('examiner', 'semesterpage'),
+        request.session.get('semester_pk'),
+    )
+
+
+@method_decorator(condition(etag_func=search_etag), name='get')
 class SearchView(FormView):
     """View for course search."""
 
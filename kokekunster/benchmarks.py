@@ -0,0 +1,436 @@
+"""
+Offline benchmarks of the most visited views, see `manage.py benchmark_views`.
+
+generate_data() fills the database with realistic volumes, by default 50
+study programs, 5 000 courses, 50 000 exam PDFs and 500 000 PDF pages, built
+from the model factories used by the test suite. measure() requests a view
+repeatedly with the test client, recording latency percentiles and the number
+of database queries. The results of each run are stored as JSON files, named
+by git commit, so that runs can be compared between commits, see compare().
+"""
+import hashlib
+import json
+import subprocess
+import time
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.shortcuts import reverse
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from examiner.models import (
+    DocumentInfo,
+    DocumentInfoSource,
+    Pdf,
+    PdfPage,
+    PdfUrl,
+)
+from examiner.storage import sharded_path
+from examiner.timing import percentile
+from kokekunster.conditional import bump_content_version
+from semesterpage.models import Course, CourseLink, Semester
+
+
+# Number of objects generated at scale 1
+VOLUMES = {
+    'study_programs': 50,
+    'courses': 5000,
+    'pdfs': 50000,
+    'pages': 500000,
+}
+
+# Semesters of each study program, the last ones belong to a main profile
+SEMESTERS_PER_STUDY_PROGRAM = 10
+COMMON_SEMESTERS = 5
+
+# Links shown for each course on the semester pages
+LINKS_PER_COURSE = 3
+
+# Courses chosen by the benchmarked student
+STUDENT_COURSES = 10
+
+# Identifies generated objects, such that data is only generated once
+COURSE_CODE_PREFIX = 'BEN'
+STUDENT_USERNAME = 'benchmark-student'
+
+# Courses generated and persisted together with their exams
+COURSE_BATCH_SIZE = 100
+
+# Text of each generated PDF page, roughly the length of a sparse exam page
+PAGE_TEXT = (
+    'Eksamen i {course_code}, {year}. Oppgave {page}. '
+    'Løs likningen og begrunn svaret ditt. '
+) * 8
+
+# Directory where benchmark results are stored
+RESULTS_DIRECTORY = Path(settings.BASE_DIR) / 'tmp' / 'benchmarks'
+
+# Latency percentiles included in the results
+PERCENTILES = (50, 90, 99)
+
+
+def generate_data(
+    scale: float = 1.0,
+    log: Callable[[str], None] = print,
+) -> bool:
+    """
+    Populate the database with benchmark data, unless already generated.
+
+    :param scale: Fraction of VOLUMES to generate, e.g. 0.01 for quick runs.
+      The number of PDFs per course and pages per PDF are independent of
+      scale.
+    :param log: Function called with progress messages.
+    :return: True if new data was generated.
+    """
+    # Imported here, as the factories are only needed when generating data
+    from semesterpage.tests.factories import (
+        CourseFactory,
+        CourseLinkFactory,
+        MainProfileFactory,
+        SemesterFactory,
+        StudyProgramFactory,
+    )
+
+    if Course.objects.filter(
+        course_code__startswith=COURSE_CODE_PREFIX,
+    ).exists():
+        log('Benchmark data already generated.')
+        return False
+
+    study_programs = max(1, round(VOLUMES['study_programs'] * scale))
+    courses = max(1, round(VOLUMES['courses'] * scale))
+    pdfs_per_course = VOLUMES['pdfs'] // VOLUMES['courses']
+    pages_per_pdf = VOLUMES['pages'] // VOLUMES['pdfs']
+
+    log(f'Generating {study_programs} study programs.')
+    semester_ids = []
+    with transaction.atomic():
+        for number in range(study_programs):
+            study_program = StudyProgramFactory(
+                full_name=f'Benchmarkstudium {number}',
+                display_name=f'Benchmark {number}',
+            )
+            main_profile = MainProfileFactory(
+                full_name=f'Benchmarkprofil {number}',
+                display_name=f'Profil {number}',
+                study_program=study_program,
+            )
+            for semester_number in range(1, SEMESTERS_PER_STUDY_PROGRAM + 1):
+                semester = SemesterFactory(
+                    number=semester_number,
+                    study_program=study_program,
+                    main_profile=(
+                        main_profile
+                        if semester_number > COMMON_SEMESTERS
+                        else None
+                    ),
+                )
+                semester_ids.append(semester.id)
+
+    log(
+        f'Generating {courses} courses with {pdfs_per_course} exam PDFs '
+        f'of {pages_per_pdf} pages each.'
+    )
+    course_codes = (
+        f'{COURSE_CODE_PREFIX}{number:05d}' for number in range(courses)
+    )
+    generated = 0
+    while True:
+        batch = list(islice(course_codes, COURSE_BATCH_SIZE))
+        if not batch:
+            break
+        with transaction.atomic():
+            Course.objects.bulk_create([
+                CourseFactory.build(
+                    course_code=course_code,
+                    full_name=f'Benchmarkfag {course_code}',
+                    display_name=course_code,
+                )
+                for course_code in batch
+            ])
+            # Primary keys are not set by bulk_create for all databases
+            course_objects = Course.objects.filter(course_code__in=batch)
+            course_ids = {
+                course.course_code: course.id for course in course_objects
+            }
+            Course.semesters.through.objects.bulk_create([
+                Course.semesters.through(
+                    course_id=course_ids[course_code],
+                    semester_id=semester_ids[
+                        (generated + index) % len(semester_ids)
+                    ],
+                )
+                for index, course_code in enumerate(batch)
+            ])
+            CourseLink.objects.bulk_create([
+                CourseLinkFactory.build(
+                    course=course,
+                    url=f'https://example.com/{course.course_code}/{number}/',
+                    title=f'Lenke {number}',
+                )
+                for course in course_objects
+                for number in range(LINKS_PER_COURSE)
+            ])
+            _generate_exams(course_ids, pdfs_per_course, pages_per_pdf)
+
+        generated += len(batch)
+        log(f'{generated}/{courses} courses generated.')
+
+    # The student page is rendered from these courses
+    student = User.objects.create(username=STUDENT_USERNAME)
+    student.options.self_chosen_courses.add(*Course.objects.filter(
+        course_code__startswith=COURSE_CODE_PREFIX,
+    ).order_by('course_code')[:STUDENT_COURSES])
+
+    # Bulk inserts send no signals, so cached ETags are invalidated manually
+    bump_content_version('semesterpage', 'examiner')
+    return True
+
+
+def _generate_exams(
+    course_ids: Dict[str, int],
+    pdfs_per_course: int,
+    pages_per_pdf: int,
+) -> None:
+    """Generate exams, PDFs, URLs and pages of the given courses."""
+    now = timezone.now()
+    exams = [
+        (course_code, 2000 + number // 2, bool(number % 2))
+        for course_code in course_ids
+        for number in range(pdfs_per_course)
+    ]
+    DocumentInfo.objects.bulk_create([
+        DocumentInfo(
+            course_id=course_ids[course_code],
+            course_code=course_code,
+            content_type=DocumentInfo.EXAM,
+            language='Bokmål',
+            year=year,
+            season=1,
+            solutions=solutions,
+        )
+        for course_code, year, solutions in exams
+    ])
+
+    docinfo_ids = {
+        (course_code, year, solutions): docinfo_id
+        for docinfo_id, course_code, year, solutions in (
+            DocumentInfo.objects
+            .filter(course_code__in=course_ids)
+            .values_list('id', 'course_code', 'year', 'solutions')
+        )
+    }
+    sha1_hashes = {
+        exam: hashlib.sha1(repr(exam).encode('utf-8')).hexdigest()
+        for exam in exams
+    }
+    Pdf.objects.bulk_create([
+        Pdf(
+            sha1_hash=sha1_hash,
+            file=sharded_path(sha1_hash),
+            created_at=now,
+            updated_at=now,
+        )
+        for sha1_hash in sha1_hashes.values()
+    ])
+    pdf_ids = dict(
+        Pdf.objects
+        .filter(sha1_hash__in=sha1_hashes.values())
+        .values_list('sha1_hash', 'id')
+    )
+
+    DocumentInfoSource.objects.bulk_create([
+        DocumentInfoSource(
+            document_info_id=docinfo_ids[exam],
+            pdf_id=pdf_ids[sha1_hash],
+        )
+        for exam, sha1_hash in sha1_hashes.items()
+    ])
+    PdfUrl.objects.bulk_create([
+        PdfUrl(
+            url=f'https://example.com/{course_code}/eksamen_{year}.pdf'
+            if not solutions
+            else f'https://example.com/{course_code}/losning_{year}.pdf',
+            filename=f'eksamen_{year}.pdf',
+            exam_id=docinfo_ids[(course_code, year, solutions)],
+            scraped_pdf_id=pdf_ids[sha1_hashes[(course_code, year, solutions)]],
+            probably_exam=True,
+            dead_link=False,
+            created_at=now,
+            updated_at=now,
+        )
+        for course_code, year, solutions in exams
+    ])
+    PdfPage.objects.bulk_create(
+        PdfPage(
+            pdf_id=pdf_ids[sha1_hash],
+            number=page,
+            text=PAGE_TEXT.format(course_code=course_code, year=year, page=page),
+        )
+        for (course_code, year, _), sha1_hash in sha1_hashes.items()
+        for page in range(pages_per_pdf)
+    )
+
+
+def endpoints() -> List[Tuple[str, str]]:
+    """Return name and URL of each benchmarked view."""
+    semester = (
+        Semester.objects
+        .filter(study_program__full_name__startswith='Benchmark', number=1)
+        .select_related('study_program', 'main_profile')
+        .first()
+    )
+    course_code = (
+        Course.objects
+        .filter(course_code__startswith=COURSE_CODE_PREFIX)
+        .order_by('course_code')
+        .values_list('course_code', flat=True)
+        .first()
+    )
+    course_url = reverse('examiner:course', kwargs={'course_code': course_code})
+    all_exams_url = reverse('examiner:all_exams')
+    query = f'?q={COURSE_CODE_PREFIX}0001'
+    return [
+        ('semester_view', semester.get_absolute_url()),
+        (
+            'studentpage',
+            reverse('semesterpage-studyprogram', args=(STUDENT_USERNAME,)),
+        ),
+        ('exams_html_course', course_url),
+        ('exams_html_all', all_exams_url),
+        # The API shares URL configuration with the HTML views
+        ('exams_api_course', '/api' + course_url),
+        ('exams_api_all', '/api' + all_exams_url),
+        ('search', reverse('examiner:search')),
+        (
+            'course_autocomplete',
+            reverse('semesterpage-course-autocomplete') + query,
+        ),
+        (
+            'exams_course_autocomplete',
+            reverse('examiner:course_autocomplete') + query,
+        ),
+    ]
+
+
+def measure(
+    url: str,
+    repetitions: int = 20,
+    warmup: int = 2,
+    client: Optional[Client] = None,
+) -> Dict[str, Any]:
+    """
+    Return latency percentiles and query counts of GET requests to url.
+
+    :param repetitions: Number of measured requests.
+    :param warmup: Number of requests made before measuring, filling caches.
+    :param client: Client used for the requests, anonymous by default.
+    """
+    client = client or Client()
+    for _ in range(warmup):
+        client.get(url)
+
+    latencies, queries = [], []
+    for _ in range(repetitions):
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            response = client.get(url)
+            latencies.append(time.perf_counter() - start)
+        queries.append(len(context.captured_queries))
+
+    latencies.sort()
+    return {
+        'url': url,
+        'status_code': response.status_code,
+        'bytes': len(response.content),
+        'requests': repetitions,
+        'mean_ms': 1000 * sum(latencies) / repetitions,
+        **{
+            f'p{rank}_ms': 1000 * percentile(latencies, rank)
+            for rank in PERCENTILES
+        },
+        'max_ms': 1000 * latencies[-1],
+        'queries': max(queries),
+    }
+
+
+def run(
+    repetitions: int = 20,
+    warmup: int = 2,
+    only: Iterable[str] = (),
+    log: Callable[[str], None] = print,
+) -> Dict[str, Any]:
+    """Benchmark all endpoints, or only the named ones, and return results."""
+    only = set(only)
+    results = {}
+    for name, url in endpoints():
+        if only and name not in only:
+            continue
+        log(f'Benchmarking {name}: {url}')
+        results[name] = measure(url, repetitions=repetitions, warmup=warmup)
+
+    return {
+        'commit': git_commit(),
+        'created_at': datetime.now().isoformat(),
+        'database': connection.vendor,
+        'repetitions': repetitions,
+        'results': results,
+    }
+
+
+def save(results: Dict[str, Any], directory: Path = RESULTS_DIRECTORY) -> Path:
+    """Store results as JSON, named by time and git commit, return path."""
+    directory.mkdir(parents=True, exist_ok=True)
+    timestamp = results['created_at'][:19].replace(':', '')
+    path = directory / f'{timestamp}-{results["commit"]}.json'
+    path.write_text(json.dumps(results, indent=2))
+    return path
+
+
+def compare(
+    old: Dict[str, Any],
+    new: Dict[str, Any],
+) -> List[Dict[str, Any]]:
+    """
+    Return the change of median latency and queries of each endpoint.
+
+    Only endpoints benchmarked in both runs are compared.
+    """
+    changes = []
+    for name, result in new['results'].items():
+        if name not in old['results']:
+            continue
+        previous = old['results'][name]
+        changes.append({
+            'endpoint': name,
+            'old_p50_ms': previous['p50_ms'],
+            'new_p50_ms': result['p50_ms'],
+            'p50_change': (
+                result['p50_ms'] / previous['p50_ms'] - 1
+                if previous['p50_ms'] else None
+            ),
+            'old_queries': previous['queries'],
+            'new_queries': result['queries'],
+        })
+    return changes
+
+
+def git_commit() -> str:
+    """Return abbreviated hash of the checked out commit, if known."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            check=True,
+        ).stdout.decode('utf-8').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
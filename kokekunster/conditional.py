@@ -0,0 +1,99 @@
+"""
+Validators for conditional GET requests, i.e. ETag and If-None-Match.
+
+Each app has a content version which is replaced whenever one of its models
+is changed, see the signal handlers of semesterpage and examiner. Views
+derive their ETags from the versions of the apps they render content from,
+such that repeat visits can be answered with 304 Not Modified without
+rendering anything.
+
+The versions are stored in the default cache, which must be shared between
+worker processes in production, see settings_prod.CACHES.
+"""
+import hashlib
+from contextlib import contextmanager
+from threading import Lock
+from typing import Iterator, Optional, Set
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.http import HttpRequest
+
+
+def content_version(scope: str) -> str:
+    """
+    Return the current content version of the given scope.
+
+    If the version is unknown, for instance after cache eviction, a new random
+    version is used, such that no previously issued ETag can match.
+    """
+    key = f'content_version:{scope}'
+    version = cache.get(key)
+    if version is None:
+        version = uuid4().hex
+        cache.add(key, version, timeout=None)
+        version = cache.get(key, version)
+    return version
+
+
+# Scopes bumped within deferred_content_versions(), None outside of it
+_deferred_scopes: Optional[Set[str]] = None
+_deferred_lock = Lock()
+
+
+def bump_content_version(*scopes: str) -> None:
+    """Invalidate all ETags derived from the given scopes."""
+    with _deferred_lock:
+        if _deferred_scopes is not None:
+            _deferred_scopes.update(scopes)
+            return
+
+    for scope in scopes:
+        cache.set(f'content_version:{scope}', uuid4().hex, timeout=None)
+
+
+@contextmanager
+def deferred_content_versions() -> Iterator[None]:
+    """
+    Bump each content version at most once, when the block is exited.
+
+    Used by management commands which save many objects, such that the cache
+    is not written once per saved object, and ETags do not change until all
+    the changes are done. Applies to all threads of the process.
+    """
+    global _deferred_scopes
+    with _deferred_lock:
+        if _deferred_scopes is not None:
+            # Already deferred by an enclosing block
+            nested = True
+        else:
+            nested = False
+            _deferred_scopes = set()
+
+    try:
+        yield
+    finally:
+        if not nested:
+            with _deferred_lock:
+                scopes, _deferred_scopes = _deferred_scopes, None
+            bump_content_version(*scopes)
+
+
+def etag(request: HttpRequest, scopes, *parts) -> str:
+    """
+    Return ETag for a page rendered from the content of the given scopes.
+
+    The page is assumed to depend on the requesting user, as all pages render
+    the navigation bar differently for authenticated users.
+
+    :param request: Request for the page.
+    :param scopes: Iterable of content version scopes the page depends on.
+    :param parts: Any additional values which the page content depends on.
+    """
+    user = request.user.pk if request.user.is_authenticated else None
+    validator = ':'.join(str(part) for part in (
+        *(content_version(scope) for scope in scopes),
+        user,
+        *parts,
+    ))
+    return hashlib.md5(validator.encode('utf-8')).hexdigest()
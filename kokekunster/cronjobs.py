@@ -2,11 +2,13 @@ from django.conf import settings
 from django.core import management
 from django_cron import CronJobBase, Schedule
 
+from kokekunster.media_backup import backup_media
+
 
 class Backup(CronJobBase):
     '''
     Run the django-dbbackup module every night at 03:00, saving the entire
-    datase and all media to Dropbox
+    datase to Dropbox
     '''
     RUN_AT_TIMES = getattr(settings, 'BACKUP_TIMES', ['3:00'])
     schedule = Schedule(run_at_times=RUN_AT_TIMES)
@@ -14,4 +16,21 @@ class Backup(CronJobBase):
 
     def do(self):
         management.call_command('dbbackup')
-        management.call_command('mediabackup')
+
+
+class MediaBackup(CronJobBase):
+    '''
+    Back up new and changed media files at the same times as the database,
+    see kokekunster.media_backup
+    '''
+    RUN_AT_TIMES = getattr(settings, 'BACKUP_TIMES', ['3:00'])
+    schedule = Schedule(run_at_times=RUN_AT_TIMES)
+    code = 'kokekunster.media_backup_cron'  # Unique identifier
+
+    def do(self):
+        stats = backup_media()
+        # Stored in the log of the cron job
+        return (
+            f'{stats["copied"]} of {stats["files"]} files copied '
+            f'({stats["bytes_copied"]} bytes), {stats["hashed"]} hashed'
+        )
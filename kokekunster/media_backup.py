@@ -0,0 +1,153 @@
+"""
+Incremental, content-addressed backups of the media files.
+
+Each file in MEDIA_ROOT is copied once into MEDIA_BACKUP_DIRECTORY, named by
+the SHA1 hash of its content, e.g. 'objects/ab/cd/abcd...ef'. The manifest,
+'manifest.json', maps the name of each media file to its hash, size and
+modification time. Files whose size and modification time are unchanged
+since the last backup are neither hashed nor copied anew, and the hashes of
+backed up PDFs are already known from Pdf.sha1_hash. Only new and changed
+files are therefore read, e.g. new course logos and CourseUpload files.
+
+A media file is restored by copying the object given by its manifest entry
+back to MEDIA_ROOT under the name of the entry.
+"""
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import Dict, Iterator, Optional, Union
+
+from django.conf import settings
+
+
+MANIFEST_NAME = 'manifest.json'
+
+
+def iter_media_files(media_root: Path) -> Iterator[Path]:
+    """Yield all media files, except temporary files of partial writes."""
+    for directory, _, filenames in os.walk(str(media_root)):
+        for filename in filenames:
+            if filename.startswith('.'):
+                continue
+            yield Path(directory) / filename
+
+
+def file_sha1(path: Path) -> str:
+    """Return SHA1 hash of file content."""
+    sha1_hasher = hashlib.sha1()
+    with path.open('rb') as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b''):
+            sha1_hasher.update(chunk)
+    return sha1_hasher.hexdigest()
+
+
+def object_path(destination: Path, sha1_hash: str) -> Path:
+    """Return path of the backup of the content with given hash."""
+    return (
+        destination / 'objects' / sha1_hash[0:2] / sha1_hash[2:4] / sha1_hash
+    )
+
+
+def load_manifest(destination: Path) -> Dict[str, Dict[str, Union[str, int]]]:
+    """Return manifest entries of the last backup, keyed by file name."""
+    try:
+        manifest = json.loads((destination / MANIFEST_NAME).read_text())
+    except FileNotFoundError:
+        return {}
+    return manifest['files']
+
+
+def _write_atomically(path: Path, write) -> None:
+    """Write file with write(file), never leaving a partial file behind."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with NamedTemporaryFile(
+        dir=str(path.parent),
+        prefix='.',
+        suffix='.tmp',
+        delete=False,
+    ) as temp_file:
+        try:
+            write(temp_file)
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        except BaseException:
+            os.remove(temp_file.name)
+            raise
+    os.replace(temp_file.name, str(path))
+
+
+def backup_media(
+    media_root: Optional[Union[Path, str]] = None,
+    destination: Optional[Union[Path, str]] = None,
+) -> Dict[str, int]:
+    """
+    Back up new and changed media files, see module docstring.
+
+    :param media_root: Directory to back up, defaults to MEDIA_ROOT.
+    :param destination: Backup directory, defaults to MEDIA_BACKUP_DIRECTORY.
+    :return: Number of files in the backup, number of files hashed, and
+      number of files and bytes copied.
+    """
+    # Imported here in order to prevent circular imports
+    from examiner.models import Pdf
+
+    media_root = Path(media_root or settings.MEDIA_ROOT)
+    destination = Path(destination or getattr(
+        settings,
+        'MEDIA_BACKUP_DIRECTORY',
+        os.path.join(settings.BASE_DIR, 'tmp', 'media_backup'),
+    ))
+
+    old_manifest = load_manifest(destination)
+    known_hashes = dict(Pdf.objects.values_list('file', 'sha1_hash'))
+    manifest = {}
+    stats = {'files': 0, 'hashed': 0, 'copied': 0, 'bytes_copied': 0}
+
+    for path in iter_media_files(media_root):
+        name = path.relative_to(media_root).as_posix()
+        stat = path.stat()
+        entry = old_manifest.get(name)
+        if (
+            entry and
+            entry['size'] == stat.st_size and
+            entry['mtime'] == stat.st_mtime_ns
+        ):
+            sha1_hash = entry['sha1']
+        elif name in known_hashes:
+            sha1_hash = known_hashes[name]
+        else:
+            sha1_hash = file_sha1(path)
+            stats['hashed'] += 1
+
+        backup_path = object_path(destination, sha1_hash)
+        if not backup_path.exists():
+            with path.open('rb') as source:
+                _write_atomically(
+                    backup_path,
+                    lambda file: shutil.copyfileobj(source, file),
+                )
+            stats['copied'] += 1
+            stats['bytes_copied'] += stat.st_size
+
+        manifest[name] = {
+            'sha1': sha1_hash,
+            'size': stat.st_size,
+            'mtime': stat.st_mtime_ns,
+        }
+        stats['files'] += 1
+
+    # The manifest is only replaced when all objects it refers to exist
+    content = json.dumps(
+        {'backed_up_at': datetime.now().isoformat(), 'files': manifest},
+        indent=2,
+        sort_keys=True,
+    ).encode('utf-8')
+    _write_atomically(
+        destination / MANIFEST_NAME,
+        lambda file: file.write(content),
+    )
+    return stats
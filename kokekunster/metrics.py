@@ -0,0 +1,506 @@
+"""
+Request-level performance metrics exposed in the Prometheus text format.
+
+MetricsMiddleware measures every request, labelled by the resolved view name:
+wall time, number and duration of database queries, template rendering time,
+cache hits and misses, and outgoing HTTP requests, e.g. to Dataporten.
+
+The measurements are aggregated in-process into histograms and counters.
+Each worker process periodically writes a snapshot of its own metrics to its
+own file in METRICS_DIRECTORY, and metrics_view sums the snapshots of all the
+processes. The endpoint therefore reports the same totals regardless of which
+gunicorn worker answers the scrape. Snapshots of processes which have exited
+are merged into a single file of retired metrics when collected, such that
+the totals stay monotonic across worker restarts.
+"""
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import Any, Dict, List, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.backends.utils import CursorWrapper
+from django.http import HttpRequest, HttpResponse
+from django.template.base import Template
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Directory shared by all worker processes, if None only the metrics of the
+# process answering the scrape are reported
+METRICS_DIRECTORY = getattr(settings, 'METRICS_DIRECTORY', None)
+
+# Minimum number of seconds between two snapshots written by a process
+FLUSH_INTERVAL = getattr(settings, 'METRICS_FLUSH_INTERVAL', 15)
+
+# Bearer token required by metrics_view, staff users are always allowed
+METRICS_TOKEN = getattr(settings, 'METRICS_TOKEN', None)
+
+# Upper bounds of histogram buckets, by unit
+BUCKETS = {
+    'seconds': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    'count': (0, 1, 2, 5, 10, 20, 50, 100, 200, 500),
+}
+
+# Help text and unit of each histogram
+HISTOGRAMS = {
+    'django_request_duration_seconds': (
+        'Wall time of requests.',
+        'seconds',
+    ),
+    'django_request_db_queries': (
+        'Database queries per request.',
+        'count',
+    ),
+    'django_request_db_duration_seconds': (
+        'Time spent in database queries per request.',
+        'seconds',
+    ),
+    'django_request_template_duration_seconds': (
+        'Time spent rendering templates per request.',
+        'seconds',
+    ),
+    'django_request_http_calls': (
+        'Outgoing HTTP requests per request.',
+        'count',
+    ),
+    'django_request_http_duration_seconds': (
+        'Time spent in outgoing HTTP requests per request.',
+        'seconds',
+    ),
+}
+
+# Help text of each counter
+COUNTERS = {
+    'django_responses_total': 'Responses by view and status code.',
+    'django_cache_requests_total': 'Cache lookups by view and result.',
+}
+
+# Snapshot containing the merged metrics of exited processes
+RETIRED_SNAPSHOT = 'retired.json'
+
+# Default of instrumented cache lookups, distinguishing misses from None values
+_MISSING = object()
+
+Labels = Tuple[Tuple[str, str], ...]
+
+# Measurements of the request handled by the current thread, if any
+_local = threading.local()
+
+
+class Registry:
+    """Thread-safe in-process aggregation of histograms and counters."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.histograms: Dict[Tuple[str, Labels], Dict[str, Any]] = {}
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.flushed_at = time.monotonic()
+        self.snapshot_name = f'{os.getpid()}-{int(time.time())}.json'
+
+    def observe(self, name: str, labels: Labels, value: float) -> None:
+        """Add an observation to the histogram with the given labels."""
+        bounds = BUCKETS[HISTOGRAMS[name][1]]
+        with self._lock:
+            histogram = self.histograms.setdefault((name, labels), {
+                'buckets': [0] * len(bounds),
+                'sum': 0.0,
+                'count': 0,
+            })
+            for index, bound in enumerate(bounds):
+                if value <= bound:
+                    histogram['buckets'][index] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    def inc(self, name: str, labels: Labels, amount: float = 1) -> None:
+        """Increment the counter with the given labels."""
+        with self._lock:
+            key = (name, labels)
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def snapshot(self) -> Dict[str, List]:
+        """Return JSON serializable copy of all metrics."""
+        with self._lock:
+            return {
+                'histograms': [
+                    [name, labels, dict(histogram, buckets=list(
+                        histogram['buckets'],
+                    ))]
+                    for (name, labels), histogram in self.histograms.items()
+                ],
+                'counters': [
+                    [name, labels, value]
+                    for (name, labels), value in self.counters.items()
+                ],
+            }
+
+    def flush(self, force: bool = False) -> None:
+        """
+        Write snapshot to METRICS_DIRECTORY if FLUSH_INTERVAL has passed.
+
+        Only one thread writes the snapshot per interval. The snapshot is
+        written to a temporary file which then atomically replaces the
+        previous snapshot of this process. Errors are logged instead of
+        raised, as the snapshot is written in the request path.
+        """
+        if not METRICS_DIRECTORY:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self.flushed_at < FLUSH_INTERVAL:
+                return
+            self.flushed_at = now
+
+        directory = Path(METRICS_DIRECTORY)
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            with NamedTemporaryFile(
+                mode='w',
+                dir=str(directory),
+                prefix='.',
+                delete=False,
+            ) as temp_file:
+                json.dump(self.snapshot(), temp_file)
+            os.replace(temp_file.name, str(directory / self.snapshot_name))
+        except OSError:
+            logger.exception(
+                f'Metrics snapshot could not be written to {directory}',
+            )
+
+
+REGISTRY = Registry()
+
+
+def record_cache_lookup(hit: bool, lookups: int = 1) -> None:
+    """Count cache hits or misses for the request handled by this thread."""
+    measurement = getattr(_local, 'measurement', None)
+    if measurement is not None:
+        measurement['cache_hits' if hit else 'cache_misses'] += lookups
+
+
+class MetricsMiddleware:
+    """Middleware measuring each request, see module docstring."""
+
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+        _instrument()
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        measurement = _local.measurement = {
+            'template_depth': 0,
+            'template_duration': 0.0,
+            'http_calls': 0,
+            'http_duration': 0.0,
+            'cache_hits': 0,
+            'cache_misses': 0,
+            'db_queries': 0,
+            'db_duration': 0.0,
+        }
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            duration = time.perf_counter() - start
+            _local.measurement = None
+
+        view = getattr(request.resolver_match, 'view_name', None)
+        labels = (('view', view or 'unresolved'),)
+        for name, value in (
+            ('django_request_duration_seconds', duration),
+            ('django_request_db_queries', measurement['db_queries']),
+            (
+                'django_request_db_duration_seconds',
+                measurement['db_duration'],
+            ),
+            (
+                'django_request_template_duration_seconds',
+                measurement['template_duration'],
+            ),
+            ('django_request_http_calls', measurement['http_calls']),
+            (
+                'django_request_http_duration_seconds',
+                measurement['http_duration'],
+            ),
+        ):
+            REGISTRY.observe(name, labels, value)
+
+        REGISTRY.inc(
+            'django_responses_total',
+            labels + (('status', str(response.status_code)),),
+        )
+        for result, lookups in (
+            ('hit', measurement['cache_hits']),
+            ('miss', measurement['cache_misses']),
+        ):
+            if lookups:
+                REGISTRY.inc(
+                    'django_cache_requests_total',
+                    labels + (('result', result),),
+                    lookups,
+                )
+
+        REGISTRY.flush()
+        return response
+
+
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    """Return the metrics of all worker processes in the Prometheus format."""
+    authorized = request.user.is_authenticated and request.user.is_staff
+    if METRICS_TOKEN:
+        bearer = request.META.get('HTTP_AUTHORIZATION', '')
+        authorized = authorized or bearer == f'Bearer {METRICS_TOKEN}'
+    if not authorized:
+        return HttpResponse(status=403)
+
+    return HttpResponse(
+        render_metrics(collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
+def collect() -> Dict[str, Dict]:
+    """Return the sum of the metrics of all worker processes."""
+    REGISTRY.flush(force=True)
+    if not METRICS_DIRECTORY:
+        return _merge([REGISTRY.snapshot()])
+
+    directory = Path(METRICS_DIRECTORY)
+    with (directory / '.lock').open('w') as lock:
+        # Scrapes answered concurrently must not merge the same snapshots
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        _retire_snapshots(directory)
+
+        snapshots = []
+        for path in sorted(directory.glob('*.json')):
+            try:
+                snapshots.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                # Snapshot of a process which is being replaced
+                continue
+    return _merge(snapshots)
+
+
+def _retire_snapshots(directory: Path) -> None:
+    """Merge the snapshots of exited processes into RETIRED_SNAPSHOT."""
+    retired = []
+    for path in directory.glob('*-*.json'):
+        pid = int(path.name.split('-')[0])
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            retired.append(path)
+        except PermissionError:
+            # Process of another user
+            continue
+    if not retired:
+        return
+
+    snapshots = []
+    for path in [directory / RETIRED_SNAPSHOT, *retired]:
+        try:
+            snapshots.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue
+    metrics = _merge(snapshots)
+    with NamedTemporaryFile(
+        mode='w',
+        dir=str(directory),
+        prefix='.',
+        delete=False,
+    ) as temp_file:
+        json.dump(
+            {
+                'histograms': [
+                    [name, labels, histogram]
+                    for (name, labels), histogram
+                    in metrics['histograms'].items()
+                ],
+                'counters': [
+                    [name, labels, value]
+                    for (name, labels), value in metrics['counters'].items()
+                ],
+            },
+            temp_file,
+        )
+    os.replace(temp_file.name, str(directory / RETIRED_SNAPSHOT))
+    for path in retired:
+        path.unlink()
+
+
+def _merge(snapshots: List[Dict[str, List]]) -> Dict[str, Dict]:
+    """Return the sum of the given snapshots, see Registry.snapshot."""
+    histograms: Dict[Tuple[str, Labels], Dict[str, Any]] = {}
+    counters: Dict[Tuple[str, Labels], float] = {}
+    for snapshot in snapshots:
+        for name, labels, histogram in snapshot['histograms']:
+            key = (name, tuple(tuple(label) for label in labels))
+            total = histograms.setdefault(key, {
+                'buckets': [0] * len(histogram['buckets']),
+                'sum': 0.0,
+                'count': 0,
+            })
+            for index, count in enumerate(histogram['buckets']):
+                total['buckets'][index] += count
+            total['sum'] += histogram['sum']
+            total['count'] += histogram['count']
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(tuple(label) for label in labels))
+            counters[key] = counters.get(key, 0) + value
+
+    return {'histograms': histograms, 'counters': counters}
+
+
+def render_metrics(metrics: Dict[str, Dict]) -> str:
+    """Return metrics in the Prometheus text exposition format."""
+    lines = []
+    for name, (help_text, unit) in HISTOGRAMS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for (metric, labels), histogram in sorted(
+            metrics['histograms'].items(),
+        ):
+            if metric != name:
+                continue
+            for bound, count in zip(BUCKETS[unit], histogram['buckets']):
+                le = (('le', str(bound)),)
+                lines.append(f'{name}_bucket{_labels(labels + le)} {count}')
+            lines.append(
+                f'{name}_bucket{_labels(labels + (("le", "+Inf"),))} '
+                f'{histogram["count"]}',
+            )
+            lines.append(f'{name}_sum{_labels(labels)} {histogram["sum"]}')
+            lines.append(
+                f'{name}_count{_labels(labels)} {histogram["count"]}',
+            )
+
+    for name, help_text in COUNTERS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        for (metric, labels), value in sorted(metrics['counters'].items()):
+            if metric == name:
+                lines.append(f'{name}{_labels(labels)} {value}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def _labels(labels: Labels) -> str:
+    """Return labels formatted as '{key="value",...}'."""
+    def escape(value: str) -> str:
+        return (
+            value
+            .replace('\\', '\\\\')
+            .replace('"', '\\"')
+            .replace('\n', '\\n')
+        )
+
+    return '{' + ','.join(
+        f'{key}="{escape(value)}"' for key, value in labels
+    ) + '}'
+
+
+def _instrument() -> None:
+    """
+    Wrap database queries, template rendering and outgoing HTTP requests with
+    timers, and count the hits and misses of the configured cache backends.
+
+    Queries are timed in the cursor wrapper used for all queries, instead of
+    with the debug cursor, which formats and logs each query. Only the
+    outermost template of nested renderings, i.e. includes and extends, is
+    timed. Measurements are only recorded for threads which handle a
+    request, so background threads are not affected.
+    """
+    if getattr(_instrument, 'done', False):
+        return
+    _instrument.done = True
+
+    template_render = Template._render
+    session_send = requests.Session.send
+    cursor_execute = CursorWrapper.execute
+    cursor_executemany = CursorWrapper.executemany
+
+    def timed_query(query):
+        def wrapper(self, sql, params=None):
+            measurement = getattr(_local, 'measurement', None)
+            if measurement is None:
+                return query(self, sql, params)
+
+            start = time.perf_counter()
+            try:
+                return query(self, sql, params)
+            finally:
+                measurement['db_queries'] += 1
+                measurement['db_duration'] += time.perf_counter() - start
+        return wrapper
+
+    def _render(self, context):
+        measurement = getattr(_local, 'measurement', None)
+        if measurement is None:
+            return template_render(self, context)
+
+        measurement['template_depth'] += 1
+        start = time.perf_counter()
+        try:
+            return template_render(self, context)
+        finally:
+            measurement['template_depth'] -= 1
+            if measurement['template_depth'] == 0:
+                measurement['template_duration'] += (
+                    time.perf_counter() - start
+                )
+
+    def send(self, request, **kwargs):
+        measurement = getattr(_local, 'measurement', None)
+        if measurement is None:
+            return session_send(self, request, **kwargs)
+
+        start = time.perf_counter()
+        try:
+            return session_send(self, request, **kwargs)
+        finally:
+            measurement['http_calls'] += 1
+            measurement['http_duration'] += time.perf_counter() - start
+
+    def counted_get(cache_get):
+        def get(self, key, default=None, version=None):
+            if getattr(_local, 'measurement', None) is None:
+                return cache_get(self, key, default=default, version=version)
+
+            value = cache_get(self, key, default=_MISSING, version=version)
+            record_cache_lookup(hit=value is not _MISSING)
+            return default if value is _MISSING else value
+        return get
+
+    def counted_get_many(cache_get_many):
+        def get_many(self, keys, version=None):
+            measurement = getattr(_local, 'measurement', None)
+            if measurement is None:
+                return cache_get_many(self, keys, version=version)
+
+            # Backends may implement get_many with get, which should not
+            # count the same lookups once more
+            keys = list(keys)
+            _local.measurement = None
+            try:
+                values = cache_get_many(self, keys, version=version)
+            finally:
+                _local.measurement = measurement
+            record_cache_lookup(hit=True, lookups=len(values))
+            record_cache_lookup(hit=False, lookups=len(keys) - len(values))
+            return values
+        return get_many
+
+    backends = {type(caches[alias]) for alias in settings.CACHES}
+    for backend in backends:
+        backend.get = counted_get(backend.get)
+        backend.get_many = counted_get_many(backend.get_many)
+
+    Template._render = _render
+    requests.Session.send = send
+    CursorWrapper.execute = timed_query(cursor_execute)
+    CursorWrapper.executemany = timed_query(cursor_executemany)
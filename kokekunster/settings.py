@@ -65,6 +65,9 @@ INSTALLED_APPS = (
 )
 
 MIDDLEWARE = (
+    # Measures all other middleware as well, so it must be placed first
+    'kokekunster.metrics.MetricsMiddleware',
+
     'django.contrib.sessions.middleware.SessionMiddleware',
     'subdomains.middleware.SubdomainURLRoutingMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -206,6 +209,35 @@ DATAPORTEN_CACHE_REQUESTS = True
 # Where to save the sqlite3 cache backend
 DATAPORTEN_CACHE_PATH = 'tmp/'
 
+# Minimum number of seconds between two reconciliations of the dataporten data
+# of a given user, and the number of background threads used for this purpose
+DATAPORTEN_RECONCILE_INTERVAL = 900
+DATAPORTEN_RECONCILE_WORKERS = 2
+
+# Internal nginx location prefix used for X-Accel-Redirect of exam PDFs. If
+# None, the PDFs are served by Django, which is only suitable for development.
+EXAMINER_ACCEL_REDIRECT_PREFIX = None
+
+# OCR strategies used when the examiner command reads scanned PDFs, see
+# examiner.pdf.PdfReader. Both trade some accuracy for considerably faster OCR.
+EXAMINER_ADAPTIVE_OCR = False
+EXAMINER_DETECT_LANGUAGE = False
+
+
+# Request metrics, see kokekunster/metrics.py
+
+# Directory where each worker process stores a snapshot of its metrics
+METRICS_DIRECTORY = os.path.join(BASE_DIR, 'tmp', 'metrics')
+
+# Minimum number of seconds between two snapshots of a worker process
+METRICS_FLUSH_INTERVAL = 15
+
+# Bearer token allowing Prometheus to scrape /metrics, staff is always allowed
+METRICS_TOKEN = None
+
+# Content-addressed backups of the media files, see kokekunster/media_backup.py
+MEDIA_BACKUP_DIRECTORY = os.path.join(BASE_DIR, 'tmp', 'media_backup')
+
 CRISPY_TEMPLATE_PACK = 'bootstrap4'
 
 # Determine run environment based on the environment variable 'PRODUCTION', and load proper settings
@@ -221,6 +253,7 @@ if os.environ.get('PRODUCTION', None):
 
     CRON_CLASSES = [
         'kokekunster.cronjobs.Backup',
+        'kokekunster.cronjobs.MediaBackup',
     ]
     BACKUP_TIMES = ['3:00',]
 
@@ -48,8 +48,28 @@ DBBACKUP_STORAGE = 'django.core.files.storage.FileSystemStorage'
 DBBACKUP_STORAGE_OPTIONS = {
     'location': os.path.join(os.path.dirname(os.pardir), 'tmp'),
 }
+MEDIA_BACKUP_DIRECTORY = os.path.join(
+    os.path.dirname(os.pardir),
+    'tmp',
+    'media_backup',
+)
 BACKUP_TIMES = ['3:00', '7:00', '12:00', '15:00', '18:00']
 
+# File based cache shared by all the gunicorn workers, used for instance for
+# conditional GET validators, see kokekunster/conditional.py
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(os.path.dirname(os.pardir), 'tmp', 'cache'),
+    }
+}
+
+# Exam PDFs are handed over to nginx, see config/nginx/production.conf
+EXAMINER_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+
+# Token used by Prometheus when scraping /metrics
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
 # Sentry related settings
 RAVEN_CONFIG = {
     'dsn': os.environ['SENTRY_DSN'],
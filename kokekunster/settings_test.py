@@ -7,3 +7,10 @@ DATABASES = {
         'NAME': ':memory:',
     }
 }
+
+# The in-memory database is not shared between threads, so dataporten
+# reconciliation must run synchronously
+DATAPORTEN_RECONCILE_IN_BACKGROUND = False
+
+# Only report the metrics of the test process
+METRICS_DIRECTORY = None
@@ -0,0 +1,39 @@
+from pathlib import Path
+
+import pytest
+
+from examiner.models import Pdf, PdfPage
+from kokekunster import benchmarks
+from semesterpage.models import Course
+
+
+@pytest.mark.django_db
+def test_benchmark_data_and_measurements(tmpdir):
+    """Benchmarks should generate data once and measure views against it."""
+    assert benchmarks.generate_data(scale=0.001, log=lambda message: None)
+    assert Course.objects.count() == 5
+    assert Pdf.objects.count() == 50
+    assert PdfPage.objects.count() == 500
+
+    # Data is only generated once
+    assert not benchmarks.generate_data(scale=0.001, log=lambda message: None)
+    assert Course.objects.count() == 5
+
+    urls = dict(benchmarks.endpoints())
+    assert urls['exams_api_course'] == '/api/exams/course/BEN00000'
+
+    result = benchmarks.measure(urls['exams_api_course'], repetitions=3)
+    assert result['status_code'] == 200
+    assert result['queries'] > 0
+    assert result['p50_ms'] <= result['p99_ms'] <= result['max_ms']
+
+    old = {'results': {'exams_api_course': dict(result, p50_ms=1.0)}}
+    new = {'results': {'exams_api_course': dict(result, p50_ms=1.5)}}
+    change, = benchmarks.compare(old, new)
+    assert change['p50_change'] == 0.5
+
+    path = benchmarks.save(
+        {'commit': 'abc1234', 'created_at': '2018-01-01T12:00:00', **new},
+        directory=Path(tmpdir),
+    )
+    assert path.name == '2018-01-01T120000-abc1234.json'
@@ -0,0 +1,55 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from examiner.models import Pdf
+from examiner.storage import sharded_path
+from kokekunster.media_backup import backup_media, object_path
+
+
+@pytest.mark.django_db
+def test_incremental_media_backup(tmpdir):
+    """Only new and changed media files should be hashed and copied."""
+    media_root = Path(tmpdir) / 'media'
+    destination = Path(tmpdir) / 'backup'
+
+    pdf_content = b'%PDF exam'
+    pdf_hash = hashlib.sha1(pdf_content).hexdigest()
+    pdf_path = media_root / sharded_path(pdf_hash)
+    pdf_path.parent.mkdir(parents=True)
+    pdf_path.write_bytes(pdf_content)
+    Pdf.objects.create(sha1_hash=pdf_hash, file=sharded_path(pdf_hash))
+
+    logo_path = media_root / 'logos' / 'TMA4100.png'
+    logo_path.parent.mkdir()
+    logo_path.write_bytes(b'logo')
+    upload_path = media_root / 'fagfiler' / 'TMA4100' / 'kompendium.pdf'
+    upload_path.parent.mkdir(parents=True)
+    upload_path.write_bytes(b'kompendium')
+
+    # The hash of the PDF is known, the other files are hashed
+    stats = backup_media(media_root=media_root, destination=destination)
+    assert stats == {
+        'files': 3,
+        'hashed': 2,
+        'copied': 3,
+        'bytes_copied': len(pdf_content) + 4 + 10,
+    }
+    assert object_path(destination, pdf_hash).read_bytes() == pdf_content
+
+    # Nothing has changed since the last backup
+    stats = backup_media(media_root=media_root, destination=destination)
+    assert stats == {'files': 3, 'hashed': 0, 'copied': 0, 'bytes_copied': 0}
+
+    # Changed files are hashed and copied anew
+    logo_path.write_bytes(b'new logo')
+    os.utime(str(logo_path), ns=(0, 0))
+    stats = backup_media(media_root=media_root, destination=destination)
+    assert stats == {'files': 3, 'hashed': 1, 'copied': 1, 'bytes_copied': 8}
+
+    manifest = json.loads((destination / 'manifest.json').read_text())
+    logo_hash = manifest['files']['logos/TMA4100.png']['sha1']
+    assert object_path(destination, logo_hash).read_bytes() == b'new logo'
@@ -0,0 +1,120 @@
+import json
+import subprocess
+import sys
+
+from django.core.cache import cache
+from django.shortcuts import reverse
+
+import pytest
+
+from kokekunster import metrics
+
+
+@pytest.mark.django_db
+def test_metrics_endpoint(client, admin_client, monkeypatch, tmpdir):
+    """Requests should be measured and summed over all worker processes."""
+    monkeypatch.setattr(metrics, 'METRICS_DIRECTORY', str(tmpdir))
+    monkeypatch.setattr(metrics, 'REGISTRY', metrics.Registry())
+    monkeypatch.setattr(metrics, 'METRICS_TOKEN', 'secret')
+
+    # Anonymous users are not allowed to scrape the metrics
+    assert client.get(reverse('metrics')).status_code == 403
+
+    client.get(reverse('examiner:all_exams'))
+    client.get(reverse('examiner:all_exams'))
+
+    # Another worker process has handled one request of its own
+    other_worker = metrics.Registry()
+    labels = (('view', 'examiner:all_exams'),)
+    other_worker.observe('django_request_duration_seconds', labels, 0.2)
+    tmpdir.join('1-0.json').write(json.dumps(other_worker.snapshot()))
+
+    response = client.get(
+        reverse('metrics'),
+        HTTP_AUTHORIZATION='Bearer secret',
+    )
+    assert response.status_code == 200
+    lines = response.content.decode('utf-8').splitlines()
+    assert (
+        'django_request_duration_seconds_count{view="examiner:all_exams"} 3'
+        in lines
+    )
+    assert (
+        'django_responses_total{view="examiner:all_exams",status="200"} 2'
+        in lines
+    )
+    assert any(
+        line.startswith('django_request_db_queries_count{view="examiner:')
+        for line in lines
+    )
+
+    # Each cache lookup, e.g. of the content versions of ETags, is counted
+    assert any(
+        line.startswith(
+            'django_cache_requests_total{view="examiner:all_exams",'
+            'result="hit"}',
+        )
+        for line in lines
+    )
+
+    # Staff users are allowed without the token
+    assert admin_client.get(reverse('metrics')).status_code == 200
+
+
+def test_snapshots_of_exited_processes_are_retired(monkeypatch, tmpdir):
+    """Snapshots of exited workers should be merged, keeping the totals."""
+    monkeypatch.setattr(metrics, 'METRICS_DIRECTORY', str(tmpdir))
+    monkeypatch.setattr(metrics, 'REGISTRY', metrics.Registry())
+
+    exited = subprocess.Popen([sys.executable, '-c', ''])
+    exited.wait()
+    labels = (('view', 'examiner:all_exams'),)
+    for name in (f'{exited.pid}-0.json', f'{exited.pid}-1.json'):
+        registry = metrics.Registry()
+        registry.inc('django_responses_total', labels)
+        tmpdir.join(name).write(json.dumps(registry.snapshot()))
+
+    for _ in range(2):
+        collected = metrics.collect()
+        assert collected['counters'] == {('django_responses_total', labels): 2}
+    assert sorted(path.basename for path in tmpdir.listdir('*.json')) == [
+        metrics.REGISTRY.snapshot_name,
+        metrics.RETIRED_SNAPSHOT,
+    ]
+
+
+def test_cache_lookups_are_counted():
+    """Hits and misses of the cache backend should be counted per request."""
+    metrics._instrument()
+    cache.set('metrics-test-hit', None)
+    cache.set('metrics-test-other-hit', 1)
+    metrics._local.measurement = measurement = {
+        'cache_hits': 0,
+        'cache_misses': 0,
+    }
+    try:
+        # Cached None values are hits
+        assert cache.get('metrics-test-hit', 'default') is None
+        assert cache.get('metrics-test-miss', 'default') == 'default'
+        assert cache.get_many([
+            'metrics-test-other-hit',
+            'metrics-test-miss',
+        ]) == {'metrics-test-other-hit': 1}
+    finally:
+        metrics._local.measurement = None
+    assert measurement == {'cache_hits': 2, 'cache_misses': 2}
+
+
+def test_failing_flush_is_logged(monkeypatch, tmpdir, caplog):
+    """Snapshots which can not be written should not fail the request."""
+    not_a_directory = tmpdir.join('file')
+    not_a_directory.write('')
+    monkeypatch.setattr(metrics, 'METRICS_DIRECTORY', str(not_a_directory))
+    registry = metrics.Registry()
+    registry.flush(force=True)
+    assert 'Metrics snapshot could not be written' in caplog.text
+
+    # The next attempt waits for the flush interval
+    caplog.clear()
+    registry.flush()
+    assert not caplog.text
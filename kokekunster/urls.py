@@ -19,6 +19,8 @@ from django.conf import settings
 from django.conf.urls import include, url
 from django.conf.urls.static import static
 
+from kokekunster.metrics import metrics_view
+
 urlpatterns = [
     url(r'^accounts/', include('allauth.urls')),
     url(r'^exams/', include('examiner.urls', namespace='examiner')),
@@ -27,6 +29,7 @@ urlpatterns = [
         include('examiner.urls', namespace='examiner'),
         {'api': True},
     ),
+    url(r'^metrics$', metrics_view, name='metrics'),
     url(r'^', include('semesterpage.urls')),
 ]
 
@@ -1,12 +1,120 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 from typing import Dict
 
-from django.db.models import Q
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
 
 from dataporten.parsers import Course as ParsedCourse
+from kokekunster.conditional import bump_content_version
 
-from .models import Course
+from .models import Course, Options
 from dataporten.models import DataportenUser
 
+logger = logging.getLogger(__name__)
+
+# Minimum number of seconds between two reconciliations of the same user
+RECONCILE_INTERVAL = getattr(settings, 'DATAPORTEN_RECONCILE_INTERVAL', 900)
+
+# If False, reconciliations are run synchronously, i.e. in tests
+RECONCILE_IN_BACKGROUND = getattr(
+    settings,
+    'DATAPORTEN_RECONCILE_IN_BACKGROUND',
+    True,
+)
+
+# Lazily constructed thread pool shared by all requests handled by this process
+_executor = None
+
+
+def schedule_reconciliation(user: DataportenUser) -> bool:
+    """
+    Schedule reconciliation of the user's dataporten data off the request path.
+
+    Reconciliations are debounced per user, such that the dataporten API is
+    queried at most once every RECONCILE_INTERVAL seconds. The debouncing is
+    performed by a conditional UPDATE on Options.dataporten_synced_at, making
+    it safe across several worker processes. If the reconciliation fails,
+    the previous value is restored, such that the next visit retries.
+
+    The very first reconciliation of a user is run synchronously, as the
+    student page would be empty otherwise.
+
+    :param user: Dataporten user which should be reconciled.
+    :return: True if a reconciliation was run or scheduled.
+    """
+    now = timezone.now()
+    options = Options.objects.filter(user_id=user.pk)
+    previous = options.values_list('dataporten_synced_at', flat=True).first()
+    if previous is not None and previous >= now - timedelta(
+        seconds=RECONCILE_INTERVAL,
+    ):
+        return False
+
+    # Claim this reconciliation, only one request (or worker) will succeed,
+    # as the others find the timestamp changed
+    claimed = options.filter(dataporten_synced_at=previous).update(
+        dataporten_synced_at=now,
+    )
+    if not claimed:
+        return False
+
+    if previous is None or not RECONCILE_IN_BACKGROUND:
+        try:
+            reconcile_dataporten_data(user)
+        except Exception:
+            _release_claim(user.pk, claimed_at=now, previous=previous)
+            raise
+    else:
+        _get_executor().submit(
+            _reconcile_in_background,
+            user.pk,
+            claimed_at=now,
+            previous=previous,
+        )
+    return True
+
+
+def _release_claim(user_pk: int, claimed_at, previous) -> None:
+    """Restore dataporten_synced_at of a failed reconciliation."""
+    Options.objects.filter(
+        user_id=user_pk,
+        dataporten_synced_at=claimed_at,
+    ).update(dataporten_synced_at=previous)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'DATAPORTEN_RECONCILE_WORKERS', 2),
+        )
+    return _executor
+
+
+def _reconcile_in_background(user_pk: int, claimed_at, previous) -> None:
+    """
+    Reconcile the dataporten data of the given user in a worker thread.
+
+    The user is retrieved anew, as model instances should not be shared
+    between threads. Each thread has its own database connection, which is
+    closed when the reconciliation is finished.
+    """
+    try:
+        user = DataportenUser.objects.get(pk=user_pk)
+        reconcile_dataporten_data(user)
+    except Exception:
+        # Nobody is waiting for the result, so we log instead of raising
+        logger.exception(
+            f'Background dataporten reconciliation of user {user_pk} failed',
+        )
+        _release_claim(user_pk, claimed_at=claimed_at, previous=previous)
+    finally:
+        connection.close()
+
+
 def reconcile_dataporten_data(user: DataportenUser) -> None:
     """
     Syncs the information gathered from dataporten from this specific user.
@@ -17,35 +125,67 @@ def reconcile_dataporten_data(user: DataportenUser) -> None:
     sync_options_of_user_with_dataporten(user=user)
 
 def sync_dataporten_courses_with_db(courses: Dict[str, ParsedCourse]):
-    # Course codes that the dataporten user has taken
-    course_codes = courses.keys()
-
-    # Intersection with course codes already registrered in the database
-    already_in_database = Course.objects.\
-            filter(course_code__in=course_codes)
+    """
+    Persist the given dataporten courses to the database.
 
-    codes_already_in_database = already_in_database.\
-            values_list('course_code', flat=True)
+    The courses are diffed in memory against one query of the already
+    registered courses, such that the number of queries is constant in the
+    number of courses the student has taken.
+    """
+    # Course codes that the dataporten user has taken. Course.save()
+    # capitalizes course codes, which bulk_create bypasses.
+    courses = {code.upper(): course for code, course in courses.items()}
 
-    # Dataporten course codes that have not been found in the database
-    missing_in_database = set(course_codes) - set(codes_already_in_database)
+    # Intersection with course codes already registrered in the database
+    already_in_database = dict(
+        Course
+        .objects
+        .filter(course_code__in=courses.keys())
+        .values_list('course_code', 'dataporten_uid')
+    )
 
     # Use the dataporten data in order to create new course model objects
     # for those course codes which have not been found in the database
-    for key in missing_in_database:
-        course = courses[key]
-        Course.objects.create(
+    missing_in_database = [
+        Course(
             full_name=course.name,
             homepage=course.url,
-            course_code=course.code,
+            course_code=code,
             dataporten_uid=course.uid,
         )
+        for code, course in courses.items()
+        if code not in already_in_database
+    ]
+    if missing_in_database:
+        try:
+            with transaction.atomic():
+                Course.objects.bulk_create(missing_in_database)
+        except IntegrityError:
+            # Another user with the same courses has been reconciled
+            # concurrently, so we fall back to creating the courses one by one
+            for course in missing_in_database:
+                Course.objects.get_or_create(
+                    course_code=course.course_code,
+                    defaults={
+                        'full_name': course.full_name,
+                        'homepage': course.homepage,
+                        'dataporten_uid': course.dataporten_uid,
+                    },
+                )
 
     # Populate pre-existing course model objects with dataporten uids
-    missing_uid = already_in_database.filter(dataporten_uid=None)
-    for course in missing_uid.all():
-        course.dataporten_uid = courses[course.course_code].uid
-        course.save(update_fields=['dataporten_uid'])
+    missing_uid = {
+        code: {'dataporten_uid': courses[code].uid}
+        for code, uid in already_in_database.items()
+        if uid is None
+    }
+    if missing_uid:
+        Course.objects.bulk_update_by_code(missing_uid)
+
+    if missing_in_database or missing_uid:
+        # Bulk writes do not send any post_save signals
+        bump_content_version('semesterpage')
+
 
 def sync_options_of_user_with_dataporten(user: DataportenUser) -> None:
     """
@@ -54,45 +194,76 @@ def sync_options_of_user_with_dataporten(user: DataportenUser) -> None:
     adds the course(s) to their 'user.options.self_chosen_courses'.
     It also removes courses if the student has finished them.
 
+    The difference is calculated in memory, and the through tables of
+    'self_chosen_courses' and 'active_dataporten_courses' are updated with
+    one bulk insert and one delete each.
+
     NB! This function assumes that all the courses provided from
     dataporten has already been persisted to the database as
     Course model instances. This can be done by invoking
     sync_dataporten_courses_with_db before invoking this function.
     """
+    options = user.options
+    SelfChosen = Options.self_chosen_courses.through
+    ActiveDataporten = Options.active_dataporten_courses.through
+
     # The courses which the student is enrolled in, according to dataporten.
-    active_dp_course = Q(course_code__in=user.dataporten.courses.active)
+    active_dp_courses = set(
+        Course
+        .objects
+        .filter(course_code__in=user.dataporten.courses.active)
+        .values_list('pk', flat=True)
+    )
 
     # The courses which the student was enrolled in the last time this function
     # was called.
-    saved_active_course = Q(pk__in=user.options.active_dataporten_courses.all())
+    saved_active_courses = set(
+        ActiveDataporten
+        .objects
+        .filter(options_id=options.pk)
+        .values_list('course_id', flat=True)
+    )
 
     # We can now determine if there has been any changes to the set of active
     # courses provided by dataporten.
-    new_active_courses = Course\
-            .objects\
-            .filter(active_dp_course)\
-            .exclude(saved_active_course)
-
-    new_finished_courses = Course\
-            .objects\
-            .filter(saved_active_course)\
-            .exclude(active_dp_course)
+    new_active_courses = active_dp_courses - saved_active_courses
+    new_finished_courses = saved_active_courses - active_dp_courses
 
-    has_new_active_courses = new_active_courses.count() > 0
-    has_new_finished_courses = new_finished_courses.count() > 0
+    if not new_active_courses and not new_finished_courses:
+        return
 
-    if has_new_active_courses:
-        # Dataporten has provided new active courses from the last time we checked
-        # this. We therefore update the user's 'self_chosen_courses'.
-        user.options.self_chosen_courses.add(*new_active_courses.all())
+    if new_active_courses:
+        # Dataporten has provided new active courses from the last time we
+        # checked this. We therefore update the user's 'self_chosen_courses',
+        # skipping those the user has already chosen manually.
+        already_chosen = set(
+            SelfChosen
+            .objects
+            .filter(options_id=options.pk, course_id__in=new_active_courses)
+            .values_list('course_id', flat=True)
+        )
+        SelfChosen.objects.bulk_create([
+            SelfChosen(options_id=options.pk, course_id=course_pk)
+            for course_pk in new_active_courses - already_chosen
+        ])
 
-    if has_new_finished_courses:
+    if new_finished_courses:
         # The student has recently finished courses, and we can remove the
         # courses from the student's homepage.
-        user.options.self_chosen_courses.remove(*new_finished_courses.all())
+        SelfChosen.objects.filter(
+            options_id=options.pk,
+            course_id__in=new_finished_courses,
+        ).delete()
+
+    # Save the active courses for the next time we perform this check.
+    ActiveDataporten.objects.filter(
+        options_id=options.pk,
+        course_id__in=new_finished_courses,
+    ).delete()
+    ActiveDataporten.objects.bulk_create([
+        ActiveDataporten(options_id=options.pk, course_id=course_pk)
+        for course_pk in new_active_courses
+    ])
 
-    if has_new_active_courses or has_new_finished_courses:
-        # Save the active courses for the next time we perform this check.
-        active_dp_courses = Course.objects.filter(active_dp_course).all()
-        user.options.active_dataporten_courses.set(active_dp_courses)
-        user.options.save()
+    # Bulk writes do not send any post_save or m2m_changed signals
+    bump_content_version('semesterpage')
@@ -145,9 +145,12 @@ class CourseAdmin(VersionAdmin, ObjectPermissionsModelAdmin):
         User model.
         """
         if request.user.is_superuser:
-            return super().get_queryset(request)
+            courses = super().get_queryset(request)
         else:
-            return request.user.contributor.accessible_courses()
+            courses = request.user.contributor.accessible_courses()
+
+        # Prevent several queries per course in Course.get_absolute_url
+        return courses.with_routing()
 
     def get_fieldsets(self, request, obj=None):
         fields = ('display_name', 'homepage', 'safe_logo',)
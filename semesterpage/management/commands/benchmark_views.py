@@ -0,0 +1,136 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+
+from kokekunster import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark latency and query counts of the most visited views '
+        'against a separate database with generated data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale',
+            type=float,
+            default=1.0,
+            dest='scale',
+            help='Fraction of the default data volumes to generate.',
+        )
+        parser.add_argument(
+            '--repetitions',
+            type=int,
+            default=20,
+            dest='repetitions',
+            help='Number of measured requests per view.',
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=2,
+            dest='warmup',
+            help='Number of unmeasured requests per view made beforehand.',
+        )
+        parser.add_argument(
+            '--only',
+            nargs='*',
+            default=(),
+            dest='only',
+            help='Only benchmark the views with these names.',
+        )
+        parser.add_argument(
+            '--compare',
+            type=str,
+            default=None,
+            dest='compare',
+            help='Earlier results file to compare the results with.',
+        )
+        parser.add_argument(
+            '--keepdb',
+            action='store_true',
+            dest='keepdb',
+            help=(
+                'Keep the benchmark database, such that the data is only '
+                'generated once.'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        # The benchmark database is created like the test database, so the
+        # regular database is never populated with generated data
+        connection.creation.create_test_db(
+            verbosity=0,
+            autoclobber=True,
+            serialize=False,
+            keepdb=options['keepdb'],
+        )
+        try:
+            benchmarks.generate_data(
+                scale=options['scale'],
+                log=self.stdout.write,
+            )
+
+            # The debug toolbar must not be rendered into the responses
+            with override_settings(
+                DEBUG=False,
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            ):
+                results = benchmarks.run(
+                    repetitions=options['repetitions'],
+                    warmup=options['warmup'],
+                    only=options['only'],
+                    log=self.stdout.write,
+                )
+        finally:
+            connection.creation.destroy_test_db(
+                verbosity=0,
+                keepdb=options['keepdb'],
+            )
+
+        self.write_results(results)
+        path = benchmarks.save(results)
+        self.stdout.write(self.style.SUCCESS(f'Results written to {path}'))
+
+        if options['compare']:
+            old_results = json.loads(Path(options['compare']).read_text())
+            self.write_comparison(benchmarks.compare(old_results, results))
+
+    def write_results(self, results):
+        """Write table of the results of each view."""
+        self.stdout.write(
+            f'{"View":<28}{"Status":>7}{"p50 ms":>10}{"p90 ms":>10}'
+            f'{"p99 ms":>10}{"Queries":>9}{"KB":>9}',
+        )
+        for name, result in results['results'].items():
+            self.stdout.write(
+                f'{name:<28}{result["status_code"]:>7}'
+                f'{result["p50_ms"]:>10.1f}{result["p90_ms"]:>10.1f}'
+                f'{result["p99_ms"]:>10.1f}{result["queries"]:>9}'
+                f'{result["bytes"] / 1000:>9.1f}',
+            )
+
+    def write_comparison(self, changes):
+        """Write table of changes since the compared results."""
+        self.stdout.write(
+            f'{"View":<28}{"Old p50":>10}{"New p50":>10}{"Change":>9}'
+            f'{"Queries":>12}',
+        )
+        for change in changes:
+            relative = change['p50_change']
+            style = (
+                self.style.ERROR if relative and relative > 0.1
+                else self.style.SUCCESS if relative and relative < -0.1
+                else str
+            )
+            self.stdout.write(style(
+                f'{change["endpoint"]:<28}{change["old_p50_ms"]:>10.1f}'
+                f'{change["new_p50_ms"]:>10.1f}'
+                f'{(relative or 0) * 100:>8.0f}%'
+                f'{change["old_queries"]:>6} -> {change["new_queries"]:<3}',
+            ))
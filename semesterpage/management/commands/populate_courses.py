@@ -1,39 +1,107 @@
-from typing import Set
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Set
 
 from django.core.management.base import BaseCommand
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from tqdm import tqdm
 
+from kokekunster.conditional import bump_content_version
 from semesterpage.models import Course
 
 
 class Command(BaseCommand):
-    help = 'Populate Course objects from NTNU-IME API.'
+    help = 'Populate and update Course objects from NTNU-IME API.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=8,
+            dest='workers',
+            help='Number of concurrent requests to the IME API.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            dest='batch_size',
+            help='Number of new courses inserted per database query.',
+        )
 
     def handle(self, *args, **options):
-        existing_courses = set(
-            Course
-            .objects
-            .all()
-            .values_list('course_code', flat=True)
-        )
+        batch_size = options['batch_size']
+        existing_courses = {
+            course_code: (full_name, homepage)
+            for course_code, full_name, homepage
+            in Course.objects.values_list('course_code', 'full_name', 'homepage')
+        }
 
         new_courses = 0
+        new_batch: List[Course] = []
+        changed_courses: Dict[str, Dict[str, str]] = {}
 
-        api = IMEAPI()
+        api = IMEAPI(workers=options['workers'])
         try:
-            for course in tqdm(api.all_courses(skip=existing_courses)):
-                Course.objects.create(**course)
-                tqdm.write('[NEW COURSE] ' + str(course))
-                new_courses += 1
+            for course in tqdm(api.all_courses()):
+                course_code = course['course_code']
+                if course_code not in existing_courses:
+                    # The API may list the same course more than once
+                    existing_courses[course_code] = (
+                        course['full_name'],
+                        course['homepage'],
+                    )
+                    new_batch.append(Course(**course))
+                    tqdm.write('[NEW COURSE] ' + str(course))
+                    if len(new_batch) >= batch_size:
+                        new_courses += self.create(new_batch)
+                        new_batch = []
+                    continue
+
+                changes = self.changes(existing_courses[course_code], course)
+                if changes:
+                    changed_courses[course_code] = changes
+                    tqdm.write(f'[CHANGED COURSE] {course_code}: {changes}')
         except KeyboardInterrupt:
             pass
 
+        new_courses += self.create(new_batch)
+        updated_courses = Course.objects.bulk_update_by_code(changed_courses)
+        if new_courses or updated_courses:
+            # Bulk inserts and updates do not send any post_save signals
+            bump_content_version('semesterpage')
+
         self.stdout.write(
             self.style.SUCCESS(f'{new_courses} new Course objects created'),
         )
+        self.stdout.write(
+            self.style.SUCCESS(f'{updated_courses} Course objects updated'),
+        )
+
+    @staticmethod
+    def create(courses: List[Course]) -> int:
+        """Insert new courses into the database with one query."""
+        Course.objects.bulk_create(courses)
+        return len(courses)
+
+    @staticmethod
+    def changes(existing, course) -> Dict[str, str]:
+        """
+        Return fields of an existing course which have changed in the IME API.
+
+        Empty values from the API never overwrite existing values, as these
+        may have been provided by our users.
+        """
+        full_name, homepage = existing
+        changes = {}
+        if course['full_name'] and course['full_name'] != full_name:
+            changes['full_name'] = course['full_name']
+        if course['homepage'] and course['homepage'] != homepage:
+            changes['homepage'] = course['homepage']
+        return changes
 
 
 class IMEAPI:
@@ -41,28 +109,75 @@ class IMEAPI:
 
     COURSE_URL = 'https://www.ime.ntnu.no/api/course/'
 
-    @classmethod
-    def all_courses(cls, skip: Set[str]):
+    def __init__(self, workers: int = 8) -> None:
         """
-        Yield all courses available from the IME API.
+        Construct IME API client.
 
-        :param skip: List of course codes which should not be yielded.
+        :param workers: Maximum number of concurrent requests. All requests
+          share the same session, and thus the same pool of connections.
         """
-        response = requests.get(cls.COURSE_URL + '-')
-        courses = response.json()['course']
-        for course in courses:
-            course_code = course['code'].upper()
-            if course_code in skip:
-                continue
-
-            response = requests.get(cls.COURSE_URL + course_code)
+        self.workers = workers
+        self.session = requests.Session()
+        self.session.mount(
+            'https://',
+            HTTPAdapter(pool_connections=1, pool_maxsize=workers),
+        )
+
+    def course_codes(self) -> List[str]:
+        """Return all course codes available from the IME API, once each."""
+        response = self.session.get(self.COURSE_URL + '-')
+        return list(dict.fromkeys(
+            course['code'].upper() for course in response.json()['course']
+        ))
+
+    def course(self, course_code: str) -> Optional[Dict[str, str]]:
+        """Return Course field values of a given course code."""
+        try:
+            response = self.session.get(self.COURSE_URL + course_code)
             course_info = response.json()['course']
+        except (requests.RequestException, ValueError, KeyError):
+            return None
+
+        if not course_info:
+            return None
+
+        return {
+            'course_code': course_code,
+            'full_name': course_info['name'],
+            'homepage': self.course_homepage(course_info),
+        }
 
-            yield {
-                'course_code': course_code,
-                'full_name': course_info['name'],
-                'homepage': cls.course_homepage(course_info),
-            }
+    def all_courses(self, skip: Set[str] = frozenset()) -> Iterator[Dict]:
+        """
+        Yield all courses available from the IME API.
+
+        The course details are fetched concurrently by a bounded pool of
+        worker threads. At most a few requests per worker are submitted ahead
+        of the consumer, such that the number of pending futures and
+        responses held in memory is bounded regardless of the number of
+        courses.
+
+        :param skip: List of course codes which should not be yielded.
+        """
+        course_codes = [
+            course_code
+            for course_code
+            in self.course_codes()
+            if course_code not in skip
+        ]
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for course_code in course_codes:
+                pending.append(executor.submit(self.course, course_code))
+                if len(pending) >= 4 * self.workers:
+                    course = pending.popleft().result()
+                    if course:
+                        yield course
+
+            while pending:
+                course = pending.popleft().result()
+                if course:
+                    yield course
 
     @staticmethod
     def course_homepage(course):
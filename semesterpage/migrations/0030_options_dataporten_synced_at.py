@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.2 on 2026-10-19 12:00
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('semesterpage', '0029_auto_20181228_0012'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='options',
+            name='dataporten_synced_at',
+            field=models.DateTimeField(blank=True, default=None, editable=False, null=True, verbose_name='sist synkronisert med dataporten'),
+        ),
+    ]
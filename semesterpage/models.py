@@ -1,7 +1,8 @@
 from collections import defaultdict
 from gettext import gettext as _
 from os.path import basename
-from typing import Optional
+from time import monotonic
+from typing import Any, Dict, Optional
 import os
 
 from django.conf import settings
@@ -17,6 +18,7 @@ from autoslug.utils import slugify
 from sanitizer.models import SanitizedCharField
 
 from dataporten.models import DataportenUser
+from kokekunster.conditional import content_version
 
 DEFAULT_STUDY_PROGRAM_SLUG = getattr(settings, 'DEFAULT_STUDY_PROGRAM_SLUG', 'fysmat')
 
@@ -218,27 +220,60 @@ class Semester(models.Model):
         satisfying the criteria.
 
         Raises Semester.DoesNotExist if nothing matches the given arguments.
-        """
-        q = Q(study_program__slug__iexact=study_program)
 
-        if main_profile:
-            # Semester related to a main profile
-            q = q & Q(main_profile__slug__iexact=main_profile)
+        The slugs are resolved to a primary key by SEMESTER_SLUGS, which is an
+        in-process mapping, such that only a primary key lookup hits the
+        database.
+        """
+        for retry in (False, True):
+            pk = SEMESTER_SLUGS.lookup(
+                study_program=study_program,
+                main_profile=main_profile,
+                number=number,
+                reload=retry,
+            )
+            if pk is None:
+                continue
 
-        if number:
-            q = q & Q(number=int(number))
-            return Semester.objects.get(q)
-        else:
-            # No number has specified, and we fall back to the lowest available
-            # semester.
             try:
-                return Semester.\
+                semester = Semester.\
                     objects.\
-                    filter(q).\
-                    order_by('-main_profile', 'number')[0]
-            except IndexError:
-                # No matching semester, since empty list has been returned
-                raise Semester.DoesNotExist
+                    select_related('study_program', 'main_profile').\
+                    get(pk=pk)
+            except Semester.DoesNotExist:
+                # The mapping is stale, as the semester has been deleted by
+                # another process.
+                SEMESTER_SLUGS.invalidate()
+                continue
+
+            if semester.matches(study_program, main_profile, number):
+                return semester
+            SEMESTER_SLUGS.invalidate()
+
+        raise Semester.DoesNotExist
+
+    def matches(
+        self,
+        study_program: str,
+        main_profile: Optional[str] = None,
+        number: Optional[str] = None,
+    ) -> bool:
+        """
+        Return True if the semester is resolved by the given URL slugs.
+
+        Used for detecting stale entries in SEMESTER_SLUGS, i.e. if another
+        process has changed the slugs of the semester.
+        """
+        if self.study_program.slug.lower() != study_program.lower():
+            return False
+        if main_profile and (
+            not self.main_profile
+            or self.main_profile.slug.lower() != main_profile.lower()
+        ):
+            return False
+        if number and self.number != int(number):
+            return False
+        return True
 
 
     def check_access(self, user):
@@ -260,12 +295,28 @@ class Semester(models.Model):
                 )
 
     def get_absolute_url(self):
+        return Semester.url(
+            study_program=self.study_program.slug,
+            number=self.number,
+            main_profile=self.main_profile.slug if self.main_profile else None,
+        )
+
+    @staticmethod
+    def url(
+        study_program: str,
+        number: int,
+        main_profile: Optional[str] = None,
+    ) -> str:
+        """
+        Return semester URL, given the slugs of its study program and main
+        profile.
+        """
         kwargs = {
-            'study_program': self.study_program.slug,
-            'semester_number': self.number,
+            'study_program': study_program,
+            'semester_number': number,
         }
-        if self.main_profile:
-            kwargs['main_profile'] = self.main_profile.slug
+        if main_profile:
+            kwargs['main_profile'] = main_profile
 
         return reverse('semesterpage-semester', kwargs=kwargs)
 
@@ -285,6 +336,100 @@ class Semester(models.Model):
         verbose_name_plural = _('semestere')
 
 
+class SemesterSlugMap:
+    """
+    In-process mapping from semester URL slugs to semester primary keys.
+
+    The mapping is loaded lazily with one query, and is invalidated by
+    semesterpage.signals.handlers whenever a semester, main profile or study
+    program is saved or deleted. The handlers also bump a version shared by
+    all processes through the cache, see kokekunster.conditional, such that
+    the mappings of other processes expire on their next lookup, also when
+    the lookup hits. Lookups that miss reload the mapping as well, although
+    at most once every RELOAD_INTERVAL seconds.
+    """
+    RELOAD_INTERVAL = 60
+    VERSION_SCOPE = 'semester_slugs'
+
+    def __init__(self) -> None:
+        self._slugs: Optional[Dict[tuple, int]] = None
+        self._loaded_at = 0.0
+        self._version: Optional[str] = None
+
+    def lookup(
+        self,
+        study_program: str,
+        main_profile: Optional[str] = None,
+        number: Optional[str] = None,
+        reload: bool = False,
+    ) -> Optional[int]:
+        """
+        Return primary key of the semester resolved by the given slugs.
+
+        Arguments have the same semantics as those of Semester.get.
+
+        :param reload: Reload the mapping before the lookup, if it has not
+          been loaded during the last RELOAD_INTERVAL seconds.
+        """
+        version = content_version(self.VERSION_SCOPE)
+        if version != self._version:
+            self.invalidate()
+        if reload and monotonic() - self._loaded_at > self.RELOAD_INTERVAL:
+            self.invalidate()
+        if self._slugs is None:
+            self._slugs = self._load()
+            self._loaded_at = monotonic()
+            self._version = version
+
+        key = (
+            study_program.lower(),
+            main_profile.lower() if main_profile else None,
+            int(number) if number else None,
+        )
+        return self._slugs.get(key)
+
+    def invalidate(self) -> None:
+        self._slugs = None
+
+    @staticmethod
+    def _load() -> Dict[tuple, int]:
+        semesters = Semester.objects.values_list(
+            'pk',
+            'number',
+            'main_profile_id',
+            'study_program__slug',
+            'main_profile__slug',
+        )
+
+        # Ordered as order_by('-main_profile', 'number') in PostgreSQL, i.e.
+        # semesters without main profile first, as the lowest semester should
+        # be preferred when the semester number is left out.
+        semesters = sorted(
+            semesters,
+            key=lambda semester: (
+                semester[2] is not None,
+                -(semester[2] or 0),
+                semester[1],
+            ),
+        )
+
+        slugs: Dict[tuple, int] = {}
+        for pk, number, _, study_program, main_profile in semesters:
+            study_program = study_program.lower()
+            main_profile = main_profile.lower() if main_profile else None
+            for key in (
+                (study_program, main_profile, number),
+                (study_program, main_profile, None),
+                (study_program, None, number),
+                (study_program, None, None),
+            ):
+                slugs.setdefault(key, pk)
+        return slugs
+
+
+SEMESTER_SLUGS = SemesterSlugMap()
+
+
 class LinkList(models.Model):
     """
     An abstract model which Course and ResourceLinkList derive from. It is
@@ -348,6 +493,104 @@ class LinkList(models.Model):
         abstract = True
 
 
+class CourseQuerySet(models.QuerySet):
+    # Maximum number of rows updated by each UPDATE query in bulk_update_by_code
+    UPDATE_BATCH_SIZE = 500
+
+    def bulk_update_by_code(self, values: Dict[str, Dict[str, Any]]) -> int:
+        """
+        Update differing field values of several courses in few queries.
+
+        Django does not support QuerySet.bulk_update before version 2.2, so
+        we construct a single UPDATE ... SET field = CASE ... END query for
+        each batch of courses instead.
+
+        :param values: Dictionary keyed by course code, each value being a
+          dictionary of field names and the new values of those fields.
+        :return: Number of updated rows.
+        """
+        updated = 0
+        course_codes = list(values.keys())
+        for start in range(0, len(course_codes), self.UPDATE_BATCH_SIZE):
+            batch = course_codes[start:start + self.UPDATE_BATCH_SIZE]
+            fields = {
+                field
+                for course_code in batch
+                for field in values[course_code]
+            }
+            updates = {}
+            for field in fields:
+                whens = [
+                    models.When(
+                        course_code=course_code,
+                        then=models.Value(values[course_code][field]),
+                    )
+                    for course_code in batch
+                    if field in values[course_code]
+                ]
+                updates[field] = models.Case(
+                    *whens,
+                    default=models.F(field),
+                    output_field=self.model._meta.get_field(field),
+                )
+            updated += self.filter(course_code__in=batch).update(**updates)
+        return updated
+
+    def with_routing(self) -> 'CourseQuerySet':
+        """
+        Annotate courses with the information needed by get_absolute_url.
+
+        Course.get_absolute_url needs up to four queries per course in order
+        to determine where it should redirect to. This method resolves the
+        same information with correlated subqueries, such that an entire
+        listing of courses with URLs can be retrieved with one query.
+        """
+        DocumentInfo = self.model._meta.get_field('docinfos').related_model
+        has_exams = models.Exists(
+            DocumentInfo.objects.filter(course_id=models.OuterRef('pk')),
+        )
+
+        # Same ordering as Semester.Meta.ordering, as used by
+        # course.semesters.all()[0]
+        semester_relations = (
+            self.model.semesters.through.objects
+            .filter(course_id=models.OuterRef('pk'))
+            .order_by('semester__main_profile__display_name', 'semester__number')
+        )
+
+        def first_semester(field, output_field):
+            return models.Subquery(
+                semester_relations.values('semester__' + field)[:1],
+                output_field=output_field,
+            )
+
+        # Same ordering as Options.Meta.ordering
+        first_student = models.Subquery(
+            Options.self_chosen_courses.through.objects
+            .filter(course_id=models.OuterRef('pk'))
+            .order_by('options__user__username')
+            .values('options__user__username')[:1],
+            output_field=models.CharField(),
+        )
+
+        return self.annotate(
+            has_exams=has_exams,
+            first_semester_number=first_semester(
+                'number',
+                models.PositiveSmallIntegerField(),
+            ),
+            first_semester_study_program=first_semester(
+                'study_program__slug',
+                models.CharField(),
+            ),
+            first_semester_main_profile=first_semester(
+                'main_profile__slug',
+                models.CharField(),
+            ),
+            first_student=first_student,
+        )
+
+
 class Course(LinkList):
     """
     Contains a specific course with a logo for display on the semesterpage.
@@ -391,6 +634,7 @@ class Course(LinkList):
         max_length=60,
         help_text=_('Dataporten unik id'),
     )
+    objects = CourseQuerySet.as_manager()
 
     def check_access(self, user):
         return self in user.contributor.accessible_courses()
@@ -400,6 +644,10 @@ class Course(LinkList):
         return reverse('admin:%s_%s_change' % info, args=(self.pk,))
 
     def get_absolute_url(self):
+        if hasattr(self, 'has_exams'):
+            # Routing information is annotated by CourseQuerySet.with_routing
+            return self._annotated_absolute_url()
+
         if self.docinfos.exists():
             # Redirect to exam archive for this course, if exams exist
             return reverse(
@@ -416,6 +664,27 @@ class Course(LinkList):
             except IndexError:
                 return reverse('semesterpage-homepage')
 
+    def _annotated_absolute_url(self) -> str:
+        """Return get_absolute_url() without performing any queries."""
+        if self.has_exams:
+            return reverse(
+                'examiner:course',
+                kwargs={'course_code': self.course_code},
+            )
+        elif self.first_semester_number is not None:
+            return Semester.url(
+                study_program=self.first_semester_study_program,
+                number=self.first_semester_number,
+                main_profile=self.first_semester_main_profile,
+            )
+        elif self.first_student:
+            return reverse(
+                'semesterpage-studyprogram',
+                args=(self.first_student,),
+            )
+        else:
+            return reverse('semesterpage-homepage')
+
     def save(self, *args, **kwargs):
         """
         Custom save method in order to guarantee that the course code 'TMA2400'
@@ -959,6 +1228,16 @@ class Options(models.Model):
         verbose_name=_('dataporten fag'),
         help_text=_('Aktive fag fra dataporten'),
     )
+    # When the dataporten data of the user was last scheduled for
+    # reconciliation. Null indicates that it has never been reconciled.
+    # See .adapters.schedule_reconciliation
+    dataporten_synced_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        default=None,
+        editable=False,
+        verbose_name=_('sist synkronisert med dataporten'),
+    )
     calendar_name = models.CharField(
         _('1024-kalendernavn'),
         max_length=60,
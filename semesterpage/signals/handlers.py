@@ -1,15 +1,29 @@
 from django.contrib.auth.models import Group, User
 from django.core.exceptions import ObjectDoesNotExist
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 from django.http import HttpRequest
 
 from allauth.account.signals import user_logged_in
 
 from dataporten.models import DataportenUser
-from semesterpage.adapters import reconcile_dataporten_data
+from kokekunster.conditional import bump_content_version
+from semesterpage.adapters import schedule_reconciliation
 from semesterpage.apps import create_contributor_groups
-from semesterpage.models import Contributor, Options
+from semesterpage.models import (
+    Contributor,
+    Course,
+    CourseLink,
+    CourseUpload,
+    CustomLinkCategory,
+    MainProfile,
+    Options,
+    ResourceLink,
+    ResourceLinkList,
+    SEMESTER_SLUGS,
+    Semester,
+    StudyProgram,
+)
 
 
 @receiver(post_save, sender=User)
@@ -81,9 +95,66 @@ def dataporten_sync_at_login(
     """
     When a user logs in, we syncronize all the data received from dataporten
     with the database. Specifically creating new courses and setting the
-    active courses of the user's options model.
+    active courses of the user's options model. The synchronization is
+    scheduled in the background, see adapters.schedule_reconciliation.
     """
     # The django-allauth middleware is before the dataporten middleware,
     # so we need to set the proxy model manually.
     user.__class__ = DataportenUser
-    reconcile_dataporten_data(user)
+    schedule_reconciliation(user)
+
+
+@receiver(post_save, sender=Semester)
+@receiver(post_save, sender=MainProfile)
+@receiver(post_save, sender=StudyProgram)
+@receiver(post_delete, sender=Semester)
+@receiver(post_delete, sender=MainProfile)
+@receiver(post_delete, sender=StudyProgram)
+def invalidate_semester_slugs(sender, instance, **kwargs):
+    """
+    Invalidate the slug to semester mapping used by Semester.get when any of
+    the slugs might have changed, in this and all other processes.
+    """
+    SEMESTER_SLUGS.invalidate()
+    bump_content_version(SEMESTER_SLUGS.VERSION_SCOPE)
+
+
+# Models rendered by the semester pages. Options are only rendered by the
+# student pages, which are never cached, and are saved for every user by
+# dataporten reconciliation.
+CONTENT_MODELS = (
+    StudyProgram,
+    MainProfile,
+    Semester,
+    Course,
+    CourseLink,
+    CourseUpload,
+    ResourceLinkList,
+    ResourceLink,
+    CustomLinkCategory,
+    Contributor,
+)
+
+
+@receiver(post_save, dispatch_uid='semesterpage_content_saved')
+@receiver(post_delete, dispatch_uid='semesterpage_content_deleted')
+def bump_semesterpage_content_version(sender, **kwargs):
+    """
+    Invalidate ETags of pages rendered from semesterpage models when any of
+    them change. See kokekunster.conditional.
+    """
+    if sender in CONTENT_MODELS:
+        bump_content_version('semesterpage')
+
+
+@receiver(m2m_changed, dispatch_uid='semesterpage_content_relations_changed')
+def bump_semesterpage_relations_version(sender, instance, model, **kwargs):
+    """
+    Invalidate ETags of semester pages when relations between the rendered
+    models change, e.g. the courses of a semester.
+    """
+    if isinstance(instance, CONTENT_MODELS) and issubclass(
+        model,
+        CONTENT_MODELS,
+    ):
+        bump_content_version('semesterpage')
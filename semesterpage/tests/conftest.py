@@ -5,6 +5,7 @@ from dataporten.tests.conftest import dataporten, dataporten_user
 from dataporten.tests.utils import mock_usergroups_request
 from dataporten.models import DataportenGroupManager
 from dataporten.tests.factories import DataportenUserFactory
+from ..models import SEMESTER_SLUGS
 from .factories import (
         StudyProgramFactory,
         MainProfileFactory,
@@ -17,6 +18,16 @@ from .factories import (
         OptionsFactory,
 )
 
+@pytest.fixture(autouse=True)
+def semester_slugs():
+    """
+    Prevent the in-process semester slug mapping from leaking between tests,
+    as database rollbacks do not send any invalidating signals.
+    """
+    SEMESTER_SLUGS.invalidate()
+    yield SEMESTER_SLUGS
+    SEMESTER_SLUGS.invalidate()
+
 @pytest.fixture
 def fysmat_user(dataporten_user, dataporten):
     """
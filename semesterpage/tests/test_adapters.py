@@ -1,12 +1,15 @@
 import pytest
+from freezegun import freeze_time
 
 from ..adapters import (
+        schedule_reconciliation,
         sync_dataporten_courses_with_db,
         sync_options_of_user_with_dataporten,
 )
 from ..models import Course
 from .factories import CourseFactory
 from dataporten.tests.factories import DataportenUserFactory
+from kokekunster.conditional import content_version
 from dataporten.tests.conftest import (
     finished_course,
     non_finished_course,
@@ -43,6 +46,33 @@ class TestSyncDataportenCoursesWithDB:
         assert algebra.homepage == 'http://wiki.math.ntnu.no/tma4150'
         assert algebra.dataporten_uid == 'fc:fs:fs:emne:ntnu.no:TMA4150:1'
 
+    @pytest.mark.django_db
+    def test_populating_missing_dataporten_uids(
+        self,
+        non_finished_course,
+        ongoing_course,
+        django_assert_num_queries,
+        ):
+        """
+        Pre-existing courses should be given dataporten uids in bulk.
+        """
+        CourseFactory(course_code=ongoing_course.code)
+        CourseFactory(course_code=non_finished_course.code)
+        db_course_dict = {
+            course.code: course
+            for course
+            in (non_finished_course, ongoing_course)
+        }
+
+        # One query for existing courses and one for updating the uids
+        with django_assert_num_queries(2):
+            sync_dataporten_courses_with_db(db_course_dict)
+
+        algebra = Course.objects.get(course_code=non_finished_course.code)
+        assert algebra.dataporten_uid == 'fc:fs:fs:emne:ntnu.no:TMA4150:1'
+        optimization = Course.objects.get(course_code=ongoing_course.code)
+        assert optimization.dataporten_uid == 'fc:fs:fs:emne:ntnu.no:TMA4180:1'
+
 class TestSyncOptionsOfUserWithDataporten:
     @pytest.mark.django_db
     def test_new_user(self, dataporten):
@@ -57,6 +87,24 @@ class TestSyncOptionsOfUserWithDataporten:
         # After the sync, all the active courses have been added to the scc
         assert len(dp_user.dataporten.courses.active) == dp_user.options.self_chosen_courses.count()
 
+    @pytest.mark.django_db
+    def test_sync_invalidates_etags(self, dataporten):
+        """Bulk writes should bump the content version of semesterpage."""
+        dp_user = DataportenUserFactory()
+        version = content_version('semesterpage')
+        sync_dataporten_courses_with_db(dp_user.dataporten.courses.all)
+        assert content_version('semesterpage') != version
+
+        version = content_version('semesterpage')
+        sync_options_of_user_with_dataporten(dp_user)
+        assert content_version('semesterpage') != version
+
+        # Nothing has changed since the last sync
+        version = content_version('semesterpage')
+        sync_dataporten_courses_with_db(dp_user.dataporten.courses.all)
+        sync_options_of_user_with_dataporten(dp_user)
+        assert content_version('semesterpage') == version
+
     @pytest.mark.django_db
     def test_user_has_removed_one_of_the_self_chosen_courses(self):
         dp_user = DataportenUserFactory()
@@ -81,3 +129,65 @@ class TestSyncOptionsOfUserWithDataporten:
     def test_user_has_finished_a_course_since_last_time(self):
         # TODO: I need to learn some heavy mocking before I can write this test
         assert True
+
+
+class TestScheduleReconciliation:
+    @pytest.mark.django_db
+    def test_reconciliation_is_debounced(self, monkeypatch):
+        reconciled = []
+        monkeypatch.setattr(
+            'semesterpage.adapters.reconcile_dataporten_data',
+            reconciled.append,
+        )
+        dp_user = DataportenUserFactory()
+        assert dp_user.options.dataporten_synced_at is None
+
+        # The first reconciliation is run right away
+        assert schedule_reconciliation(dp_user) is True
+        assert reconciled == [dp_user]
+        dp_user.options.refresh_from_db()
+        assert dp_user.options.dataporten_synced_at is not None
+
+        # But subsequent page visits do not trigger new reconciliations
+        assert schedule_reconciliation(dp_user) is False
+        assert reconciled == [dp_user]
+
+    @pytest.mark.django_db
+    def test_reconciliation_after_interval(self, monkeypatch):
+        reconciled = []
+        monkeypatch.setattr(
+            'semesterpage.adapters.reconcile_dataporten_data',
+            reconciled.append,
+        )
+        dp_user = DataportenUserFactory()
+        with freeze_time('2017-01-01 12:00'):
+            schedule_reconciliation(dp_user)
+        with freeze_time('2017-01-01 12:05'):
+            assert schedule_reconciliation(dp_user) is False
+        with freeze_time('2017-01-01 13:00'):
+            assert schedule_reconciliation(dp_user) is True
+        assert len(reconciled) == 2
+
+    @pytest.mark.django_db
+    def test_failed_reconciliation_is_retried(self, monkeypatch):
+        def fail(user):
+            raise RuntimeError('Dataporten is down')
+
+        monkeypatch.setattr(
+            'semesterpage.adapters.reconcile_dataporten_data',
+            fail,
+        )
+        dp_user = DataportenUserFactory()
+        with pytest.raises(RuntimeError):
+            schedule_reconciliation(dp_user)
+        dp_user.options.refresh_from_db()
+        assert dp_user.options.dataporten_synced_at is None
+
+        # The next page visit retries right away
+        reconciled = []
+        monkeypatch.setattr(
+            'semesterpage.adapters.reconcile_dataporten_data',
+            reconciled.append,
+        )
+        assert schedule_reconciliation(dp_user) is True
+        assert reconciled == [dp_user]
@@ -0,0 +1,82 @@
+from django.core.management import call_command
+
+import pytest
+
+import responses
+
+from semesterpage.management.commands.populate_courses import IMEAPI
+from semesterpage.models import Course
+from .factories import CourseFactory
+
+
+@responses.activate
+@pytest.mark.django_db
+def test_populate_courses():
+    """New courses should be created once, and existing ones updated."""
+    CourseFactory(
+        course_code='TMA4100',
+        full_name='Matematikk 1',
+        homepage='https://wiki.math.ntnu.no/tma4100',
+    )
+    responses.add(
+        responses.GET,
+        IMEAPI.COURSE_URL + '-',
+        json={'course': [
+            {'code': 'TMA4100'},
+            {'code': 'TMA4130'},
+            {'code': 'tma4130'},
+            {'code': 'TMA4999'},
+        ]},
+    )
+    responses.add(
+        responses.GET,
+        IMEAPI.COURSE_URL + 'TMA4100',
+        json={'course': {'name': 'Calculus 1', 'infoType': []}},
+    )
+    responses.add(
+        responses.GET,
+        IMEAPI.COURSE_URL + 'TMA4130',
+        json={'course': {
+            'name': 'Matematikk 4N',
+            'infoType': [{'code': 'E-URL', 'text': 'https://tma4130.no'}],
+        }},
+    )
+    responses.add(
+        responses.GET,
+        IMEAPI.COURSE_URL + 'TMA4999',
+        json={'course': None},
+    )
+
+    call_command('populate_courses', workers=2, batch_size=1)
+
+    courses = Course.objects.order_by('course_code').values_list(
+        'course_code',
+        'full_name',
+        'homepage',
+    )
+    assert list(courses) == [
+        # Empty values from the API do not overwrite existing values
+        ('TMA4100', 'Calculus 1', 'https://wiki.math.ntnu.no/tma4100'),
+        ('TMA4130', 'Matematikk 4N', 'https://tma4130.no'),
+    ]
+
+
+def test_all_courses_bounds_pending_requests(monkeypatch):
+    """Course details should only be requested a few courses ahead."""
+    api = IMEAPI(workers=1)
+    course_codes = [f'TMA{number}' for number in range(100)]
+    monkeypatch.setattr(api, 'course_codes', lambda: course_codes)
+    requested = []
+
+    def course(course_code):
+        requested.append(course_code)
+        return {'course_code': course_code}
+
+    monkeypatch.setattr(api, 'course', course)
+    courses = api.all_courses()
+    assert next(courses) == {'course_code': 'TMA0'}
+    assert len(requested) <= 4
+
+    # All courses are still yielded in order
+    remaining = [course['course_code'] for course in courses]
+    assert remaining == course_codes[1:]
@@ -9,8 +9,9 @@ from freezegun import freeze_time
 
 from dataporten.models import DataportenUser
 from dataporten.tests.factories import UserFactory
+from kokekunster.conditional import bump_content_version
 from ..apps import create_contributor_groups
-from ..models import Course, Semester, norwegian_slugify
+from ..models import SEMESTER_SLUGS, Course, Semester, norwegian_slugify
 from .factories import (
         CourseFactory,
         CourseUploadFactory,
@@ -169,6 +170,62 @@ class TestSemester:
         )
         assert lowest_semester == result
 
+    @pytest.mark.django_db
+    def test_semester_lookup_is_a_primary_key_fetch(
+        self,
+        django_assert_num_queries,
+    ):
+        semester = SemesterFactory(
+            study_program__display_name='fysmat',
+            main_profile__display_name='indmat',
+            number=2,
+        )
+
+        # The first lookup loads the slug mapping
+        assert Semester.get(study_program='fysmat', number=2) == semester
+
+        # Thereafter only the semester itself is fetched
+        with django_assert_num_queries(1):
+            result = Semester.get(study_program='Fysmat', main_profile='InDmat')
+        assert result == semester
+
+    @pytest.mark.django_db
+    def test_renamed_study_program_invalidates_slugs(self):
+        semester = SemesterFactory(
+            study_program__display_name='fysmat',
+            main_profile=None,
+        )
+        assert Semester.get(study_program='fysmat') == semester
+
+        study_program = semester.study_program
+        study_program.display_name = 'kybmat'
+        study_program.save()
+        assert Semester.get(study_program='kybmat') == semester
+        with pytest.raises(Semester.DoesNotExist):
+            Semester.get(study_program='fysmat')
+
+    @pytest.mark.django_db
+    def test_slugs_changed_by_other_processes_expire_on_hits(self):
+        later_semester = SemesterFactory(
+            study_program__display_name='fysmat',
+            main_profile=None,
+            number=2,
+        )
+        assert Semester.get(study_program='fysmat') == later_semester
+
+        # Another process creates an earlier semester, which invalidates the
+        # mapping of that process and the shared version only
+        earlier_semester = SemesterFactory.build(
+            study_program=later_semester.study_program,
+            main_profile=None,
+            number=1,
+        )
+        Semester.objects.bulk_create([earlier_semester])
+        bump_content_version(SEMESTER_SLUGS.VERSION_SCOPE)
+
+        result = Semester.get(study_program='fysmat')
+        assert result.number == 1
+
     @pytest.mark.django_db
     def test_non_existing_semester(self):
         with pytest.raises(Semester.DoesNotExist):
@@ -211,6 +268,31 @@ class TestCourse:
         course.pk = 1
         assert course.url == '/oppdater/semesterpage/course/1/change/'
 
+    @pytest.mark.django_db
+    def test_annotated_absolute_url(self, django_assert_num_queries):
+        semester = SemesterFactory(
+            study_program__display_name='fysmat',
+            main_profile__display_name='indmat',
+            number=3,
+        )
+        with_semester = CourseFactory(semesters=(semester,))
+        without_semester = CourseFactory()
+        student = User.objects.create(username='olan')
+        student.options.self_chosen_courses.add(without_semester)
+        orphan = CourseFactory()
+
+        courses = [with_semester, without_semester, orphan]
+        expected_urls = [course.get_absolute_url() for course in courses]
+        assert expected_urls == ['/fysmat/indmat/3/', '/olan/', '/']
+
+        # All the routing information is retrieved in one query
+        with django_assert_num_queries(1):
+            annotated = Course.objects.with_routing().in_bulk(
+                [course.pk for course in courses],
+            )
+            urls = [annotated[course.pk].get_absolute_url() for course in courses]
+        assert urls == expected_urls
+
 
 class TestCourseUpload:
     @pytest.mark.django_db
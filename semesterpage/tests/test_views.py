@@ -162,3 +162,19 @@ class TestRemoveCourseFromStudentPageView:
         response = remove_course(request, '1000')
         assert list(request.user.options.self_chosen_courses.all()) == courses
         assert response.url == '/username/'
+
+
+@pytest.mark.django_db
+def test_semester_page_etag_depends_on_calendar(client):
+    """The calendar link of the navbar should invalidate cached pages."""
+    url = SemesterFactory().get_absolute_url()
+
+    # The first visit saves the location in the session
+    client.get(url)
+    etag = client.get(url)['ETag']
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    client.get('/kalender/tma4100/')
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert b'tma4100' in response.content
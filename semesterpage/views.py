@@ -7,13 +7,15 @@ from django.contrib.auth.models import User
 from django.db.models import Q
 from django.http import Http404, HttpResponse, HttpRequest
 from django.shortcuts import redirect, render, reverse as django_reverse
+from django.views.decorators.http import condition
 
 from dal import autocomplete
 from rules.contrib.views import permission_required, objectgetter
 
 from dataporten.models import DataportenUser
-from .adapters import reconcile_dataporten_data
-from .models import Course, Semester, StudyProgram
+from kokekunster.conditional import etag
+from .adapters import schedule_reconciliation
+from .models import Course, SEMESTER_SLUGS, Semester, StudyProgram
 
 DEFAULT_STUDY_PROGRAM_SLUG = getattr(
     settings,
@@ -52,6 +54,15 @@ def studentpage(request, homepage):
     # NB! In the following view function, user and request.user is not
     # necessarily the same user. This should become more clear in the next
     # refactoring.
+    if request.user.is_authenticated \
+            and isinstance(request.user, DataportenUser) \
+            and request.user.username == homepage:
+        # We ensure normalization between dataporten and the database,
+        # since we have an authenticated dataporten user which tries to acces
+        # his/her own homepage. The reconciliation runs in the background, so
+        # the page is rendered from the last reconciled state.
+        schedule_reconciliation(request.user)
+
     try:
         # The homepage is given by the (Feide) username
         user = (
@@ -68,15 +79,6 @@ def studentpage(request, homepage):
             % homepage
         )
 
-    if request.user.is_authenticated \
-            and isinstance(request.user, DataportenUser) \
-            and request.user.username == homepage:
-        # We ensure normalization between dataporten and the database,
-        # since we have an authenticated dataporten user which tries to acces
-        # his/her own homepage.
-        reconcile_dataporten_data(request.user)
-        user.refresh_from_db()
-
     # Save homepage in session for automatic redirect on next visit
     request.session['homepage'] = homepage
 
@@ -91,6 +93,42 @@ def studentpage(request, homepage):
     })
 
 
+def semester_etag(
+    request,
+    study_program,
+    main_profile=None,
+    semester_number=None,
+    save_location=True,
+):
+    """
+    Return ETag of semester page, or None for student pages.
+
+    Student pages are never answered with 304 Not Modified, as visiting one's
+    own page schedules dataporten reconciliation.
+    """
+    semester_pk = SEMESTER_SLUGS.lookup(
+        study_program=study_program,
+        main_profile=main_profile,
+        number=semester_number,
+    )
+    if semester_pk is None:
+        return None
+
+    # The session location is included, as rendering the page updates it.
+    # The calendar name is rendered by the navbar, but saved in Options or
+    # the session, which do not change any content version.
+    return etag(
+        request,
+        ('semesterpage',),
+        semester_pk,
+        save_location,
+        request.session.get('semester_pk'),
+        request.session.get('homepage'),
+        get_calendar_name(request),
+    )
+
+
+@condition(etag_func=semester_etag)
 def semester_view(
     request,
     study_program,
@@ -279,7 +317,7 @@ class CourseAutocomplete(autocomplete.Select2QuerySetView):
         if self.LOGIN_REQUIRED and not self.request.user.is_authenticated():
             return Course.objects.none()
 
-        qs = Course.objects.all()
+        qs = Course.objects.with_routing()
 
         # If the user has started entering input, start restricting
         # the choices available for autocompletion.